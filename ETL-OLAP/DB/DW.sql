@@ -89,7 +89,19 @@ CREATE TABLE IF NOT EXISTS `dw_proyectos`.`dim_tiempo` (
   `Dia` INT NULL DEFAULT NULL,
   `Mes` INT NULL DEFAULT NULL,
   `Anio` INT NULL DEFAULT NULL,
-  PRIMARY KEY (`ID_Tiempo`))
+  `Fecha` DATE NULL DEFAULT NULL,
+  `Trimestre` TINYINT NULL DEFAULT NULL,
+  `SemanaISO` TINYINT NULL DEFAULT NULL,
+  `AnioISO` INT NULL DEFAULT NULL,
+  `InicioMes` DATE NULL DEFAULT NULL,
+  `AnioMes` INT NULL DEFAULT NULL,
+  `PeriodoTrimestre` VARCHAR(8) NULL DEFAULT NULL,
+  `AnioFiscal` INT NULL DEFAULT NULL,
+  `TrimestreFiscal` TINYINT NULL DEFAULT NULL,
+  `PeriodoFiscal` VARCHAR(10) NULL DEFAULT NULL,
+  PRIMARY KEY (`ID_Tiempo`),
+  UNIQUE INDEX `idx_fecha` (`Fecha` ASC) VISIBLE,
+  INDEX `idx_anio_mes` (`AnioMes` ASC) VISIBLE)
 ENGINE = InnoDB
 DEFAULT CHARACTER SET = utf8mb4
 COLLATE = utf8mb4_0900_ai_ci;
@@ -42,6 +42,8 @@ def cargar_datos_dw() -> Dict[str, pd.DataFrame]:
                     dp.CodigoProyecto, dp.Version, dp.Cancelado, dp.TotalErrores, dp.NumTrabajadores,
                     dc.CodigoClienteReal,
                     dt_inicio.Anio as AnioInicio, dt_inicio.Mes as MesInicio,
+                    dt_inicio.Trimestre as TrimestreInicio, dt_inicio.PeriodoTrimestre as PeriodoInicio,
+                    dt_inicio.AnioMes as AnioMesInicio, dt_inicio.PeriodoFiscal as PeriodoFiscalInicio,
                     dt_fin.Anio as AnioFin, dt_fin.Mes as MesFin,
                     dg.TipoGasto, dg.Categoria as CategoriaGasto, dg.Monto as MontoGasto
                 FROM hechos_proyectos hp
@@ -155,9 +157,8 @@ def preparar_dataset_olap(dataframes: Dict[str, pd.DataFrame]) -> pd.DataFrame:
         labels=['Baja', 'Media', 'Alta', 'Excelente']
     )
     
-    # Categorías temporales
-    df_olap['PeriodoInicio'] = df_olap['AnioInicio'].astype(str) + '-Q' + \
-                               ((df_olap['MesInicio'] - 1) // 3 + 1).astype(str)
+    # Categorías temporales: PeriodoInicio, TrimestreInicio, AnioMesInicio y PeriodoFiscalInicio
+    # vienen precalculadas de la jerarquía de dim_tiempo (vista_proyectos_completa)
     
     print(f"[OK] Dataset OLAP preparado: {len(df_olap)} registros con {len(df_olap.columns)} dimensiones")
     
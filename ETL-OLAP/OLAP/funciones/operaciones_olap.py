@@ -12,14 +12,212 @@ Implementa las 5 operaciones fundamentales del OLAP:
 
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Any, Optional
+import threading
+from collections import OrderedDict
+from itertools import combinations
+from typing import Callable, Dict, FrozenSet, Hashable, List, Any, Optional, Tuple
+
+# Agregados parciales que guarda cada cuboide; ambos se combinan sumando al subir en el
+# retículo y la media se calcula al final como suma / conteo
+PARCIALES = ['sum', 'count']
+
+# Memoria máxima por defecto de los cuboides materializados de un cubo
+MEMORIA_CUBOIDES_MAX = 256 * 2**20
+
+# Un cuboide solo se guarda si tiene a lo sumo esta proporción de las filas de su origen
+REDUCCION_MINIMA = 0.5
+
+# Si el filtro más selectivo deja más de esta proporción de filas se comparan las columnas de
+# códigos completas en lugar de comprobar los demás filtros posición por posición
+PROPORCION_ESCANEO = 0.25
+
+# Resultados de consultas que guarda cada cubo (se descartan los menos usados recientemente)
+MAX_CONSULTAS_CACHE = 128
+
+# Agregaciones del kernel; la media de un grupo sin valores es 0, como en el resto del cubo
+AGREGACIONES = ['sum', 'count', 'mean', 'min', 'max']
+
+# Los grupos se cuentan con bincount sobre la clave combinada (en lugar de ordenarla) si el
+# espacio de claves es a lo sumo esta cantidad de veces las filas
+ESPACIO_DENSO_MAX = 2
+
+def _normalizar_filtros(filtros: Dict[str, Any]) -> tuple:
+    """
+    Filtros como tupla ordenada: el orden de las claves y de las listas no importa. Solo las
+    listas se filtran con isin; cualquier otro valor (tupla, set...) se compara con ==.
+    """
+    def valor_normalizado(valor):
+        if isinstance(valor, list):
+            return ('__en__', tuple(sorted({valor_normalizado(v) for v in valor}, key=repr)))
+        return valor.item() if isinstance(valor, np.generic) else valor
+    return tuple(sorted((dimension, valor_normalizado(valor)) for dimension, valor in filtros.items()))
+
+def codificar(columna: pd.Series) -> Tuple[np.ndarray, Any]:
+    """
+    Códigos enteros de una columna en el orden de sus valores (0 = nulo) y la tabla para
+    decodificarlos, con el tipo de la columna (las categorías completas si es category)
+    """
+    try:
+        codigos, valores = pd.factorize(columna, sort=True, use_na_sentinel=True)
+    except TypeError:
+        codigos, valores = pd.factorize(columna, use_na_sentinel=True)  # Tipos mezclados: sin orden
+    tabla = valores.array if pd.api.types.is_extension_array_dtype(valores.dtype) else valores.to_numpy()
+    # El tipo entero más chico: además de ocupar menos, numpy ordena uint8/uint16 por radix
+    return (codigos + 1).astype(np.min_scalar_type(len(valores))), tabla
+
+def decodificar(tabla: Any, codigos: np.ndarray):
+    """Valores originales de un arreglo de códigos (nulo para el código 0)"""
+    return pd.api.extensions.take(tabla, codigos.astype(np.intp) - 1, allow_fill=True)
+
+class IndiceDimension:
+    """
+    Diccionario e índice invertido de una dimensión: código entero de cada fila, asignado en
+    el orden de los valores (0 = nulo), la tabla para decodificarlo y, por cada valor, las
+    posiciones de sus filas (ordenadas) como un tramo de un único arreglo de posiciones.
+    """
+    
+    def __init__(self, columna: pd.Series):
+        self.codigos, self.tabla = codificar(columna)
+        # Con pd.Index las fechas quedan como Timestamp (datetime64.tolist() da enteros)
+        self.valores = pd.Index(self.tabla).tolist()
+        self.codigo_de = {valor: codigo for codigo, valor in enumerate(self.valores, start=1)}
+        self.posiciones = np.argsort(self.codigos, kind='stable').astype(np.min_scalar_type(len(columna)))
+        self.inicios = np.concatenate(([0], np.cumsum(np.bincount(self.codigos, minlength=len(self.valores) + 1))))
+    
+    def codigos_filtro(self, valor: Any) -> np.ndarray:
+        """Códigos de las filas que cumplen == valor (o isin si valor es una lista, que incluye nulos)"""
+        if isinstance(valor, list):
+            codigos = {0 if pd.isna(v) else self.codigo_de.get(v, -1) for v in valor} - {-1}
+        else:
+            codigos = {self.codigo_de[valor]} if valor in self.codigo_de else set()
+        return np.array(sorted(codigos), dtype=np.intp)
+    
+    def filas(self, codigos: np.ndarray) -> int:
+        return int((self.inicios[codigos + 1] - self.inicios[codigos]).sum())
+    
+    def contiene(self, codigos_filas: np.ndarray, codigos: np.ndarray) -> np.ndarray:
+        """Máscara de codigos_filas que están en codigos (pocos códigos: más rápido que np.isin)"""
+        mascara = np.zeros(len(codigos_filas), dtype=bool)
+        for codigo in codigos:
+            mascara |= codigos_filas == self.codigos.dtype.type(codigo)
+        return mascara
+    
+    def mascara(self, codigos_filas: np.ndarray, valor: Any) -> np.ndarray:
+        """Máscara de codigos_filas que cumplen == valor (o isin si valor es una lista)"""
+        try:
+            return self.contiene(codigos_filas, self.codigos_filtro(valor))
+        except TypeError:
+            # Valor no hasheable: comparar con los valores decodificados
+            valores = pd.Series(self.decodificar(codigos_filas))
+            return (valores.isin(valor) if isinstance(valor, list) else valores == valor).to_numpy()
+    
+    def decodificar(self, codigos: np.ndarray):
+        return decodificar(self.tabla, codigos)
+    
+    def posiciones_de(self, codigos: np.ndarray) -> np.ndarray:
+        """Posiciones (ascendentes) de las filas con alguno de los códigos"""
+        tramos = [self.posiciones[self.inicios[c]:self.inicios[c + 1]] for c in codigos]
+        if len(tramos) == 1:
+            return tramos[0]
+        return np.sort(np.concatenate(tramos)) if tramos else self.posiciones[:0]
+    
+    def memoria_bytes(self) -> int:
+        return self.codigos.nbytes + self.posiciones.nbytes + self.inicios.nbytes
+
+# ================= KERNEL DE AGREGACIÓN =================
+
+def agrupar_codigos(codigos: List[np.ndarray], cardinalidades: List[int],
+                    filas: int) -> Optional[Tuple[List[np.ndarray], np.ndarray]]:
+    """
+    Grupos de las combinaciones de códigos presentes, en orden lexicográfico de los códigos.
+    Las dimensiones se combinan en una clave entera en base mixta; si el espacio de claves es
+    chico los grupos se cuentan con bincount y si no se ordenan con np.unique.
+    
+    Returns:
+        (códigos de cada grupo por dimensión, grupo de cada fila), o None si la clave
+        combinada no entra en int64
+    """
+    espacio = 1
+    for cardinalidad in cardinalidades:
+        espacio *= cardinalidad
+    if espacio >= 2**63:
+        return None
+    
+    if len(codigos) == 1:
+        clave = codigos[0].astype(np.intp, copy=False)
+    else:
+        clave = np.zeros(filas, dtype=np.int64)
+        for codigos_dimension, cardinalidad in zip(codigos, cardinalidades):
+            clave *= cardinalidad
+            clave += codigos_dimension
+    
+    if espacio <= max(filas * ESPACIO_DENSO_MAX, 2**16):
+        grupos = np.flatnonzero(np.bincount(clave, minlength=espacio))
+        grupo_de_clave = np.empty(espacio, dtype=np.intp)
+        grupo_de_clave[grupos] = np.arange(len(grupos))
+        grupo_de_fila = grupo_de_clave[clave]
+    else:
+        grupos, grupo_de_fila = np.unique(clave, return_inverse=True)
+    
+    codigos_grupo = []
+    for cardinalidad in reversed(cardinalidades):
+        grupos, codigo = np.divmod(grupos, cardinalidad)
+        codigos_grupo.append(codigo)
+    return codigos_grupo[::-1], grupo_de_fila
+
+def agregar_grupos(grupo_de_fila: np.ndarray, grupos: int, columnas: Dict[str, pd.Series],
+                   agregaciones: List[str]) -> Dict[str, np.ndarray]:
+    """
+    Solo las agregaciones pedidas de cada columna por grupo, con bincount (suma y conteo) y
+    fmin.at / fmax.at (mínimo y máximo); los nulos se ignoran.
+    
+    Returns:
+        Un arreglo por 'columna|agregación'
+    """
+    resultado = {}
+    for nombre, columna in columnas.items():
+        entera = columna.dtype.kind in 'iu'
+        valores = columna.to_numpy(dtype=np.float64, na_value=np.nan)
+        validos = None if entera else ~np.isnan(valores)
+        
+        if set(agregaciones) - {'sum'}:
+            conteo = np.bincount(grupo_de_fila, weights=validos, minlength=grupos).astype(np.int64)
+        if 'sum' in agregaciones or 'mean' in agregaciones:
+            suma = np.bincount(grupo_de_fila, weights=valores if entera else np.where(validos, valores, 0.0),
+                               minlength=grupos)
+        
+        for agregacion in agregaciones:
+            if agregacion == 'sum':
+                valor = np.rint(suma).astype(np.int64) if entera else suma
+            elif agregacion == 'count':
+                valor = conteo
+            elif agregacion == 'mean':
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    valor = np.where(conteo > 0, suma / conteo, 0.0)
+            else:
+                valor = np.full(grupos, np.inf if agregacion == 'min' else -np.inf)
+                (np.fmin if agregacion == 'min' else np.fmax).at(valor, grupo_de_fila, valores)
+                valor[conteo == 0] = np.nan
+                if entera:
+                    valor = valor.astype(columna.dtype)
+            resultado[f"{nombre}|{agregacion}"] = valor
+    return resultado
 
 class CuboOLAP:
     """
-    Clase que representa un cubo OLAP con operaciones reales
+    Clase que representa un cubo OLAP con operaciones reales.
+    Las consultas se responden desde el cuboide materializado más chico que cubre las
+    dimensiones pedidas (agrupación + filtros); los cuboides se calculan bajo demanda
+    a partir del menor cuboide que los contiene, dentro de un presupuesto de memoria.
+    Los resultados se guardan en una caché LRU que se vacía al reasignar self.datos.
+    Las dimensiones se guardan codificadas como enteros (IndiceDimension es a la vez el
+    diccionario y un índice invertido para los filtros); se agrupa por códigos con el kernel
+    de numpy (agrupar_codigos / agregar_grupos) y solo se decodifican los resultados.
     """
     
-    def __init__(self, datos: pd.DataFrame, dimensiones: List[str], medidas: List[str]):
+    def __init__(self, datos: pd.DataFrame, dimensiones: List[str], medidas: List[str],
+                 memoria_cuboides: int = MEMORIA_CUBOIDES_MAX, max_consultas_cache: int = MAX_CONSULTAS_CACHE,
+                 usar_kernel: bool = True):
         """
         Inicializa el cubo OLAP
         
@@ -27,11 +225,92 @@ class CuboOLAP:
             datos: DataFrame con los datos
             dimensiones: Lista de columnas que son dimensiones
             medidas: Lista de columnas que son medidas
+            memoria_cuboides: Bytes máximos para cuboides materializados (0 = siempre desde los datos)
+            max_consultas_cache: Resultados guardados en la caché de consultas (0 = sin caché)
+            usar_kernel: Agrupar con el kernel de numpy (False = groupby de pandas)
         """
-        self.datos = datos.copy()
         self.dimensiones = dimensiones
         self.medidas = medidas
+        self.memoria_cuboides = memoria_cuboides
+        self.max_consultas_cache = max_consultas_cache
+        self.usar_kernel = usar_kernel
+        self.version_datos = 0
+        self._cache_consultas: "OrderedDict[Hashable, Any]" = OrderedDict()  # Orden LRU
+        self._lock_cache = threading.Lock()
+        self.estadisticas_cache = {'aciertos': 0, 'fallos': 0, 'desalojos': 0, 'invalidaciones': 0}
+        self.datos = datos
+        self._columnas_parciales = [f"{medida}|{parcial}" for medida in self.medidas for parcial in PARCIALES]
+        self._columnas_resultado = pd.MultiIndex.from_product([self.medidas, ['sum', 'mean', 'count']])
+        self.estadisticas_cuboides = {'consultas': 0, 'desde_cuboide': 0, 'desde_datos': 0,
+                                      'materializados': 0, 'descartados': 0}
+    
+    @property
+    def datos(self) -> pd.DataFrame:
+        """Datos del cubo con las dimensiones decodificadas (se reconstruyen en cada acceso)"""
+        return self._decodificado(self._columnas)
+    
+    @datos.setter
+    def datos(self, datos: pd.DataFrame):
+        """
+        Nueva versión de los datos: se codifican las dimensiones y se descartan los cuboides
+        y resultados calculados sobre la anterior
+        """
+        self.indices = {dimension: IndiceDimension(datos[dimension]) for dimension in self.dimensiones}
+        hechos = datos.drop(columns=self.dimensiones)  # Copia: el cubo no comparte datos con el llamador
+        for dimension, indice in self.indices.items():
+            hechos[dimension] = indice.codigos
+        self._hechos = hechos
+        self._columnas = list(datos.columns)
+        self.version_datos += 1
         self.cubo_base = None  # Se crea bajo demanda
+        self.cuboides: "OrderedDict[FrozenSet[str], pd.DataFrame]" = OrderedDict()  # Orden LRU
+        self._memoria_cuboide: Dict[FrozenSet[str], int] = {}
+        self._sin_beneficio = set()  # Cuboides casi tan grandes como su origen: no se guardan
+        with self._lock_cache:
+            if self._cache_consultas:
+                self.estadisticas_cache['invalidaciones'] += 1
+            self._cache_consultas.clear()
+    
+    def _decodificado(self, columnas: List[str], origen: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """Columnas de origen (por defecto los hechos) con las dimensiones decodificadas"""
+        origen = self._hechos if origen is None else origen
+        return pd.DataFrame({
+            columna: self.indices[columna].decodificar(origen[columna].to_numpy())
+            if columna in self.indices else origen[columna]
+            for columna in columnas
+        }, index=origen.index)
+    
+    def _consultar(self, clave: tuple, calcular: Callable[[], Any]) -> Any:
+        """
+        Resultado de la consulta normalizada clave desde la caché LRU, o calcularlo y guardarlo.
+        Se devuelven copias para que el llamador no pueda modificar lo guardado.
+        """
+        def copia(resultado):
+            if isinstance(resultado, dict):
+                return {nombre: valor.copy() for nombre, valor in resultado.items()}
+            return resultado.copy()
+        
+        clave = (self.version_datos,) + clave
+        try:
+            hash(clave)
+        except TypeError:
+            return calcular()  # Filtro con un valor no hasheable: sin caché
+        with self._lock_cache:
+            if clave in self._cache_consultas:
+                self._cache_consultas.move_to_end(clave)
+                self.estadisticas_cache['aciertos'] += 1
+                return copia(self._cache_consultas[clave])
+            self.estadisticas_cache['fallos'] += 1
+        
+        resultado = calcular()
+        if self.max_consultas_cache <= 0 or clave[0] != self.version_datos:
+            return resultado
+        with self._lock_cache:
+            self._cache_consultas[clave] = resultado
+            while len(self._cache_consultas) > self.max_consultas_cache:
+                self._cache_consultas.popitem(last=False)
+                self.estadisticas_cache['desalojos'] += 1
+        return copia(resultado)
     
     def _crear_cubo_base(self) -> pd.DataFrame:
         """
@@ -42,81 +321,307 @@ class CuboOLAP:
             
         try:
             print(f"[*] Creando cubo base con {len(self.dimensiones)} dimensiones y {len(self.medidas)} medidas...")
-            self.cubo_base = self.datos.groupby(self.dimensiones)[self.medidas].agg({
-                medida: ['sum', 'mean', 'count'] for medida in self.medidas  # Reducir agregaciones
-            }).fillna(0)
+            self.cubo_base = self._agregar(self.dimensiones, {})
             print(f"[OK] Cubo base creado: {self.cubo_base.shape}")
             return self.cubo_base
         except Exception as e:
             print(f"[ERROR] Error creando cubo base: {e}")
             # Crear cubo simple si falla
-            self.cubo_base = self.datos[self.medidas].agg(['sum', 'mean', 'count'])
+            self.cubo_base = self._hechos[self.medidas].agg(['sum', 'mean', 'count'])
             return self.cubo_base
     
-    def slice(self, dimension: str, valor: Any) -> pd.DataFrame:
+    # ================= RETÍCULO DE CUBOIDES =================
+    
+    def _agrupar(self, origen: pd.DataFrame, dimensiones: List[str], columnas: List[str],
+                 agregaciones: List[str]) -> pd.DataFrame:
+        """
+        Agrupar origen por dimensiones (codificadas) calculando solo las agregaciones pedidas.
+        Resultado plano y en orden: una columna por dimensión (códigos, o valores si no es una
+        dimensión del cubo) y una por 'columna|agregación', una fila por combinación presente.
+        """
+        codigos, cardinalidades, tablas = [], [], {}
+        for dimension in dimensiones:
+            if dimension in self.indices:
+                codigos.append(origen[dimension].to_numpy())
+                cardinalidades.append(len(self.indices[dimension].valores) + 1)
+            else:
+                codigos_dimension, tablas[dimension] = codificar(origen[dimension])
+                codigos.append(codigos_dimension)
+                cardinalidades.append(len(tablas[dimension]) + 1)
+        grupos = agrupar_codigos(codigos, cardinalidades, len(origen)) if self.usar_kernel else None
+        
+        if grupos is None:
+            # groupby de pandas (también si la clave combinada no entra en int64)
+            if dimensiones:
+                agrupado = origen.groupby(dimensiones, observed=True, dropna=False)[columnas].agg(agregaciones)
+            else:
+                agrupado = origen[columnas].agg(agregaciones).unstack().to_frame().T
+            agrupado.columns = [f"{columna}|{agregacion}" for columna, agregacion in agrupado.columns]
+            medias = [columna for columna in agrupado.columns if columna.endswith('|mean')]
+            agrupado[medias] = agrupado[medias].fillna(0)
+            return agrupado.reset_index(drop=not dimensiones)
+        
+        codigos_grupo, grupo_de_fila = grupos
+        resultado = {}
+        for dimension, codigos_dimension in zip(dimensiones, codigos_grupo):
+            if dimension in self.indices:
+                resultado[dimension] = codigos_dimension.astype(self.indices[dimension].codigos.dtype)
+            else:
+                resultado[dimension] = decodificar(tablas[dimension], codigos_dimension)
+        cantidad = int(grupo_de_fila.max()) + 1 if len(grupo_de_fila) else 0
+        resultado.update(agregar_grupos(grupo_de_fila, cantidad, {columna: origen[columna] for columna in columnas},
+                                        agregaciones))
+        return pd.DataFrame(resultado)
+    
+    def _parciales(self, origen: pd.DataFrame, dimensiones: List[str], desde_datos: bool) -> pd.DataFrame:
+        """Suma y conteo de cada medida por dimensiones (una fila por combinación, en orden)"""
+        if desde_datos:
+            return self._agrupar(origen, dimensiones, self.medidas, PARCIALES)
+        parciales = self._agrupar(origen, dimensiones, self._columnas_parciales, ['sum'])
+        return parciales.rename(columns={f"{columna}|sum": columna for columna in self._columnas_parciales})
+    
+    def _materializar(self, clave: FrozenSet[str], origen: Optional[pd.DataFrame]) -> pd.DataFrame:
+        """
+        Calcular el cuboide de clave desde origen (otro cuboide, o los datos si es None)
+        y guardarlo si reduce filas y entra en el presupuesto (descartando los menos usados)
+        """
+        dimensiones = [d for d in self.dimensiones if d in clave]
+        origen_hechos = self._hechos if origen is None else origen
+        cuboide = self._parciales(origen_hechos, dimensiones, origen is None)
+        
+        if len(cuboide) > len(origen_hechos) * REDUCCION_MINIMA:
+            self._sin_beneficio.add(clave)
+            return cuboide
+        
+        memoria = int(cuboide.memory_usage(deep=True).sum())
+        while self.cuboides and sum(self._memoria_cuboide.values()) + memoria > self.memoria_cuboides:
+            descartada, _ = self.cuboides.popitem(last=False)
+            del self._memoria_cuboide[descartada]
+            self.estadisticas_cuboides['descartados'] += 1
+        if memoria <= self.memoria_cuboides:
+            self.cuboides[clave] = cuboide
+            self._memoria_cuboide[clave] = memoria
+            self.estadisticas_cuboides['materializados'] += 1
+        return cuboide
+    
+    def _cuboide(self, necesarias: FrozenSet[str]) -> Optional[pd.DataFrame]:
+        """
+        Cuboide más chico que contiene las dimensiones necesarias (None: usar los datos).
+        Si no está materializado se calcula desde el menor cuboide que lo cubre.
+        """
+        if not necesarias or not necesarias <= set(self.dimensiones) or self.memoria_cuboides <= 0:
+            return None
+        if necesarias in self.cuboides:
+            self.cuboides.move_to_end(necesarias)
+            return self.cuboides[necesarias]
+        
+        cubren = [clave for clave in self.cuboides if necesarias <= clave]
+        padre = min(cubren, key=lambda clave: len(self.cuboides[clave])) if cubren else None
+        if necesarias in self._sin_beneficio:
+            return self.cuboides[padre] if padre else None
+        
+        if padre is None and necesarias != frozenset(self.dimensiones):
+            # Pasar por el cuboide base si conviene: los siguientes se calculan desde él
+            base = frozenset(self.dimensiones)
+            if base not in self._sin_beneficio:
+                self._materializar(base, None)
+            if base in self.cuboides:
+                padre = base
+        
+        if padre is not None:
+            self.cuboides.move_to_end(padre)
+        return self._materializar(necesarias, self.cuboides[padre] if padre else None)
+    
+    def materializar_cuboides(self, max_dimensiones: int = 2) -> int:
+        """
+        Precalcular los cuboides de hasta max_dimensiones dimensiones (de mayor a menor,
+        así cada uno se obtiene de un cuboide ya materializado)
+        
+        Returns:
+            Cantidad de cuboides materializados
+        """
+        for k in range(min(max_dimensiones, len(self.dimensiones)), 0, -1):
+            for grupo in combinations(self.dimensiones, k):
+                self._cuboide(frozenset(grupo))
+        return len(self.cuboides)
+    
+    def _mascara(self, origen: pd.DataFrame, filtros: Dict[str, Any]) -> Optional[np.ndarray]:
+        """Máscara de las filas de origen (dimensiones codificadas) que cumplen filtros"""
+        mascara = None
+        for dimension, valor in filtros.items():
+            condicion = self.indices[dimension].mascara(origen[dimension].to_numpy(), valor)
+            mascara = condicion if mascara is None else mascara & condicion
+        return mascara
+    
+    def _filtrar(self, origen: pd.DataFrame, filtros: Dict[str, Any]) -> pd.DataFrame:
+        mascara = self._mascara(origen, filtros)
+        return origen if mascara is None else origen[mascara]
+    
+    def _posiciones(self, filtros: Dict[str, Any]) -> np.ndarray:
+        """
+        Posiciones de las filas de los hechos que cumplen filtros, usando los índices:
+        se parte del filtro más selectivo y se comprueban los demás solo en esas filas.
+        """
+        seleccion = []
+        try:
+            for dimension, valor in filtros.items():
+                indice = self.indices[dimension]
+                codigos = indice.codigos_filtro(valor)
+                seleccion.append((indice.filas(codigos), indice, codigos))
+        except TypeError:
+            # Algún valor no hasheable: comparar columnas completas
+            return np.flatnonzero(self._mascara(self._hechos, filtros))
+        
+        seleccion.sort(key=lambda filtro: filtro[0])
+        filas, indice, codigos = seleccion[0]
+        if filas > len(self._hechos) * PROPORCION_ESCANEO and (len(seleccion) > 1 or len(codigos) > 1):
+            mascara = indice.contiene(indice.codigos, codigos)
+            for _, indice, codigos in seleccion[1:]:
+                mascara &= indice.contiene(indice.codigos, codigos)
+            return np.flatnonzero(mascara)
+        
+        posiciones = indice.posiciones_de(codigos)
+        mascara = None
+        for _, indice, codigos in seleccion[1:]:
+            if not len(posiciones):
+                break
+            condicion = indice.contiene(indice.codigos[posiciones], codigos)
+            mascara = condicion if mascara is None else mascara & condicion
+        return posiciones if mascara is None else posiciones[mascara]
+    
+    def _filtrar_datos(self, filtros: Dict[str, Any], columnas: List[str]) -> pd.DataFrame:
+        """
+        Filas de los hechos que cumplen filtros, solo con las columnas pedidas (dimensiones
+        codificadas) y sin el índice original
+        """
+        if not filtros:
+            return self._hechos[columnas]
+        posiciones = self._posiciones(filtros)
+        # Columna por columna sobre los arreglos: sin copiar las demás columnas ni alinear índices
+        return pd.DataFrame({
+            columna: self._hechos[columna].array.take(posiciones)
+            if pd.api.types.is_extension_array_dtype(self._hechos[columna].dtype)
+            else self._hechos[columna].to_numpy().take(posiciones)
+            for columna in columnas
+        })
+    
+    def _agregar(self, dimensiones: List[str], filtros: Dict[str, Any]) -> pd.DataFrame:
+        """Agregado de dimensiones sobre filtros (slice, dice y drill-down) pasando por la caché"""
+        clave = ('agregar', tuple(dimensiones), _normalizar_filtros(filtros))
+        return self._consultar(clave, lambda: self._calcular_agregado(dimensiones, filtros))
+    
+    def _calcular_agregado(self, dimensiones: List[str], filtros: Dict[str, Any]) -> pd.DataFrame:
+        """
+        Suma, media y conteo de cada medida por dimensiones, sobre las filas que cumplen filtros.
+        Sin dimensiones devuelve sum/mean/count/min/max de las filas filtradas.
+        """
+        self.estadisticas_cuboides['consultas'] += 1
+        necesarias = frozenset(dimensiones) | frozenset(filtros)
+        cuboide = self._cuboide(necesarias) if dimensiones else None
+        
+        if cuboide is None:
+            self.estadisticas_cuboides['desde_datos'] += 1
+            datos_filtrados = self._filtrar_datos(filtros, list(dimensiones) + self.medidas)
+            if datos_filtrados.empty:
+                return pd.DataFrame()
+            if not dimensiones:
+                # Si no quedan dimensiones, agregar todas las medidas
+                return datos_filtrados[self.medidas].agg(['sum', 'mean', 'count', 'min', 'max'])
+            parciales = self._parciales(datos_filtrados, dimensiones, desde_datos=True)
+        else:
+            self.estadisticas_cuboides['desde_cuboide'] += 1
+            filtrado = self._filtrar(cuboide, filtros)
+            if filtrado.empty:
+                return pd.DataFrame()
+            parciales = self._parciales(filtrado, dimensiones, desde_datos=False)
+        return self._resultado(parciales, dimensiones)
+    
+    def _resultado(self, parciales: pd.DataFrame, dimensiones: List[str]) -> pd.DataFrame:
+        """
+        Suma, media y conteo de cada medida a partir de los parciales agrupados por códigos:
+        se descartan los grupos con dimensiones nulas y se decodifica el índice
+        """
+        niveles = [parciales[dimension] for dimension in dimensiones]
+        validos = self._grupos_validos(parciales, dimensiones)
+        
+        if len(dimensiones) == 1:
+            dimension, nivel = dimensiones[0], niveles[0]
+            valores = self.indices[dimension].decodificar(nivel.to_numpy()[validos]) if dimension in self.indices else nivel[validos]
+            indice = pd.Index(valores, name=dimension)
+        else:
+            # Los códigos son las posiciones en la tabla de cada dimensión: sin volver a factorizar
+            tablas, codigos = [], []
+            for dimension, nivel in zip(dimensiones, niveles):
+                if dimension in self.indices:
+                    tablas.append(pd.Index(self.indices[dimension].tabla))
+                    codigos.append(nivel.to_numpy()[validos].astype(np.intp) - 1)
+                else:
+                    codigos_nivel, tabla = pd.factorize(nivel[validos])
+                    tablas.append(tabla)
+                    codigos.append(codigos_nivel)
+            indice = pd.MultiIndex(levels=tablas, codes=codigos, names=dimensiones,
+                                   verify_integrity=False).remove_unused_levels()
+        
+        columnas = []
+        for medida in self.medidas:
+            suma = parciales[f"{medida}|sum"].to_numpy()[validos]
+            conteo = parciales[f"{medida}|count"].to_numpy()[validos]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                media = np.where(conteo > 0, suma / conteo, 0.0)
+            columnas.extend([suma, media, conteo])
+        resultado = pd.DataFrame(dict(enumerate(columnas)), index=indice)
+        resultado.columns = self._columnas_resultado
+        return resultado
+    
+    def _grupos_validos(self, agrupado: pd.DataFrame, dimensiones: List[str]) -> np.ndarray:
+        """Grupos sin dimensiones nulas (groupby los descarta por defecto)"""
+        validos = np.ones(len(agrupado), dtype=bool)
+        for dimension in dimensiones:
+            columna = agrupado[dimension]
+            validos &= columna.to_numpy() != 0 if dimension in self.indices else columna.notna().to_numpy()
+        return validos
+    
+    # ================= OPERACIONES =================
+    
+    def _validar_dimensiones(self, dimensiones: List[str]):
+        for dimension in dimensiones:
+            if dimension not in self.dimensiones:
+                raise ValueError(f"Dimensión '{dimension}' no existe en el cubo")
+    
+    def slice(self, dimension: str, valor: Any, dimensiones: Optional[List[str]] = None) -> pd.DataFrame:
         """
         SLICE: Filtra el cubo por un valor específico de una dimensión
         
         Args:
             dimension: Nombre de la dimensión
             valor: Valor por el que filtrar
+            dimensiones: Dimensiones del resultado (por defecto todas las demás)
             
         Returns:
             DataFrame filtrado
         """
-        if dimension not in self.dimensiones:
-            raise ValueError(f"Dimensión '{dimension}' no existe en el cubo")
-        
-        filtro = self.datos[dimension] == valor
-        datos_filtrados = self.datos[filtro]
-        
-        if datos_filtrados.empty:
-            return pd.DataFrame()
+        self._validar_dimensiones([dimension] + (dimensiones or []))
         
         # Crear cubo sin la dimensión del slice
-        dims_restantes = [d for d in self.dimensiones if d != dimension]
-        
-        if not dims_restantes:
-            # Si no quedan dimensiones, agregar todas las medidas
-            return datos_filtrados[self.medidas].agg(['sum', 'mean', 'count', 'min', 'max'])
-        
-        return datos_filtrados.groupby(dims_restantes)[self.medidas].agg({
-            medida: ['sum', 'mean', 'count'] for medida in self.medidas
-        }).fillna(0)
+        dims_restantes = dimensiones or [d for d in self.dimensiones if d != dimension]
+        return self._agregar(dims_restantes, {dimension: valor})
     
-    def dice(self, filtros: Dict[str, Any]) -> pd.DataFrame:
+    def dice(self, filtros: Dict[str, Any], dimensiones: Optional[List[str]] = None) -> pd.DataFrame:
         """
         DICE: Filtra el cubo por múltiples dimensiones
         
         Args:
             filtros: Diccionario {dimension: valor} con los filtros
+            dimensiones: Dimensiones del resultado (por defecto las que no están en los filtros)
             
         Returns:
             DataFrame filtrado
         """
-        datos_filtrados = self.datos.copy()
-        
-        for dimension, valor in filtros.items():
-            if dimension not in self.dimensiones:
-                raise ValueError(f"Dimensión '{dimension}' no existe en el cubo")
-            
-            if isinstance(valor, list):
-                datos_filtrados = datos_filtrados[datos_filtrados[dimension].isin(valor)]
-            else:
-                datos_filtrados = datos_filtrados[datos_filtrados[dimension] == valor]
-        
-        if datos_filtrados.empty:
-            return pd.DataFrame()
+        self._validar_dimensiones(list(filtros) + (dimensiones or []))
         
         # Crear cubo con las dimensiones que no están en los filtros
-        dims_restantes = [d for d in self.dimensiones if d not in filtros.keys()]
-        
-        if not dims_restantes:
-            return datos_filtrados[self.medidas].agg(['sum', 'mean', 'count', 'min', 'max'])
-        
-        return datos_filtrados.groupby(dims_restantes)[self.medidas].agg({
-            medida: ['sum', 'mean', 'count'] for medida in self.medidas
-        }).fillna(0)
+        dims_restantes = dimensiones or [d for d in self.dimensiones if d not in filtros.keys()]
+        return self._agregar(dims_restantes, filtros)
     
     def roll_up(self, dimension: str, jerarquia: List[str]) -> pd.DataFrame:
         """
@@ -132,18 +637,23 @@ class CuboOLAP:
         if dimension not in self.dimensiones:
             raise ValueError(f"Dimensión '{dimension}' no existe en el cubo")
         
+        return self._consultar(('roll_up', dimension, tuple(jerarquia)),
+                               lambda: self._calcular_roll_up(dimension, jerarquia))
+    
+    def _calcular_roll_up(self, dimension: str, jerarquia: List[str]) -> Dict[str, pd.DataFrame]:
+        datos = self.datos
         resultados = {}
         
         for i, nivel in enumerate(jerarquia):
             # Crear una nueva columna con el nivel actual
             if nivel == 'TOTAL':
                 # Nivel más alto: agregar todo
-                nivel_datos = self.datos.copy()
+                nivel_datos = datos.copy()
                 nivel_datos[f'{dimension}_nivel'] = 'TOTAL'
             else:
                 # Agrupar por el nivel especificado
-                nivel_datos = self.datos.copy()
-                if nivel in self.datos.columns:
+                nivel_datos = datos.copy()
+                if nivel in datos.columns:
                     nivel_datos[f'{dimension}_nivel'] = nivel_datos[nivel]
                 else:
                     # Si no existe la columna, usar la dimensión original
@@ -175,21 +685,13 @@ class CuboOLAP:
         if dimension not in self.dimensiones:
             raise ValueError(f"Dimensión '{dimension}' no existe en el cubo")
         
-        if dimension_hija not in self.datos.columns:
+        if dimension_hija not in self._columnas:
             raise ValueError(f"Dimensión hija '{dimension_hija}' no existe en los datos")
         
-        # Filtrar por el valor padre
-        datos_filtrados = self.datos[self.datos[dimension] == valor_padre]
-        
-        if datos_filtrados.empty:
-            return pd.DataFrame()
-        
-        # Crear nuevas dimensiones incluyendo la dimensión hija
-        dims_nuevas = [d for d in self.dimensiones if d != dimension] + [dimension_hija]
-        
-        return datos_filtrados.groupby(dims_nuevas)[self.medidas].agg({
-            medida: ['sum', 'mean', 'count'] for medida in self.medidas
-        }).fillna(0)
+        # Crear nuevas dimensiones incluyendo la dimensión hija (si no es una dimensión
+        # del cubo no hay cuboide que la contenga y se agrupan los datos)
+        dims_nuevas = [d for d in self.dimensiones if d not in (dimension, dimension_hija)] + [dimension_hija]
+        return self._agregar(dims_nuevas, {dimension: valor_padre})
     
     def pivot(self, dim_filas: List[str], dim_columnas: List[str], medida: str, 
               agregacion: str = 'sum') -> pd.DataFrame:
@@ -212,8 +714,21 @@ class CuboOLAP:
             if dim not in self.dimensiones:
                 raise ValueError(f"Dimensión '{dim}' no existe en el cubo")
         
+        clave = ('pivot', tuple(dim_filas), tuple(dim_columnas), medida, agregacion)
+        return self._consultar(clave, lambda: self._calcular_pivot(dim_filas, dim_columnas, medida, agregacion))
+    
+    def _calcular_pivot(self, dim_filas: List[str], dim_columnas: List[str], medida: str,
+                        agregacion: str) -> pd.DataFrame:
+        dimensiones = list(dict.fromkeys(dim_filas + dim_columnas))
+        if agregacion in ('sum', 'mean', 'count') and dimensiones:
+            cuboide = self._cuboide(frozenset(dimensiones))
+            if cuboide is None:
+                # Sin retículo: parciales agrupados por códigos y se decodifican solo esas filas
+                cuboide = self._parciales(self._hechos, dimensiones, desde_datos=True)
+            return self._pivot_desde_cuboide(cuboide, dim_filas, dim_columnas, medida, agregacion)
+        
         return pd.pivot_table(
-            self.datos,
+            self._decodificado(dimensiones + [medida]),
             values=medida,
             index=dim_filas,
             columns=dim_columnas,
@@ -224,6 +739,85 @@ class CuboOLAP:
             observed=False
         )
     
+    def _pivot_desde_cuboide(self, cuboide: pd.DataFrame, dim_filas: List[str], dim_columnas: List[str],
+                             medida: str, agregacion: str) -> pd.DataFrame:
+        """PIVOT con márgenes sobre los parciales de un cuboide (la media como suma / conteo)"""
+        # Se decodifican solo las filas del cuboide, ya agregadas
+        cuboide = self._decodificado(list(dict.fromkeys(dim_filas + dim_columnas)) +
+                                     [f"{medida}|{parcial}" for parcial in PARCIALES], cuboide)
+        opciones = dict(index=dim_filas, columns=dim_columnas, aggfunc='sum', fill_value=0,
+                        margins=True, margins_name='TOTAL', observed=False)
+        if agregacion != 'mean':
+            return pd.pivot_table(cuboide, values=f"{medida}|{agregacion}", **opciones)
+        
+        tabla = pd.pivot_table(cuboide, values=[f"{medida}|sum", f"{medida}|count"], **opciones)
+        sumas, conteos = tabla[f"{medida}|sum"], tabla[f"{medida}|count"]
+        medias = (sumas / conteos.where(conteos > 0)).fillna(0)
+        # Como pivot_table: sin filas ni columnas que no tienen ningún valor
+        return medias.loc[(conteos > 0).any(axis=1), (conteos > 0).any()]
+    
+    def agregar(self, dimensiones: List[str], medidas: Optional[List[str]] = None,
+                agregaciones: Optional[List[str]] = None, filtros: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """
+        Agregado plano calculando solo lo pedido: una columna por dimensión y una por
+        'medida|agregación', una fila por combinación (sin MultiIndex, barato de serializar)
+        
+        Args:
+            dimensiones: Dimensiones de agrupación (vacía = totales)
+            medidas: Medidas a agregar (por defecto todas)
+            agregaciones: Subconjunto de AGREGACIONES (por defecto ['sum'])
+            filtros: Diccionario {dimension: valor o lista de valores}
+            
+        Returns:
+            DataFrame plano con las dimensiones decodificadas
+        """
+        medidas = medidas or self.medidas
+        agregaciones = agregaciones or ['sum']
+        filtros = filtros or {}
+        self._validar_dimensiones(dimensiones + list(filtros))
+        for medida in medidas:
+            if medida not in self.medidas:
+                raise ValueError(f"Medida '{medida}' no existe en el cubo")
+        for agregacion in agregaciones:
+            if agregacion not in AGREGACIONES:
+                raise ValueError(f"Agregación '{agregacion}' no soportada (usar {', '.join(AGREGACIONES)})")
+        
+        clave = ('plano', tuple(dimensiones), tuple(medidas), tuple(agregaciones), _normalizar_filtros(filtros))
+        return self._consultar(clave, lambda: self._calcular_plano(dimensiones, medidas, agregaciones, filtros))
+    
+    def _calcular_plano(self, dimensiones: List[str], medidas: List[str], agregaciones: List[str],
+                        filtros: Dict[str, Any]) -> pd.DataFrame:
+        self.estadisticas_cuboides['consultas'] += 1
+        cuboide = None
+        if set(agregaciones) <= {'sum', 'count', 'mean'}:
+            cuboide = self._cuboide(frozenset(dimensiones) | frozenset(filtros))
+        
+        if cuboide is None:
+            self.estadisticas_cuboides['desde_datos'] += 1
+            origen = self._filtrar_datos(filtros, list(dict.fromkeys(dimensiones + medidas)))
+            agrupado = self._agrupar(origen, dimensiones, medidas, agregaciones)
+        else:
+            # Suma y conteo desde el cuboide; la media se deriva de ambos
+            self.estadisticas_cuboides['desde_cuboide'] += 1
+            columnas = [f"{medida}|{parcial}" for medida in medidas for parcial in PARCIALES]
+            agrupado = self._agrupar(self._filtrar(cuboide, filtros), dimensiones, columnas, ['sum'])
+            for medida in medidas:
+                suma, conteo = agrupado[f"{medida}|sum|sum"].to_numpy(), agrupado[f"{medida}|count|sum"].to_numpy()
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    derivadas = {'sum': suma, 'count': conteo, 'mean': np.where(conteo > 0, suma / conteo, 0.0)}
+                for agregacion in agregaciones:
+                    agrupado[f"{medida}|{agregacion}"] = derivadas[agregacion]
+        
+        validos = self._grupos_validos(agrupado, dimensiones)
+        resultado = {
+            dimension: self.indices[dimension].decodificar(agrupado[dimension].to_numpy()[validos])
+            for dimension in dimensiones
+        }
+        for medida in medidas:
+            for agregacion in agregaciones:
+                resultado[f"{medida}|{agregacion}"] = agrupado[f"{medida}|{agregacion}"].to_numpy()[validos]
+        return pd.DataFrame(resultado)
+    
     def get_info(self) -> Dict[str, Any]:
         """
         Obtiene información del cubo OLAP
@@ -231,10 +825,24 @@ class CuboOLAP:
         return {
             'dimensiones': self.dimensiones,
             'medidas': self.medidas,
-            'num_registros': len(self.datos),
+            'num_registros': len(self._hechos),
+            'memoria_bytes': int(self._hechos.memory_usage(deep=True).sum()),
             'shape_cubo': (0, 0) if self.cubo_base is None else self.cubo_base.shape,
             'dimensiones_valores': {
-                dim: self.datos[dim].nunique() for dim in self.dimensiones
+                dim: len(self.indices[dim].valores) for dim in self.dimensiones
+            },
+            'indices_memoria_bytes': sum(indice.memoria_bytes() for indice in self.indices.values()),
+            'cuboides': {
+                'en_memoria': [sorted(clave) for clave in self.cuboides],
+                'memoria_bytes': sum(self._memoria_cuboide.values()),
+                'memoria_max_bytes': self.memoria_cuboides,
+                **self.estadisticas_cuboides
+            },
+            'cache_consultas': {
+                'entradas': len(self._cache_consultas),
+                'max_entradas': self.max_consultas_cache,
+                'version_datos': self.version_datos,
+                **self.estadisticas_cache
             }
         }
 
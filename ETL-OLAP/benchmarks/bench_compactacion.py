@@ -0,0 +1,135 @@
+"""
+Benchmark: compactación de tipos de los datos crudos
+1. Memoria por tabla antes y después de compact_dtypes, sobre tablas con los tipos que
+   devuelve pandas.read_sql con mysql-connector (cadenas y datetime.date como objetos,
+   DECIMAL como decimal.Decimal, enteros int64 y fecha_extraccion por fila).
+2. RSS pico del pipeline (lectura por bloques como execute_query + transformaciones)
+   con y sin compactar, cada modo en un proceso aparte. Requiere Linux (/proc/self/status).
+
+Uso:
+    python benchmarks/bench_compactacion.py [--proyectos 50000]
+"""
+import argparse
+import decimal
+import logging
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from benchmarks.datos_sinteticos import generar_datos_crudos
+from utils.dtype_compaction import compact_chunks, compact_table
+
+BLOQUE = 10000
+
+COLUMNAS_DECIMAL = {'CostoPorHora', 'ValorTotalContrato', 'Monto'}
+
+def como_read_sql(df: pd.DataFrame, fecha_extraccion) -> pd.DataFrame:
+    """Convertir una tabla sintética a los tipos que produce read_sql sobre mysql-connector"""
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype.kind == 'M':
+            df[col] = pd.Series(df[col].dt.date, index=df.index, dtype=object).where(df[col].notna(), None)
+        elif col in COLUMNAS_DECIMAL:
+            df[col] = [decimal.Decimal(f'{v:.2f}') for v in df[col]]
+        elif df[col].dtype == object:
+            df[col] = [str(v) for v in df[col]]  # Cadenas independientes, no compartidas
+    if not df.empty:
+        df['fecha_extraccion'] = fecha_extraccion
+    return df
+
+def _memoria_proceso() -> dict:
+    valores = {}
+    with open('/proc/self/status') as f:
+        for linea in f:
+            clave, _, resto = linea.partition(':')
+            if clave in ('VmRSS', 'VmHWM'):
+                valores[clave] = int(resto.split()[0]) * 1024
+    return valores
+
+def _reiniciar_pico() -> bool:
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def _leer_bloques(ruta: str):
+    """Bloques de una tabla, uno a la vez (como pandas.read_sql con chunksize)"""
+    with open(ruta, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+def pipeline(directorio: str, compactar: bool):
+    """Proceso hijo: leer tabla por tabla (como execute_query), compactar y transformar"""
+    from transform.scheduler import run_graph, TRANSFORMACIONES
+
+    logging.disable(logging.INFO)
+    base = _memoria_proceso()['VmRSS']
+    pico_reiniciado = _reiniciar_pico()
+
+    raw_data = {}
+    for archivo in sorted(os.listdir(directorio)):
+        tabla = archivo[:-len('.pkl')]
+        bloques = _leer_bloques(os.path.join(directorio, archivo))
+        if compactar:
+            raw_data[tabla], _ = compact_chunks(bloques, tabla)
+        else:
+            raw_data[tabla] = pd.concat(list(bloques), ignore_index=True)
+    run_graph(raw_data, TRANSFORMACIONES)
+
+    pico = _memoria_proceso()['VmHWM'] - (base if pico_reiniciado else 0)
+    print(pico)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--proyectos', type=int, default=50000)
+    parser.add_argument('--hijo', nargs=2, metavar=('DIRECTORIO', 'MODO'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.hijo:
+        pipeline(args.hijo[0], args.hijo[1] == 'compacto')
+        return
+
+    logging.disable(logging.INFO)
+    datos = generar_datos_crudos(args.proyectos)
+    fecha_extraccion = pd.Timestamp.now().to_pydatetime()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        print(f"{'tabla':>15} {'filas':>10} {'antes (MB)':>11} {'después (MB)':>13} {'reducción':>10}")
+        total_antes = total_despues = 0
+        for tabla, df in datos.items():
+            crudo = como_read_sql(df, fecha_extraccion)
+            with open(os.path.join(directorio, f'{tabla}.pkl'), 'wb') as f:
+                for inicio in range(0, max(len(crudo), 1), BLOQUE):
+                    pickle.dump(crudo.iloc[inicio:inicio + BLOQUE], f)
+            _, stats = compact_table(crudo, tabla)
+            total_antes += stats['before']
+            total_despues += stats['after']
+            print(f"{tabla:>15} {len(crudo):>10,} {stats['before'] / 2**20:>11.2f} {stats['after'] / 2**20:>13.2f} "
+                  f"{stats['before'] / max(stats['after'], 1):>9.1f}x")
+        print(f"{'total':>15} {'':>10} {total_antes / 2**20:>11.2f} {total_despues / 2**20:>13.2f} "
+              f"{total_antes / max(total_despues, 1):>9.1f}x")
+        del datos
+
+        picos = {}
+        for modo in ('sin compactar', 'compacto'):
+            salida = subprocess.run([sys.executable, os.path.abspath(__file__), '--hijo', directorio, modo],
+                                    capture_output=True, text=True, check=True)
+            picos[modo] = int(salida.stdout.strip().splitlines()[-1])
+        print(f"\nRSS pico del pipeline (lectura + transformaciones, sobre el proceso base):")
+        for modo, pico in picos.items():
+            print(f"  {modo:>14}: {pico / 2**20:,.1f} MB")
+        print(f"  reducción: {picos['sin compactar'] / max(picos['compacto'], 1):.1f}x")
+
+if __name__ == '__main__':
+    main()
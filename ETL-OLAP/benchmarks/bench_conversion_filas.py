@@ -0,0 +1,94 @@
+"""
+Benchmark: conversión de filas para executemany en DWLoader
+Compara la implementación anterior (convert_pandas_types + iterrows) con la conversión
+columnar por lotes (DWLoader.iter_row_batches) sobre un DataFrame tipo hechos_asignaciones.
+
+Uso:
+    python benchmarks/bench_conversion_filas.py [--filas 1000000]
+"""
+import argparse
+import time
+import tracemalloc
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from load.load_to_dw import DWLoader
+
+def generar_hechos_asignaciones(filas: int, semilla: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(semilla)
+    horas_plan = rng.integers(10, 200, filas).astype(float)
+    horas_reales = horas_plan + rng.integers(-10, 40, filas)
+    valor = horas_reales * rng.uniform(10, 80, filas)
+    valor[rng.random(filas) < 0.01] = np.nan
+    return pd.DataFrame({
+        'ID_HechoAsignacion': np.arange(1, filas + 1),
+        'ID_Empleado': rng.integers(1, 5000, filas),
+        'ID_Proyecto': rng.integers(1, 20000, filas),
+        'ID_FechaAsignacion': rng.integers(1, 3000, filas),
+        'HorasPlanificadas': horas_plan,
+        'HorasReales': horas_reales,
+        'ValorHoras': valor,
+        'RetrasoHoras': horas_reales - horas_plan,
+    })
+
+def convertir_anterior(df: pd.DataFrame, batch_size: int = 1000):
+    """Copia de la conversión previa: apply por columna + iterrows, con dos copias completas"""
+    df_converted = df.copy()
+    for col in df_converted.columns:
+        if df_converted[col].dtype.name.startswith('int'):
+            df_converted[col] = df_converted[col].apply(lambda x: int(x) if pd.notnull(x) else None)
+        elif df_converted[col].dtype.name.startswith('float'):
+            df_converted[col] = df_converted[col].apply(lambda x: float(x) if pd.notnull(x) else None)
+        else:
+            df_converted[col] = df_converted[col].where(pd.notnull(df_converted[col]), None)
+    
+    converted_rows = []
+    for _, row in df_converted.iterrows():
+        converted_row = []
+        for value in row:
+            if pd.isna(value):
+                converted_row.append(None)
+            elif hasattr(value, 'item'):
+                converted_row.append(value.item())
+            else:
+                converted_row.append(value)
+        converted_rows.append(tuple(converted_row))
+    
+    for i in range(0, len(converted_rows), batch_size):
+        yield converted_rows[i:i + batch_size]
+
+def convertir_columnar(df: pd.DataFrame, batch_size: int = 1000):
+    return DWLoader().iter_row_batches(df, batch_size)
+
+def medir(nombre: str, conversor, df: pd.DataFrame) -> list:
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    filas = []
+    for lote in conversor(df):
+        filas.append(lote[0])  # simula el envío del lote, conservando solo una muestra
+    segundos = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{nombre:<12} {segundos:>10.2f}s {len(df) / segundos:>14,.0f} filas/s {pico / 2**20:>10.1f} MiB pico")
+    return filas
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filas', type=int, default=1_000_000)
+    args = parser.parse_args()
+    
+    df = generar_hechos_asignaciones(args.filas)
+    print(f"hechos_asignaciones sintético: {len(df):,} filas x {len(df.columns)} columnas")
+    
+    nuevas = medir('columnar', convertir_columnar, df)
+    anteriores = medir('anterior', convertir_anterior, df)
+    assert nuevas == anteriores, "Las conversiones producen filas distintas"
+    print("Filas convertidas idénticas")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+Benchmark: consultas de CuboOLAP respondidas desde el retículo de cuboides vs. desde los datos
+Dataset con la forma de preparar_dataset_olap (categorías con pd.cut, Estado, TipoDesviacion,
+PeriodoInicio) y las nueve dimensiones de crear_cubo_olap_proyectos.
+Cada consulta verifica que ambos caminos den el mismo resultado. La última columna es la
+consulta repetida con la caché de resultados (como en cada refresco del dashboard).
+Al final, filtros sobre los datos: máscaras por columna vs. índices invertidos, y memoria de
+los datos con las dimensiones codificadas.
+
+Uso:
+    python benchmarks/bench_cubo_olap.py [--filas 1000000] [--repeticiones 5]
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from OLAP.funciones.operaciones_olap import crear_cubo_olap_proyectos, MAX_CONSULTAS_CACHE
+
+def generar_dataset_olap(filas: int, semilla: int = 42) -> pd.DataFrame:
+    """Filas de vista_proyectos_completa con las columnas derivadas de preparar_dataset_olap"""
+    rng = np.random.default_rng(semilla)
+    anio = rng.integers(2019, 2026, filas)
+    mes = rng.integers(1, 13, filas)
+    presupuesto = rng.uniform(10000, 300000, filas).round(2)
+    coste = (presupuesto * rng.uniform(0.7, 1.3, filas)).round(2)
+    df = pd.DataFrame({
+        'ID_Proyecto': np.arange(1, filas + 1),
+        'CodigoClienteReal': pd.Series(rng.integers(1, 201, filas)).map(lambda i: f'CLI-{i:04d}'),
+        'Cancelado': (rng.random(filas) < 0.15).astype(int),
+        'AnioInicio': anio,
+        'MesInicio': mes,
+        'PeriodoInicio': pd.Series(anio).astype(str) + '-Q' + pd.Series((mes - 1) // 3 + 1).astype(str),
+        'Presupuesto': presupuesto,
+        'CosteReal': coste,
+        'DesviacionPresupuestal': (presupuesto - coste).round(2),
+        'ProductividadPromedio': rng.uniform(50, 800, filas),
+        'TasaDeExitoEnPruebas': rng.uniform(0.5, 1.0, filas),
+        'PorcentajeTareasRetrasadas': rng.uniform(0, 40, filas),
+        'PorcentajeHitosRetrasados': rng.uniform(0, 40, filas),
+    })
+    df['Estado'] = df['Cancelado'].map({0: 'Cerrado', 1: 'Cancelado'})
+    df['CategoriaPresupuesto'] = pd.cut(df['Presupuesto'], bins=[0, 50000, 100000, 200000, float('inf')],
+                                        labels=['Pequeño', 'Mediano', 'Grande', 'Mega'])
+    df['TipoDesviacion'] = np.select([df['DesviacionPresupuestal'] < 0, df['DesviacionPresupuestal'] > 0],
+                                     ['Sobre Presupuesto', 'Bajo Presupuesto'], 'En Presupuesto')
+    df['CategoriaProductividad'] = pd.cut(df['ProductividadPromedio'], bins=[0, 200, 400, 600, float('inf')],
+                                          labels=['Baja', 'Media', 'Alta', 'Muy Alta'])
+    df['CategoriaCalidad'] = pd.cut(df['TasaDeExitoEnPruebas'], bins=[0, 0.7, 0.85, 0.95, 1.0],
+                                    labels=['Baja', 'Media', 'Alta', 'Excelente'])
+    return df
+
+CONSULTAS = {
+    "slice Estado (8 dims)": lambda c: c.slice('Estado', 'Cerrado'),
+    "slice Estado por Anio": lambda c: c.slice('Estado', 'Cerrado', dimensiones=['AnioInicio']),
+    "dice 2 filtros (7 dims)": lambda c: c.dice({'Estado': 'Cerrado', 'CategoriaPresupuesto': 'Grande'}),
+    "dice 2 filtros por cliente": lambda c: c.dice({'Estado': 'Cerrado', 'CategoriaPresupuesto': 'Grande'},
+                                                   dimensiones=['CodigoClienteReal']),
+    "drill_down Anio -> Mes": lambda c: c.drill_down('AnioInicio', 2022, 'MesInicio'),
+    "pivot Estado x CatPresup": lambda c: c.pivot(['Estado'], ['CategoriaPresupuesto'], 'Presupuesto', 'mean'),
+    "pivot Anio x Mes": lambda c: c.pivot(['AnioInicio'], ['MesInicio'], 'CosteReal', 'sum'),
+}
+
+FILTROS = {
+    "Estado": {'Estado': 'Cerrado'},
+    "Estado + CatPresup": {'Estado': 'Cerrado', 'CategoriaPresupuesto': 'Grande'},
+    "cliente + Anio + 2 meses": {'CodigoClienteReal': 'CLI-0007', 'AnioInicio': 2022, 'MesInicio': [3, 4]},
+    "2 CatCalidad + Cancelado": {'CategoriaCalidad': ['Alta', 'Baja'], 'Estado': 'Cancelado'},
+}
+
+def filtrar_con_mascaras(df: pd.DataFrame, filtros: dict) -> pd.DataFrame:
+    """Filtro sin índices: una máscara por columna sobre los valores originales"""
+    mascara = np.ones(len(df), dtype=bool)
+    for dimension, valor in filtros.items():
+        mascara &= (df[dimension].isin(valor) if isinstance(valor, list) else df[dimension] == valor).to_numpy()
+    return df[mascara]
+
+def medir(funcion, repeticiones: int) -> tuple:
+    """(resultado, primera ejecución, mediana de las siguientes) en segundos"""
+    tiempos = []
+    for _ in range(repeticiones + 1):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return resultado, tiempos[0], statistics.median(tiempos[1:])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filas', type=int, default=1000000)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    df = generar_dataset_olap(args.filas)
+    with contextlib.redirect_stdout(io.StringIO()):
+        sin_reticulo = crear_cubo_olap_proyectos(df)
+        sin_reticulo.memoria_cuboides = 0
+        con_reticulo = crear_cubo_olap_proyectos(df)
+    for cubo in (sin_reticulo, con_reticulo):
+        cubo.max_consultas_cache = 0
+    print(f"{len(df):,} filas, {len(con_reticulo.dimensiones)} dimensiones, {len(con_reticulo.medidas)} medidas")
+
+    inicio = time.perf_counter()
+    con_reticulo.materializar_cuboides(max_dimensiones=2)
+    info = con_reticulo.get_info()['cuboides']
+    print(f"Cuboides de hasta 2 dimensiones: {len(info['en_memoria'])} en {time.perf_counter() - inicio:.2f}s "
+          f"({info['memoria_bytes'] / 2**20:.1f} MB)\n")
+
+    print(f"{'consulta':>28} {'datos (ms)':>11} {'retículo 1ª (ms)':>17} {'retículo (ms)':>14} {'aceleración':>12} "
+          f"{'caché (ms)':>11}")
+    for nombre, consulta in CONSULTAS.items():
+        esperado, _, t_datos = medir(lambda: consulta(sin_reticulo), args.repeticiones)
+        obtenido, t_primera, t_reticulo = medir(lambda: consulta(con_reticulo), args.repeticiones)
+        pd.testing.assert_frame_equal(obtenido, esperado, check_exact=False, rtol=1e-9)
+        con_reticulo.max_consultas_cache = MAX_CONSULTAS_CACHE
+        desde_cache, _, t_cache = medir(lambda: consulta(con_reticulo), args.repeticiones)
+        con_reticulo.max_consultas_cache = 0
+        pd.testing.assert_frame_equal(desde_cache, esperado, check_exact=False, rtol=1e-9)
+        print(f"{nombre:>28} {t_datos * 1000:>11.1f} {t_primera * 1000:>17.1f} {t_reticulo * 1000:>14.1f} "
+              f"{t_datos / t_reticulo:>11.1f}x {t_cache * 1000:>11.2f}")
+
+    info = con_reticulo.get_info()['cuboides']
+    print(f"\nCuboides materializados: {len(info['en_memoria'])} ({info['memoria_bytes'] / 2**20:.1f} MB), "
+          f"consultas desde cuboide: {info['desde_cuboide']}, desde datos: {info['desde_datos']}")
+    cache = con_reticulo.get_info()['cache_consultas']
+    print(f"Caché de consultas: {cache['entradas']} entradas, {cache['aciertos']} aciertos, "
+          f"{cache['fallos']} fallos, {cache['desalojos']} desalojos")
+
+    info = con_reticulo.get_info()
+    print(f"\nDatos del cubo: {info['memoria_bytes'] / 2**20:.1f} MB con dimensiones codificadas, "
+          f"{df.memory_usage(deep=True).sum() / 2**20:.1f} MB sin codificar; "
+          f"índices: {info['indices_memoria_bytes'] / 2**20:.1f} MB")
+    print(f"{'filtro':>28} {'filas':>9} {'máscaras (ms)':>14} {'índices (ms)':>13} {'posiciones (ms)':>16}")
+    columnas = con_reticulo.dimensiones + con_reticulo.medidas
+    for nombre, filtros in FILTROS.items():
+        esperado, _, t_mascaras = medir(lambda: filtrar_con_mascaras(df, filtros), args.repeticiones)
+        obtenido, _, t_indices = medir(lambda: con_reticulo._filtrar_datos(filtros, columnas), args.repeticiones)
+        _, _, t_posiciones = medir(lambda: con_reticulo._posiciones(filtros), args.repeticiones)
+        pd.testing.assert_frame_equal(con_reticulo._decodificado(columnas, obtenido), esperado[columnas].reset_index(drop=True))
+        print(f"{nombre:>28} {len(obtenido):>9,} {t_mascaras * 1000:>14.2f} {t_indices * 1000:>13.2f} "
+              f"{t_posiciones * 1000:>16.3f}")
+
+if __name__ == '__main__':
+    main()
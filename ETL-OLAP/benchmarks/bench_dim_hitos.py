@@ -0,0 +1,63 @@
+"""
+Benchmark: dim_hitos vectorizado vs. implementación con apply fila a fila
+Las fechas de hitos se pasan como objetos datetime.date, igual que las devuelve
+mysql-connector para columnas DATE. Solo mide tiempos: la igualdad de ambas salidas
+se comprueba en tests/test_dim_hitos.py.
+
+Uso:
+    python benchmarks/bench_dim_hitos.py [--hitos 10000 100000 300000] [--max-original 100000]
+"""
+import argparse
+import logging
+import time
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from benchmarks.datos_sinteticos import generar_datos_crudos
+from transform.transform_dim.dim_proyectos import transform as transform_dim_proyectos
+from transform.transform_dim.dim_tiempo import transform as transform_dim_tiempo
+from transform.transform_dim.dim_hitos import transform, transform_por_fila
+
+COLUMNAS_FECHA = ['FechaInicio', 'FechaInicioReal', 'FechaFinPlanificada', 'FechaFinReal']
+
+def preparar_entrada(num_hitos: int) -> dict:
+    datos = generar_datos_crudos(-(-num_hitos // 3))
+    hitos = datos['hitos']
+    for col in COLUMNAS_FECHA:
+        fechas = pd.to_datetime(hitos[col])
+        hitos[col] = pd.Series(fechas.dt.date, index=hitos.index, dtype=object).where(fechas.notna(), None)
+    datos['dim_proyectos'] = transform_dim_proyectos(datos)
+    datos['dim_tiempo'] = transform_dim_tiempo(datos)
+    return datos
+
+def medir(funcion, datos) -> tuple:
+    inicio = time.perf_counter()
+    resultado = funcion(datos)
+    return resultado, time.perf_counter() - inicio
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hitos', type=int, nargs='+', default=[10000, 100000, 300000])
+    parser.add_argument('--max-original', type=int, default=100000,
+                        help='Tamaño máximo para ejecutar la implementación fila a fila')
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    print(f"{'hitos':>10} {'vectorizado (s)':>16} {'original (s)':>13} {'aceleración':>12}")
+    for n in args.hitos:
+        datos = preparar_entrada(n)
+        _, t_nuevo = medir(transform, datos)
+
+        if n <= args.max_original:
+            _, t_original = medir(transform_por_fila, datos)
+            print(f"{len(datos['hitos']):>10} {t_nuevo:>16.3f} {t_original:>13.3f} {t_original / t_nuevo:>11.1f}x")
+        else:
+            print(f"{len(datos['hitos']):>10} {t_nuevo:>16.3f} {'-':>13} {'-':>12}  (omitido)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""
+Benchmark: consultas de extracción con y sin conjunto de claves materializado
+Compara con EXPLAIN las consultas anteriores (cada una vuelve a unir proyectos y evalúa
+p.Estado) contra las actuales de SGPExtractor, que hacen un solo join contra las tablas
+temporales etl_proyectos_cerrados / etl_hitos_cerrados / etl_tareas_cerradas.
+
+Requiere conexión al SGP (config/db_config.py).
+
+Uso:
+    python benchmarks/bench_extraccion_explain.py [--ejecutar 3]
+"""
+import argparse
+import json
+import statistics
+import time
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extract.extract_gestion import SGPExtractor
+
+CERRADOS = "p.Estado IN ('Cerrado', 'Cancelado')"
+
+# Copia de las consultas anteriores (solo el FROM/WHERE determina el plan)
+CONSULTAS_ANTERIORES = {
+    'clientes': f"""
+        SELECT DISTINCT cl.ID_Cliente, cl.NombreCliente
+        FROM clientes cl
+        INNER JOIN contratos c ON cl.ID_Cliente = c.ID_Cliente
+        INNER JOIN proyectos p ON c.ID_Proyecto = p.ID_Proyecto
+        WHERE {CERRADOS}
+        ORDER BY cl.ID_Cliente""",
+    'empleados': f"""
+        SELECT DISTINCT e.ID_Empleado, e.NombreCompleto, e.Rol, e.Seniority, e.CostoPorHora
+        FROM empleados e
+        INNER JOIN asignaciones a ON e.ID_Empleado = a.ID_Empleado
+        INNER JOIN proyectos p ON a.ID_Proyecto = p.ID_Proyecto
+        WHERE {CERRADOS}
+        ORDER BY e.ID_Empleado""",
+    'contratos': f"""
+        SELECT c.ID_Contrato, c.ID_Cliente, c.ID_Proyecto, c.ValorTotalContrato, c.Estado
+        FROM contratos c
+        INNER JOIN proyectos p ON c.ID_Proyecto = p.ID_Proyecto
+        WHERE {CERRADOS}
+        ORDER BY c.ID_Contrato""",
+    'hitos': f"""
+        SELECT h.ID_Hito, h.ID_Proyecto, h.Descripcion, h.Estado, h.FechaInicio,
+               h.FechaFinPlanificada, h.FechaFinReal
+        FROM hitos h
+        INNER JOIN proyectos p ON h.ID_Proyecto = p.ID_Proyecto
+        WHERE {CERRADOS}
+        ORDER BY h.ID_Proyecto, h.ID_Hito""",
+    'tareas': f"""
+        SELECT t.ID_Tarea, t.ID_Hito, h.ID_Proyecto, t.NombreTarea, t.Estado,
+               t.FechaInicioPlanificada, t.FechaFinPlanificada, t.FechaFinReal
+        FROM tareas t
+        INNER JOIN hitos h ON t.ID_Hito = h.ID_Hito
+        INNER JOIN proyectos p ON h.ID_Proyecto = p.ID_Proyecto
+        WHERE {CERRADOS}
+        ORDER BY h.ID_Proyecto, t.ID_Hito, t.ID_Tarea""",
+    'asignaciones': f"""
+        SELECT a.ID_Asignacion, a.ID_Proyecto, a.ID_Empleado, a.HorasPlanificadas,
+               a.HorasReales, a.FechaAsignacion, e.CostoPorHora
+        FROM asignaciones a
+        INNER JOIN empleados e ON a.ID_Empleado = e.ID_Empleado
+        INNER JOIN proyectos p ON a.ID_Proyecto = p.ID_Proyecto
+        WHERE {CERRADOS}
+        ORDER BY a.ID_Proyecto, a.FechaAsignacion""",
+    'pruebas': f"""
+        SELECT pr.ID_Prueba, pr.ID_Hito, h.ID_Proyecto, pr.TipoPrueba, pr.Fecha, pr.Exitosa
+        FROM pruebas pr
+        INNER JOIN hitos h ON pr.ID_Hito = h.ID_Hito
+        INNER JOIN proyectos p ON h.ID_Proyecto = p.ID_Proyecto
+        WHERE {CERRADOS}
+        ORDER BY h.ID_Proyecto, pr.ID_Hito, pr.Fecha""",
+    'errores': f"""
+        SELECT e.ID_Error, e.ID_Tarea, t.ID_Hito, h.ID_Proyecto, e.TipoError,
+               e.FaseDeteccion, e.FechaDeteccion, e.FechaCorreccion
+        FROM errores e
+        INNER JOIN tareas t ON e.ID_Tarea = t.ID_Tarea
+        INNER JOIN hitos h ON t.ID_Hito = h.ID_Hito
+        INNER JOIN proyectos p ON h.ID_Proyecto = p.ID_Proyecto
+        WHERE {CERRADOS}
+        ORDER BY h.ID_Proyecto, e.FechaDeteccion""",
+    'gastos': f"""
+        SELECT g.ID_Gasto, g.ID_Proyecto, g.TipoGasto, g.Categoria, g.Monto, g.Fecha
+        FROM gastos g
+        INNER JOIN proyectos p ON g.ID_Proyecto = p.ID_Proyecto
+        WHERE {CERRADOS}
+        ORDER BY g.ID_Proyecto, g.Fecha""",
+    'penalizaciones': """
+        SELECT p.ID_Penalizacion, p.ID_Contrato, c.ID_Cliente, p.Monto, p.Motivo, p.Fecha
+        FROM penalizaciones_contrato p
+        INNER JOIN contratos c ON p.ID_Contrato = c.ID_Contrato
+        INNER JOIN proyectos pr ON c.ID_Proyecto = pr.ID_Proyecto
+        WHERE pr.Estado IN ('Cerrado', 'Cancelado')
+        ORDER BY p.ID_Contrato, p.Fecha""",
+}
+
+def consultas_actuales(extractor: SGPExtractor) -> dict:
+    """Capturar el SQL que generan los extract_<tabla> sin ejecutarlo"""
+    capturadas = {}
+    extractor.execute_query = lambda query, table_name, chunk_size=None: capturadas.__setitem__(table_name, query)
+    for tabla in CONSULTAS_ANTERIORES:
+        getattr(extractor, f"extract_{tabla}")()
+    del extractor.execute_query
+    return capturadas
+
+def _nodos_tabla(nodo):
+    """Recorrer el JSON de EXPLAIN y devolver cada acceso a tabla"""
+    if isinstance(nodo, dict):
+        if 'table_name' in nodo:
+            yield nodo
+        for valor in nodo.values():
+            yield from _nodos_tabla(valor)
+    elif isinstance(nodo, list):
+        for valor in nodo:
+            yield from _nodos_tabla(valor)
+
+def explicar(conexion, query: str) -> dict:
+    """Costo estimado, filas examinadas y accesos a tabla según EXPLAIN FORMAT=JSON"""
+    cursor = conexion.cursor()
+    try:
+        cursor.execute("EXPLAIN FORMAT=JSON " + query)
+        plan = json.loads(cursor.fetchone()[0])
+        tablas = list(_nodos_tabla(plan))
+        return {
+            'costo': float(plan['query_block'].get('cost_info', {}).get('query_cost', 0)),
+            'filas': sum(int(t.get('rows_examined_per_scan', 0)) for t in tablas),
+            'tablas': len(tablas),
+        }
+    finally:
+        cursor.close()
+
+def ejecutar(conexion, query: str, repeticiones: int) -> float:
+    tiempos = []
+    cursor = conexion.cursor()
+    try:
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            cursor.execute(query)
+            cursor.fetchall()
+            tiempos.append(time.perf_counter() - inicio)
+    finally:
+        cursor.close()
+    return statistics.median(tiempos)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ejecutar', type=int, default=0,
+                        help='Además de EXPLAIN, ejecutar cada consulta N veces (mediana)')
+    args = parser.parse_args()
+
+    extractor = SGPExtractor(incremental=False)
+    if not extractor.connect():
+        raise SystemExit("No se pudo conectar al SGP")
+
+    try:
+        inicio = time.perf_counter()
+        extractor.closed_projects = extractor.get_closed_projects()
+        extractor.prepare_key_sets()
+        materializacion = time.perf_counter() - inicio
+        actuales = consultas_actuales(extractor)
+        conexion = extractor.connection
+
+        encabezado = f"{'tabla':>15}  {'costo antes':>12}  {'costo ahora':>12}  {'filas antes':>12}  {'filas ahora':>12}  {'tablas':>7}"
+        if args.ejecutar:
+            encabezado += f"  {'antes (s)':>10}  {'ahora (s)':>10}"
+        print(encabezado)
+
+        totales = {'antes': 0.0, 'ahora': 0.0}
+        for tabla, anterior in CONSULTAS_ANTERIORES.items():
+            antes = explicar(conexion, anterior)
+            ahora = explicar(conexion, actuales[tabla])
+            linea = (f"{tabla:>15}  {antes['costo']:>12,.1f}  {ahora['costo']:>12,.1f}  "
+                     f"{antes['filas']:>12,}  {ahora['filas']:>12,}  {antes['tablas']:>3}->{ahora['tablas']:<3}")
+            if args.ejecutar:
+                t_antes = ejecutar(conexion, anterior, args.ejecutar)
+                t_ahora = ejecutar(conexion, actuales[tabla], args.ejecutar)
+                totales['antes'] += t_antes
+                totales['ahora'] += t_ahora
+                linea += f"  {t_antes:>10.3f}  {t_ahora:>10.3f}"
+            print(linea)
+
+        print(f"\nMaterialización de claves ({len(extractor.closed_projects)} proyectos): {materializacion:.3f}s"
+              f" [{'tablas temporales' if extractor.key_sets['proyectos'].startswith('etl_') else 'subconsultas'}]")
+        if args.ejecutar:
+            print(f"Total consultas: antes {totales['antes']:.3f}s, ahora {totales['ahora']:.3f}s "
+                  f"(+ {materializacion:.3f}s de materialización)")
+    finally:
+        extractor.disconnect()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark: hechos_proyectos vectorizado vs. implementación proyecto por proyecto
+
+Uso:
+    python benchmarks/bench_hechos_proyectos.py [--tamanos 1000 10000 100000] [--max-original 10000]
+"""
+import argparse
+import logging
+import time
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from benchmarks.datos_sinteticos import generar_datos_crudos
+from transform.transform_dim.dim_proyectos import transform as transform_dim_proyectos
+from transform.transform_dim.dim_tiempo import transform as transform_dim_tiempo
+from transform.transform_dim.dim_gastos import transform as transform_dim_gastos
+from transform.transform_dim.dim_hitos import transform as transform_dim_hitos
+from transform.transform_dim.dim_tareas import transform as transform_dim_tareas
+from transform.transform_fact.hechos_proyectos import transform, transform_por_proyecto
+
+def preparar_entrada(num_proyectos: int) -> dict:
+    datos = generar_datos_crudos(num_proyectos)
+    datos['dim_proyectos'] = transform_dim_proyectos(datos)
+    datos['dim_tiempo'] = transform_dim_tiempo(datos)
+    datos['dim_gastos'] = transform_dim_gastos(datos)
+    datos['dim_hitos'] = transform_dim_hitos(datos)
+    datos['dim_tareas'] = transform_dim_tareas(datos)
+    return datos
+
+def medir(funcion, datos) -> tuple:
+    inicio = time.perf_counter()
+    resultado = funcion(datos)
+    return resultado, time.perf_counter() - inicio
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tamanos', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--max-original', type=int, default=10000,
+                        help='Tamaño máximo para ejecutar la implementación original (cuadrática)')
+    args = parser.parse_args()
+    
+    logging.disable(logging.INFO)
+    
+    print(f"{'proyectos':>10} {'vectorizado (s)':>16} {'original (s)':>13} {'aceleración':>12}  iguales")
+    for n in args.tamanos:
+        datos = preparar_entrada(n)
+        nuevo, t_nuevo = medir(transform, datos)
+        
+        if n <= args.max_original:
+            original, t_original = medir(transform_por_proyecto, datos)
+            pd.testing.assert_frame_equal(nuevo, original, check_exact=False, rtol=1e-12)
+            print(f"{n:>10} {t_nuevo:>16.3f} {t_original:>13.3f} {t_original / t_nuevo:>11.1f}x  sí")
+        else:
+            print(f"{n:>10} {t_nuevo:>16.3f} {'-':>13} {'-':>12}  (omitido)")
+
+if __name__ == '__main__':
+    main()
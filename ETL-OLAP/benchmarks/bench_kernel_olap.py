@@ -0,0 +1,106 @@
+"""
+Benchmark: kernel de agregación de numpy vs. groupby de pandas en CuboOLAP
+Cada operación se mide sobre los datos (sin retículo ni caché de consultas) con ambos
+caminos de agrupación y se verifica que den el mismo resultado. Además: materialización
+del retículo y agregados planos (solo las agregaciones pedidas) vs. el MultiIndex de slice.
+Los filtros sobre una dimensión de fechas se comparan además con pandas sin cubo.
+
+Uso:
+    python benchmarks/bench_kernel_olap.py [--filas 1000000] [--repeticiones 3]
+"""
+import argparse
+import contextlib
+import io
+import os
+import pickle
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from benchmarks.bench_cubo_olap import generar_dataset_olap, medir
+from OLAP.funciones.operaciones_olap import CuboOLAP, crear_cubo_olap_proyectos
+
+OPERACIONES = {
+    "slice Estado (8 dims)": lambda c: c.slice('Estado', 'Cerrado'),
+    "slice Estado por Anio": lambda c: c.slice('Estado', 'Cerrado', dimensiones=['AnioInicio']),
+    "dice 2 filtros (7 dims)": lambda c: c.dice({'Estado': 'Cerrado', 'CategoriaPresupuesto': 'Grande'}),
+    "dice 2 filtros por cliente": lambda c: c.dice({'Estado': 'Cerrado', 'CategoriaPresupuesto': 'Grande'},
+                                                   dimensiones=['CodigoClienteReal']),
+    "drill_down Anio -> Mes": lambda c: c.drill_down('AnioInicio', 2022, 'MesInicio'),
+    "pivot mean Estado x CatPresup": lambda c: c.pivot(['Estado'], ['CategoriaPresupuesto'], 'Presupuesto', 'mean'),
+    "pivot sum Anio x Mes": lambda c: c.pivot(['AnioInicio'], ['MesInicio'], 'CosteReal', 'sum'),
+    "agregar sum cliente x Anio": lambda c: c.agregar(['CodigoClienteReal', 'AnioInicio'], ['Presupuesto']),
+    "agregar min/max por Periodo": lambda c: c.agregar(['PeriodoInicio'], ['CosteReal'], ['min', 'max']),
+}
+
+def crear_cubo(df: pd.DataFrame, usar_kernel: bool, memoria_cuboides: int = 0):
+    with contextlib.redirect_stdout(io.StringIO()):
+        cubo = crear_cubo_olap_proyectos(df)
+    cubo.usar_kernel = usar_kernel
+    cubo.memoria_cuboides = memoria_cuboides
+    cubo.max_consultas_cache = 0
+    return cubo
+
+def verificar_fechas(df: pd.DataFrame):
+    """slice y dice por Timestamp sobre una dimensión datetime64, con ambos caminos"""
+    fechas = df[['Estado', 'Presupuesto']].assign(FechaInicio=pd.to_datetime(
+        pd.DataFrame({'year': df['AnioInicio'], 'month': df['MesInicio'], 'day': 1})))
+    fecha, otra = pd.Timestamp('2022-03-01'), pd.Timestamp('2023-07-01')
+    consultas = {
+        "slice FechaInicio": (lambda c: c.slice('FechaInicio', fecha, dimensiones=['Estado']),
+                              fechas['FechaInicio'] == fecha),
+        "dice [FechaInicio, ...]": (lambda c: c.dice({'FechaInicio': [fecha, otra]}, dimensiones=['Estado']),
+                                    fechas['FechaInicio'].isin([fecha, otra])),
+    }
+    for usar_kernel in (False, True):
+        with contextlib.redirect_stdout(io.StringIO()):
+            cubo = CuboOLAP(fechas, ['FechaInicio', 'Estado'], ['Presupuesto'], usar_kernel=usar_kernel)
+        for nombre, (consulta, mascara) in consultas.items():
+            esperado = fechas[mascara].groupby('Estado')['Presupuesto'].agg(['sum', 'mean', 'count'])
+            pd.testing.assert_frame_equal(consulta(cubo)['Presupuesto'], esperado, check_exact=False,
+                                          rtol=1e-9, check_dtype=False, check_names=False)
+    print(f"{'filtros por Timestamp':>30} iguales a pandas ({', '.join(consultas)})")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filas', type=int, default=1000000)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args()
+
+    df = generar_dataset_olap(args.filas)
+    con_pandas = crear_cubo(df, usar_kernel=False)
+    con_kernel = crear_cubo(df, usar_kernel=True)
+    print(f"{len(df):,} filas, {len(con_kernel.dimensiones)} dimensiones, {len(con_kernel.medidas)} medidas\n")
+
+    print(f"{'operación':>30} {'pandas (ms)':>12} {'kernel (ms)':>12} {'aceleración':>12}")
+    for nombre, operacion in OPERACIONES.items():
+        esperado, _, t_pandas = medir(lambda: operacion(con_pandas), args.repeticiones)
+        obtenido, _, t_kernel = medir(lambda: operacion(con_kernel), args.repeticiones)
+        pd.testing.assert_frame_equal(obtenido, esperado, check_exact=False, rtol=1e-9, check_dtype=False)
+        print(f"{nombre:>30} {t_pandas * 1000:>12.1f} {t_kernel * 1000:>12.1f} {t_pandas / t_kernel:>11.1f}x")
+
+    verificar_fechas(df)
+    
+    tiempos = {}
+    for usar_kernel in (False, True):
+        cubo = crear_cubo(df, usar_kernel, memoria_cuboides=256 * 2**20)
+        inicio = time.perf_counter()
+        cubo.materializar_cuboides(max_dimensiones=2)
+        tiempos[usar_kernel] = time.perf_counter() - inicio
+    print(f"{'materializar retículo (2 dims)':>30} {tiempos[False] * 1000:>12.1f} {tiempos[True] * 1000:>12.1f} "
+          f"{tiempos[False] / tiempos[True]:>11.1f}x")
+
+    # Mismo contenido: MultiIndex con sum/mean/count de las 7 medidas vs. plano con lo pedido
+    dimensiones = ['CodigoClienteReal', 'AnioInicio', 'MesInicio']
+    multiindex = con_kernel.slice('Estado', 'Cerrado', dimensiones=dimensiones)
+    plano = con_kernel.agregar(dimensiones, ['Presupuesto'], ['sum', 'mean'], filtros={'Estado': 'Cerrado'})
+    print(f"\nResultado cliente x Anio x Mes ({len(plano):,} grupos) serializado con pickle:")
+    for nombre, resultado in (("slice (MultiIndex, todo)", multiindex), ("agregar (plano, 2 columnas)", plano)):
+        _, _, t_pickle = medir(lambda: pickle.dumps(resultado), args.repeticiones)
+        print(f"  {nombre:>28}: {len(pickle.dumps(resultado)) / 2**10:>9,.1f} KB en {t_pickle * 1000:.2f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""
+Generador de datos sintéticos con la misma forma que la salida de SGPExtractor.extract_all()
+Se usa en los benchmarks para medir transformaciones sin tocar las bases de datos
+"""
+import numpy as np
+import pandas as pd
+from typing import Dict
+
+def _fechas(rng: np.random.Generator, n: int, inicio: str = '2019-01-01', dias: int = 2500) -> pd.Series:
+    base = np.datetime64(inicio, 'D')
+    return pd.Series(base + rng.integers(0, dias, n).astype('timedelta64[D]'))
+
+def _desplazar(rng: np.random.Generator, fechas: pd.Series, minimo: int, maximo: int, nulos: float = 0.0) -> pd.Series:
+    resultado = fechas + pd.to_timedelta(rng.integers(minimo, maximo, len(fechas)), unit='D')
+    if nulos:
+        resultado[rng.random(len(fechas)) < nulos] = pd.NaT
+    return resultado
+
+def generar_datos_crudos(num_proyectos: int, semilla: int = 42) -> Dict[str, pd.DataFrame]:
+    """
+    Genera un diccionario de DataFrames crudos para num_proyectos proyectos
+    (aprox. 3 hitos, 9 tareas, 6 pruebas, 5 asignaciones y 6 gastos por proyecto)
+    """
+    rng = np.random.default_rng(semilla)
+    n = num_proyectos
+    
+    num_clientes = max(1, n // 4)
+    num_empleados = max(1, n // 2)
+    
+    clientes = pd.DataFrame({
+        'ID_Cliente': np.arange(1, num_clientes + 1),
+        'NombreCliente': [f'Cliente {i}' for i in range(1, num_clientes + 1)]
+    })
+    
+    empleados = pd.DataFrame({
+        'ID_Empleado': np.arange(1, num_empleados + 1),
+        'NombreCompleto': [f'Empleado {i}' for i in range(1, num_empleados + 1)],
+        'Rol': rng.choice(['Desarrollador', 'Tester', 'Analista', 'Gerente'], num_empleados),
+        'Seniority': rng.choice(['Junior', 'Semi-Senior', 'Senior'], num_empleados),
+        'CostoPorHora': rng.uniform(10, 80, num_empleados).round(2)
+    })
+    
+    ids_proyecto = np.arange(1, n + 1)
+    id_cliente = rng.integers(1, num_clientes + 1, n)
+    fecha_inicio = _fechas(rng, n)
+    proyectos = pd.DataFrame({
+        'ID_Proyecto': ids_proyecto,
+        'NombreProyecto': [f'Proyecto {i}' for i in ids_proyecto],
+        'Version': rng.integers(1, 4, n),
+        'FechaInicio': fecha_inicio,
+        'FechaFin': _desplazar(rng, fecha_inicio, 60, 400),
+        'FechaInicioReal': _desplazar(rng, fecha_inicio, -5, 30, nulos=0.05),
+        'EstadoProyecto': rng.choice(['Cerrado', 'Cancelado'], n, p=[0.85, 0.15]),
+        'TipoProyecto': rng.choice(['Interno', 'Externo'], n),
+        'ID_Contrato': ids_proyecto,
+        'ID_Cliente': id_cliente,
+        'ValorTotalContrato': rng.uniform(20000, 300000, n).round(2),
+        'EstadoContrato': 'Cerrado',
+    })
+    proyectos['FechaFinReal'] = _desplazar(rng, proyectos['FechaFin'], -20, 90, nulos=0.05)
+    
+    contratos = proyectos[['ID_Contrato', 'ID_Cliente', 'ID_Proyecto', 'ValorTotalContrato']].copy()
+    contratos['Estado'] = 'Cerrado'
+    
+    # Hitos: 3 por proyecto
+    hitos_proyecto = np.repeat(ids_proyecto, 3)
+    nh = len(hitos_proyecto)
+    hitos_inicio = _fechas(rng, nh)
+    hitos = pd.DataFrame({
+        'ID_Hito': np.arange(1, nh + 1),
+        'ID_Proyecto': hitos_proyecto,
+        'Descripcion': 'Hito',
+        'Estado': 'Completado',
+        'FechaInicio': hitos_inicio,
+        'FechaInicioReal': _desplazar(rng, hitos_inicio, -3, 15, nulos=0.1),
+        'FechaFinPlanificada': _desplazar(rng, hitos_inicio, 20, 90),
+    })
+    hitos['FechaFinReal'] = _desplazar(rng, hitos['FechaFinPlanificada'], -10, 30, nulos=0.1)
+    
+    # Tareas: 3 por hito
+    tareas_hito = np.repeat(hitos['ID_Hito'].to_numpy(), 3)
+    nt = len(tareas_hito)
+    tareas_inicio = _fechas(rng, nt)
+    tareas = pd.DataFrame({
+        'ID_Tarea': np.arange(1, nt + 1),
+        'ID_Hito': tareas_hito,
+        'ID_Proyecto': np.repeat(hitos_proyecto, 3),
+        'NombreTarea': 'Tarea',
+        'Descripcion': 'Tarea',
+        'Estado': 'Completada',
+        'FechaInicioPlanificada': tareas_inicio,
+        'FechaInicioReal': _desplazar(rng, tareas_inicio, 0, 5, nulos=0.1),
+        'FechaFinPlanificada': _desplazar(rng, tareas_inicio, 5, 30),
+    })
+    tareas['FechaFinReal'] = _desplazar(rng, tareas['FechaFinPlanificada'], -2, 10, nulos=0.1)
+    
+    # Pruebas: 2 por hito
+    pruebas_hito = np.repeat(hitos['ID_Hito'].to_numpy(), 2)
+    npr = len(pruebas_hito)
+    pruebas = pd.DataFrame({
+        'ID_Prueba': np.arange(1, npr + 1),
+        'ID_Hito': pruebas_hito,
+        'ID_Proyecto': np.repeat(hitos_proyecto, 2),
+        'TipoPrueba': rng.choice(['Unitaria', 'Integración', 'Aceptación'], npr),
+        'Fecha': _fechas(rng, npr),
+        'Exitosa': (rng.random(npr) < 0.8).astype(int)
+    })
+    
+    # Errores: ~1 por cada 2 tareas
+    ne = nt // 2
+    errores_tarea = rng.integers(1, nt + 1, ne)
+    errores = pd.DataFrame({
+        'ID_Error': np.arange(1, ne + 1),
+        'ID_Tarea': errores_tarea,
+        'ID_Hito': tareas_hito[errores_tarea - 1],
+        'ID_Proyecto': np.repeat(hitos_proyecto, 3)[errores_tarea - 1],
+        'TipoError': rng.choice(['Funcional', 'Rendimiento', 'Seguridad'], ne),
+        'Descripcion': 'Error',
+        'FaseDeteccion': rng.choice(['Desarrollo', 'Pruebas', 'Producción'], ne),
+        'FechaDeteccion': _fechas(rng, ne),
+        'FechaCorreccion': _fechas(rng, ne),
+    })
+    
+    # Asignaciones: 5 por proyecto
+    na = n * 5
+    asig_empleado = rng.integers(1, num_empleados + 1, na)
+    horas_plan = rng.integers(10, 200, na)
+    costo_hora = empleados['CostoPorHora'].to_numpy()[asig_empleado - 1]
+    horas_reales = horas_plan + rng.integers(-10, 40, na)
+    asignaciones = pd.DataFrame({
+        'ID_Asignacion': np.arange(1, na + 1),
+        'ID_Proyecto': np.repeat(ids_proyecto, 5),
+        'ID_Empleado': asig_empleado,
+        'HorasPlanificadas': horas_plan,
+        'HorasReales': horas_reales,
+        'FechaAsignacion': _fechas(rng, na),
+        'CostoPorHora': costo_hora,
+        'costo_real_horas': horas_reales * costo_hora,
+        'costo_planificado_horas': horas_plan * costo_hora,
+    })
+    
+    # Gastos: 6 por proyecto (algunos proyectos sin gastos)
+    ng = n * 6
+    gastos = pd.DataFrame({
+        'ID_Gasto': np.arange(1, ng + 1),
+        'ID_Proyecto': np.repeat(ids_proyecto, 6),
+        'TipoGasto': rng.choice(['Licencias', 'Hardware', 'Viajes', 'Consultoría'], ng),
+        'Categoria': rng.choice(['CAPEX', 'OPEX'], ng),
+        'Monto': rng.uniform(100, 20000, ng).round(2),
+        'Fecha': _fechas(rng, ng),
+    })
+    gastos = gastos[rng.random(ng) > 0.05].reset_index(drop=True)
+    
+    # Penalizaciones: ~30% de los contratos
+    con_penalizacion = ids_proyecto[rng.random(n) < 0.3]
+    npn = len(con_penalizacion)
+    penalizaciones = pd.DataFrame({
+        'ID_Penalizacion': np.arange(1, npn + 1),
+        'ID_Contrato': con_penalizacion,
+        'ID_Cliente': id_cliente[con_penalizacion - 1],
+        'Monto': rng.uniform(500, 15000, npn).round(2),
+        'Motivo': 'Retraso',
+        'Fecha': _fechas(rng, npn),
+    })
+    
+    return {
+        'clientes': clientes,
+        'empleados': empleados,
+        'contratos': contratos,
+        'proyectos': proyectos,
+        'hitos': hitos,
+        'tareas': tareas,
+        'asignaciones': asignaciones,
+        'pruebas': pruebas,
+        'errores': errores,
+        'riesgos': pd.DataFrame(),
+        'gastos': gastos,
+        'penalizaciones': penalizaciones,
+    }
@@ -4,8 +4,11 @@ Módulo de extracción de datos del Sistema de Gestión de Proyectos (SGP)
 REGLAS DE NEGOCIO:
 1. SOLO se extraen datos de proyectos con Estado = 'Cerrado' OR 'Cancelado'
 2. O de contratos con Estado = 'Cerrado' OR 'Cancelado'  
-3. CARGA INCREMENTAL: Solo registros nuevos desde última extracción
-4. Esta regla se aplica en cascada a todas las tablas relacionadas
+3. CARGA INCREMENTAL: Solo proyectos con registros nuevos desde la última carga
+   (marca de agua por tabla = máxima PK AUTO_INCREMENT ya cargada al DW). De cada
+   proyecto afectado se extraen todas sus filas: los hechos se calculan por proyecto
+4. Esta regla se aplica en cascada a todas las tablas relacionadas: cuando un
+   proyecto pasa a Cerrado/Cancelado se extraen todas sus filas hijas
 
 """
 
@@ -13,7 +16,10 @@ import mysql.connector
 import pandas as pd
 from datetime import datetime
 import logging
-from typing import Dict, Any
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterator, Optional, Set
 import sys
 import os
 
@@ -23,18 +29,123 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config.db_config import DB_OLTP
 from utils.helpers import get_connection
 from utils.incremental_control import IncrementalControl
+from utils.snapshots import SnapshotStore
+from utils.dtype_compaction import compact_chunks, compact_dtypes, log_memory_report
+from utils.run_report import active_report, record_stage, stage
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Extracción incremental: tabla -> proyecto en la consulta. Se filtra por los proyectos
+# afectados (con filas nuevas o recién cerrados); clientes y empleados salen así de los
+# contratos y asignaciones de esos proyectos.
+INCREMENTAL_KEYS = {
+    'clientes': 'k.ID_Proyecto',
+    'empleados': 'k.ID_Proyecto',
+    'contratos': 'k.ID_Proyecto',
+    'proyectos': 'p.ID_Proyecto',
+    'hitos': 'k.ID_Proyecto',
+    'tareas': 'kt.ID_Proyecto',
+    'asignaciones': 'k.ID_Proyecto',
+    'pruebas': 'kh.ID_Proyecto',
+    'errores': 'kt.ID_Proyecto',
+    'gastos': 'k.ID_Proyecto',
+    'penalizaciones': 'k.ID_Proyecto',
+}
+
+# Tablas que se extraen completas también en modo incremental: dim_gastos suma el monto
+# de todas sus filas (no se puede recalcular con las de unos pocos proyectos)
+FULL_TABLES = {'gastos', 'penalizaciones'}
+
+# Proyectos (Cerrado/Cancelado) con filas de PK mayor a la marca de agua de cada tabla
+AFFECTED_PROJECT_QUERIES = {
+    'contratos': "SELECT DISTINCT k.ID_Proyecto FROM contratos c "
+                 "INNER JOIN {proyectos} k ON c.ID_Proyecto = k.ID_Proyecto WHERE c.ID_Contrato > %s",
+    'proyectos': "SELECT k.ID_Proyecto FROM {proyectos} k WHERE k.ID_Proyecto > %s",
+    'hitos': "SELECT DISTINCT kh.ID_Proyecto FROM {hitos} kh WHERE kh.ID_Hito > %s",
+    'tareas': "SELECT DISTINCT kt.ID_Proyecto FROM {tareas} kt WHERE kt.ID_Tarea > %s",
+    'asignaciones': "SELECT DISTINCT k.ID_Proyecto FROM asignaciones a "
+                    "INNER JOIN {proyectos} k ON a.ID_Proyecto = k.ID_Proyecto WHERE a.ID_Asignacion > %s",
+    'pruebas': "SELECT DISTINCT kh.ID_Proyecto FROM pruebas pr "
+               "INNER JOIN {hitos} kh ON pr.ID_Hito = kh.ID_Hito WHERE pr.ID_Prueba > %s",
+    'errores': "SELECT DISTINCT kt.ID_Proyecto FROM errores e "
+               "INNER JOIN {tareas} kt ON e.ID_Tarea = kt.ID_Tarea WHERE e.ID_Error > %s",
+    'gastos': "SELECT DISTINCT k.ID_Proyecto FROM gastos g "
+              "INNER JOIN {proyectos} k ON g.ID_Proyecto = k.ID_Proyecto WHERE g.ID_Gasto > %s",
+    'penalizaciones': "SELECT DISTINCT k.ID_Proyecto FROM penalizaciones_contrato p "
+                      "INNER JOIN contratos c ON p.ID_Contrato = c.ID_Contrato "
+                      "INNER JOIN {proyectos} k ON c.ID_Proyecto = k.ID_Proyecto WHERE p.ID_Penalizacion > %s",
+}
+
+# Conjuntos de claves elegibles (proyectos Cerrado/Cancelado y sus hitos y tareas), materializados
+# una vez por ejecución en tablas temporales de cada conexión. Las consultas hijas hacen un solo
+# join contra ellos en lugar de volver a unir proyectos y evaluar p.Estado.
+KEY_SET_TABLES = {
+    'proyectos': 'etl_proyectos_cerrados',
+    'hitos': 'etl_hitos_cerrados',
+    'tareas': 'etl_tareas_cerradas',
+}
+
+# Subconsultas equivalentes si la conexión no puede crear tablas temporales
+KEY_SET_FALLBACK = {
+    'proyectos': "(SELECT ID_Proyecto FROM proyectos WHERE Estado IN ('Cerrado', 'Cancelado'))",
+    'hitos': "(SELECT h.ID_Hito, h.ID_Proyecto FROM hitos h "
+             "INNER JOIN proyectos p ON h.ID_Proyecto = p.ID_Proyecto "
+             "WHERE p.Estado IN ('Cerrado', 'Cancelado'))",
+    'tareas': "(SELECT t.ID_Tarea, t.ID_Hito, h.ID_Proyecto FROM tareas t "
+              "INNER JOIN hitos h ON t.ID_Hito = h.ID_Hito "
+              "INNER JOIN proyectos p ON h.ID_Proyecto = p.ID_Proyecto "
+              "WHERE p.Estado IN ('Cerrado', 'Cancelado'))",
+}
+KEY_SET_BATCH_SIZE = 1000
+
+# Filas por bloque al leer y compactar tipos (utils/dtype_compaction.py)
+COMPACT_CHUNK_SIZE = 10000
+
+# Columna del resultado con la que se avanza la marca de agua de cada tabla
+WATERMARK_COLUMNS = {
+    'contratos': 'ID_Contrato',
+    'proyectos': 'ID_Proyecto',
+    'hitos': 'ID_Hito',
+    'tareas': 'ID_Tarea',
+    'asignaciones': 'ID_Asignacion',
+    'pruebas': 'ID_Prueba',
+    'errores': 'ID_Error',
+    'gastos': 'ID_Gasto',
+    'penalizaciones': 'ID_Penalizacion',
+}
+
 class SGPExtractor:
     
-    def __init__(self, incremental: bool = True):
+    def __init__(self, incremental: bool = True, workers: int = 1, snapshot: bool = False,
+                 compact: bool = True):
+        """
+        Args:
+            incremental: True, solo extrae registros nuevos
+            workers: Conexiones OLTP simultáneas (1 = consultas en serie por una conexión)
+            snapshot: True, guarda las tablas crudas en Parquet (utils/snapshots.py)
+            compact: True, compacta los tipos de cada tabla al leerla (utils/dtype_compaction.py)
+        """
         self.connection = None
+        self.workers = max(1, workers)
+        self.snapshot = snapshot
+        self.snapshot_key = None
+        self.pool = None
+        self.compact = compact
+        self.query_stats = {}
+        self.memory_stats = {}
+        # Metadato de la ejecución (reemplaza la columna fecha_extraccion por fila)
         self.extraction_timestamp = datetime.now()
         self.incremental = incremental
-        self.control = IncrementalControl() if incremental else None
+        # También en modo completo: las marcas de lo extraído quedan pendientes hasta la carga
+        self.control = IncrementalControl()
+        self.watermarks = {}
+        self.closed_projects = set()
+        self.newly_closed = set()
+        self.affected_projects = set()
+        self.failed_tables = []
+        self.key_sets = dict(KEY_SET_FALLBACK)
         
     def connect(self):
         try:
@@ -50,75 +161,272 @@ class SGPExtractor:
             self.connection.close()
             logger.info("Conexión cerrada exitosamente")
     
-    def execute_query(self, query: str, table_name: str) -> pd.DataFrame:
+    def open_pool(self):
+        """Abrir el pool acotado de conexiones OLTP para la extracción en paralelo"""
+        self.pool = queue.Queue()
+        for _ in range(self.workers):
+            self.pool.put(get_connection("OLTP"))
+        logger.info(f"Pool de {self.workers} conexiones OLTP abierto")
+    
+    def close_pool(self):
+        if self.pool is None:
+            return
+        while not self.pool.empty():
+            conexion = self.pool.get()
+            try:
+                conexion.close()
+            except Exception as e:
+                logger.warning(f"Error cerrando conexión del pool: {str(e)}")
+        self.pool = None
+    
+    def execute_query(self, query: str, table_name: str, chunk_size: Optional[int] = None):
+        if chunk_size:
+            return self.iter_query(query, table_name, chunk_size)
+        
+        conexion = self.pool.get() if self.pool is not None else self.connection
+        inicio = time.perf_counter()
         try:
-            df = pd.read_sql(query, self.connection)
+            with stage('extract', table_name, incremental=self.incremental) as registro:
+                if self.compact:
+                    # Leer por bloques y compactar cada uno: la tabla nunca existe entera como objetos
+                    bloques = pd.read_sql(query, conexion, chunksize=COMPACT_CHUNK_SIZE)
+                    df, self.memory_stats[table_name] = compact_chunks(bloques, table_name)
+                    registro['bytes'] = self.memory_stats[table_name]['after']
+                else:
+                    df = pd.read_sql(query, conexion)
+                registro['rows'] = len(df)
+            segundos = time.perf_counter() - inicio
+            self.query_stats[table_name] = {'rows': len(df), 'seconds': segundos}
             mode = "INCREMENTAL" if self.incremental else "COMPLETA"
-            logger.info(f"Extraídos {len(df)} registros de {table_name} [MODO: {mode}]")
+            logger.info(f"Extraídos {len(df)} registros de {table_name} en {segundos:.2f}s [MODO: {mode}]")
             return df
         except Exception as e:
             logger.error(f"Error extrayendo datos de {table_name}: {str(e)}")
+            self.failed_tables.append(table_name)
             return pd.DataFrame()
+        finally:
+            if self.pool is not None:
+                self.pool.put(conexion)
+    
+    def iter_query(self, query: str, table_name: str, chunk_size: int = 50000) -> Iterator[pd.DataFrame]:
+        """
+        Ejecutar una consulta con cursor sin buffer (las filas se quedan en el servidor
+        hasta que se leen) y devolver DataFrames de a lo sumo chunk_size filas
+        """
+        conexion = self.pool.get() if self.pool is not None else self.connection
+        cursor = conexion.cursor(buffered=False)
+        inicio = time.perf_counter()
+        filas = 0
+        terminado = False
+        try:
+            cursor.execute(query)
+            columnas = [col[0] for col in cursor.description]
+            while True:
+                lote = cursor.fetchmany(chunk_size)
+                if not lote:
+                    break
+                filas += len(lote)
+                bloque = pd.DataFrame.from_records(lote, columns=columnas)
+                yield compact_dtypes(bloque) if self.compact else bloque
+            terminado = True
+        except Exception as e:
+            logger.error(f"Error extrayendo datos de {table_name}: {str(e)}")
+            self.failed_tables.append(table_name)
+            raise
+        finally:
+            if not terminado:
+                # Consumidor que abandona el generador: descartar filas pendientes
+                try:
+                    conexion.consume_results()
+                except Exception:
+                    pass
+            cursor.close()
+            if self.pool is not None:
+                self.pool.put(conexion)
+            segundos = time.perf_counter() - inicio
+            self.query_stats[table_name] = {'rows': filas, 'seconds': segundos}
+            record_stage('extract', table_name, segundos, rows=filas, chunk_size=chunk_size,
+                         status='ok' if terminado else 'failed')
+            logger.info(f"Extraídos {filas} registros de {table_name} en {segundos:.2f}s [POR BLOQUES de {chunk_size}]")
+    
+    def extract_chunks(self, table_name: str, chunk_size: int = 50000) -> Iterator[pd.DataFrame]:
+        """Extraer una tabla por bloques con la misma consulta que extract_<tabla>"""
+        extraer = getattr(self, f"extract_{table_name}", None)
+        if extraer is None:
+            raise ValueError(f"Tabla no soportada para extracción: {table_name}")
+        return extraer(chunk_size=chunk_size)
+    
+    def get_closed_projects(self) -> Set[int]:
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("SELECT ID_Proyecto FROM proyectos WHERE Estado IN ('Cerrado', 'Cancelado')")
+            return {int(fila[0]) for fila in cursor.fetchall()}
+        finally:
+            cursor.close()
+    
+    def prepare_incremental(self):
+        """
+        Leer las marcas de agua de la última carga y detectar los proyectos afectados: los que
+        pasaron a Cerrado/Cancelado y los que tienen filas nuevas en alguna tabla
+        """
+        if not self.incremental:
+            return
+        
+        self.watermarks = get_incremental_watermarks(self.control)
+        if not self.watermarks:
+            logger.info("Sin marcas de agua de una carga previa: extracción completa")
+            return
+        
+        self.newly_closed = self.closed_projects - self.control.get_closed_projects()
+        self.affected_projects = set(self.newly_closed)
+        cursor = self.connection.cursor()
+        try:
+            for tabla, consulta in AFFECTED_PROJECT_QUERIES.items():
+                cursor.execute(consulta.format(**self.key_sets), (self.watermarks[tabla],))
+                self.affected_projects.update(int(fila[0]) for fila in cursor.fetchall())
+        finally:
+            cursor.close()
+        logger.info(f"Marcas de agua: {self.watermarks}")
+        logger.info(f"Proyectos recién cerrados/cancelados: {len(self.newly_closed)}, "
+                    f"proyectos afectados: {len(self.affected_projects)} de {len(self.closed_projects)}")
+    
+    def materialize_key_sets(self, conexion) -> bool:
+        """
+        Crear en la conexión las tablas temporales de claves elegibles a partir de la
+        lista de proyectos cerrados leída una sola vez (self.closed_projects)
+        """
+        cursor = conexion.cursor()
+        try:
+            for tabla in KEY_SET_TABLES.values():
+                cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {tabla}")
+            
+            cursor.execute(f"CREATE TEMPORARY TABLE {KEY_SET_TABLES['proyectos']} (ID_Proyecto INT NOT NULL PRIMARY KEY)")
+            ids = sorted(self.closed_projects)
+            for inicio in range(0, len(ids), KEY_SET_BATCH_SIZE):
+                lote = ids[inicio:inicio + KEY_SET_BATCH_SIZE]
+                cursor.execute(f"INSERT INTO {KEY_SET_TABLES['proyectos']} (ID_Proyecto) VALUES "
+                               + ', '.join(['(%s)'] * len(lote)), lote)
+            
+            cursor.execute(f"""
+                CREATE TEMPORARY TABLE {KEY_SET_TABLES['hitos']} (PRIMARY KEY (ID_Hito), KEY (ID_Proyecto))
+                SELECT h.ID_Hito, h.ID_Proyecto
+                FROM hitos h
+                INNER JOIN {KEY_SET_TABLES['proyectos']} k ON h.ID_Proyecto = k.ID_Proyecto
+            """)
+            cursor.execute(f"""
+                CREATE TEMPORARY TABLE {KEY_SET_TABLES['tareas']} (PRIMARY KEY (ID_Tarea), KEY (ID_Hito))
+                SELECT t.ID_Tarea, t.ID_Hito, kh.ID_Proyecto
+                FROM tareas t
+                INNER JOIN {KEY_SET_TABLES['hitos']} kh ON t.ID_Hito = kh.ID_Hito
+            """)
+            conexion.commit()
+            return True
+        except mysql.connector.Error as e:
+            logger.warning(f"No se pudieron crear las tablas temporales de claves: {str(e)}")
+            return False
+        finally:
+            cursor.close()
+    
+    def prepare_key_sets(self):
+        """Materializar los conjuntos de claves en todas las conexiones (principal y pool)"""
+        conexiones = [self.connection]
+        if self.pool is not None:
+            conexiones += list(self.pool.queue)
+        
+        if all(self.materialize_key_sets(conexion) for conexion in conexiones):
+            self.key_sets = dict(KEY_SET_TABLES)
+            logger.info(f"Claves elegibles materializadas: {len(self.closed_projects)} proyectos")
+        else:
+            self.key_sets = dict(KEY_SET_FALLBACK)
+            logger.warning("Usando subconsultas para filtrar proyectos cerrados")
+    
+    def prepare_extraction(self):
+        """Leer una vez los proyectos cerrados, preparar el pool y el modo incremental"""
+        self.closed_projects = self.get_closed_projects()
+        if self.workers > 1:
+            self.open_pool()
+        self.prepare_key_sets()
+        self.prepare_incremental()
     
-    def get_incremental_filter(self) -> str:
+    @property
+    def is_delta(self) -> bool:
+        """True si la extracción es un delta (solo los proyectos afectados)"""
+        return self.incremental and bool(self.watermarks)
+    
+    def get_incremental_filter(self, table_name: str) -> str:
+        """
+        Obtener filtro para carga incremental (se agrega con AND al WHERE o al ON del join
+        con las claves elegibles): todas las filas de los proyectos afectados
+        """
+        if not self.is_delta or table_name not in INCREMENTAL_KEYS or table_name in FULL_TABLES:
+            return ""
+        if not self.affected_projects:
+            return "AND 1 = 0"
+        ids = ', '.join(str(p) for p in sorted(self.affected_projects))
+        return f"AND {INCREMENTAL_KEYS[table_name]} IN ({ids})"
+    
+    def save_watermarks(self, extracted_data: Dict[str, pd.DataFrame]):
         """
-        Obtener filtro para carga incremental
-        PROYECTO ESCOLAR: Siempre hacer carga completa para simplicidad
+        Dejar pendientes las marcas de agua (máxima PK extraída de cada tabla): se confirman
+        con commit_incremental_control() cuando lo extraído llega al DW
         """
-        # Para proyecto escolar: siempre extraer todo (sin filtro incremental)
-        return ""
+        nuevas = {}
+        for table_name, columna in WATERMARK_COLUMNS.items():
+            df = extracted_data.get(table_name)
+            nuevas[table_name] = self.watermarks.get(table_name, 0)
+            if df is not None and not df.empty and columna in df.columns:
+                nuevas[table_name] = max(int(df[columna].max()), nuevas[table_name])
+        self.control.stage_watermarks(nuevas, self.closed_projects,
+                                      self.extraction_timestamp.strftime("%Y-%m-%d %H:%M:%S"))
 
     # ================= TABLAS =================
     
-    def extract_clientes(self) -> pd.DataFrame:
-        query = """
+    def extract_clientes(self, chunk_size: Optional[int] = None) -> pd.DataFrame:
+        query = f"""
         SELECT DISTINCT
             cl.ID_Cliente,
-            cl.NombreCliente,
-            CURRENT_TIMESTAMP as fecha_extraccion
+            cl.NombreCliente
         FROM clientes cl
         INNER JOIN contratos c ON cl.ID_Cliente = c.ID_Cliente
-        INNER JOIN proyectos p ON c.ID_Proyecto = p.ID_Proyecto
-        WHERE p.Estado IN ('Cerrado', 'Cancelado')
+        INNER JOIN {self.key_sets['proyectos']} k ON c.ID_Proyecto = k.ID_Proyecto
+            {self.get_incremental_filter('clientes')}
         ORDER BY cl.ID_Cliente
         """
-        return self.execute_query(query, "clientes")
+        return self.execute_query(query, "clientes", chunk_size)
     
-    def extract_empleados(self) -> pd.DataFrame:
-        query = """
+    def extract_empleados(self, chunk_size: Optional[int] = None) -> pd.DataFrame:
+        query = f"""
         SELECT DISTINCT
             e.ID_Empleado,
             e.NombreCompleto,
             e.Rol,
             e.Seniority,
-            e.CostoPorHora,
-            CURRENT_TIMESTAMP as fecha_extraccion
+            e.CostoPorHora
         FROM empleados e
         INNER JOIN asignaciones a ON e.ID_Empleado = a.ID_Empleado
-        INNER JOIN proyectos p ON a.ID_Proyecto = p.ID_Proyecto
-        WHERE p.Estado IN ('Cerrado', 'Cancelado')
+        INNER JOIN {self.key_sets['proyectos']} k ON a.ID_Proyecto = k.ID_Proyecto
+            {self.get_incremental_filter('empleados')}
         ORDER BY e.ID_Empleado
         """
-        return self.execute_query(query, "empleados")
+        return self.execute_query(query, "empleados", chunk_size)
     
-    def extract_contratos(self) -> pd.DataFrame:
-        query = """
+    def extract_contratos(self, chunk_size: Optional[int] = None) -> pd.DataFrame:
+        query = f"""
         SELECT 
             c.ID_Contrato,
             c.ID_Cliente,
             c.ID_Proyecto,
             c.ValorTotalContrato,
-            c.Estado,
-            CURRENT_TIMESTAMP as fecha_extraccion
+            c.Estado
         FROM contratos c
-        INNER JOIN proyectos p ON c.ID_Proyecto = p.ID_Proyecto
-        WHERE p.Estado IN ('Cerrado', 'Cancelado')
+        INNER JOIN {self.key_sets['proyectos']} k ON c.ID_Proyecto = k.ID_Proyecto
+            {self.get_incremental_filter('contratos')}
         ORDER BY c.ID_Contrato
         """
-        return self.execute_query(query, "contratos")
+        return self.execute_query(query, "contratos", chunk_size)
     
-    def extract_proyectos(self) -> pd.DataFrame:
-        incremental_filter = self.get_incremental_filter()
+    def extract_proyectos(self, chunk_size: Optional[int] = None) -> pd.DataFrame:
+        incremental_filter = self.get_incremental_filter('proyectos')
         
         query = f"""
         SELECT 
@@ -138,18 +446,17 @@ class SGPExtractor:
             CASE 
                 WHEN p.Estado IN ('Cerrado', 'Cancelado') THEN 'Por proyecto'
                 ELSE 'No aplica'
-            END as razon_inclusion,
-            CURRENT_TIMESTAMP as fecha_extraccion
+            END as razon_inclusion
         FROM proyectos p
         LEFT JOIN contratos c ON c.ID_Proyecto = p.ID_Proyecto
         WHERE p.Estado IN ('Cerrado', 'Cancelado')
         {incremental_filter}
         ORDER BY p.ID_Proyecto
         """
-        return self.execute_query(query, "proyectos")
+        return self.execute_query(query, "proyectos", chunk_size)
     
-    def extract_hitos(self) -> pd.DataFrame:
-        query = """
+    def extract_hitos(self, chunk_size: Optional[int] = None) -> pd.DataFrame:
+        query = f"""
         SELECT 
             h.ID_Hito,
             h.ID_Proyecto,
@@ -158,21 +465,20 @@ class SGPExtractor:
             h.FechaInicio,
             h.FechaFinPlanificada,
             h.FechaFinReal,
-            DATEDIFF(IFNULL(h.FechaFinReal, CURDATE()), h.FechaFinPlanificada) as dias_retraso,
-            CURRENT_TIMESTAMP as fecha_extraccion
+            DATEDIFF(IFNULL(h.FechaFinReal, CURDATE()), h.FechaFinPlanificada) as dias_retraso
         FROM hitos h
-        INNER JOIN proyectos p ON h.ID_Proyecto = p.ID_Proyecto
-        WHERE p.Estado IN ('Cerrado', 'Cancelado')
+        INNER JOIN {self.key_sets['proyectos']} k ON h.ID_Proyecto = k.ID_Proyecto
+            {self.get_incremental_filter('hitos')}
         ORDER BY h.ID_Proyecto, h.ID_Hito
         """
-        return self.execute_query(query, "hitos")
+        return self.execute_query(query, "hitos", chunk_size)
     
-    def extract_tareas(self) -> pd.DataFrame:
-        query = """
+    def extract_tareas(self, chunk_size: Optional[int] = None) -> pd.DataFrame:
+        query = f"""
         SELECT 
             t.ID_Tarea,
             t.ID_Hito,
-            h.ID_Proyecto,
+            kt.ID_Proyecto,
             t.NombreTarea,
             t.Descripcion,
             t.Estado,
@@ -180,18 +486,16 @@ class SGPExtractor:
             t.FechaInicioReal,
             t.FechaFinPlanificada,
             t.FechaFinReal,
-            DATEDIFF(IFNULL(t.FechaFinReal, CURDATE()), t.FechaFinPlanificada) as dias_retraso,
-            CURRENT_TIMESTAMP as fecha_extraccion
+            DATEDIFF(IFNULL(t.FechaFinReal, CURDATE()), t.FechaFinPlanificada) as dias_retraso
         FROM tareas t
-        INNER JOIN hitos h ON t.ID_Hito = h.ID_Hito
-        INNER JOIN proyectos p ON h.ID_Proyecto = p.ID_Proyecto
-        WHERE p.Estado IN ('Cerrado', 'Cancelado')
-        ORDER BY h.ID_Proyecto, t.ID_Hito, t.ID_Tarea
+        INNER JOIN {self.key_sets['tareas']} kt ON t.ID_Tarea = kt.ID_Tarea
+            {self.get_incremental_filter('tareas')}
+        ORDER BY kt.ID_Proyecto, t.ID_Hito, t.ID_Tarea
         """
-        return self.execute_query(query, "tareas")
+        return self.execute_query(query, "tareas", chunk_size)
     
-    def extract_asignaciones(self) -> pd.DataFrame:
-        query = """
+    def extract_asignaciones(self, chunk_size: Optional[int] = None) -> pd.DataFrame:
+        query = f"""
         SELECT 
             a.ID_Asignacion,
             a.ID_Proyecto,
@@ -201,95 +505,88 @@ class SGPExtractor:
             a.FechaAsignacion,
             e.CostoPorHora,
             (a.HorasReales * e.CostoPorHora) as costo_real_horas,
-            (a.HorasPlanificadas * e.CostoPorHora) as costo_planificado_horas,
-            CURRENT_TIMESTAMP as fecha_extraccion
+            (a.HorasPlanificadas * e.CostoPorHora) as costo_planificado_horas
         FROM asignaciones a
         INNER JOIN empleados e ON a.ID_Empleado = e.ID_Empleado
-        INNER JOIN proyectos p ON a.ID_Proyecto = p.ID_Proyecto
-        WHERE p.Estado IN ('Cerrado', 'Cancelado')
+        INNER JOIN {self.key_sets['proyectos']} k ON a.ID_Proyecto = k.ID_Proyecto
+            {self.get_incremental_filter('asignaciones')}
         ORDER BY a.ID_Proyecto, a.FechaAsignacion
         """
-        return self.execute_query(query, "asignaciones")
+        return self.execute_query(query, "asignaciones", chunk_size)
     
-    def extract_pruebas(self) -> pd.DataFrame:
-        query = """
+    def extract_pruebas(self, chunk_size: Optional[int] = None) -> pd.DataFrame:
+        query = f"""
         SELECT 
             pr.ID_Prueba,
             pr.ID_Hito,
-            h.ID_Proyecto,
+            kh.ID_Proyecto,
             pr.TipoPrueba,
             pr.Fecha,
-            pr.Exitosa,
-            CURRENT_TIMESTAMP as fecha_extraccion
+            pr.Exitosa
         FROM pruebas pr
-        INNER JOIN hitos h ON pr.ID_Hito = h.ID_Hito
-        INNER JOIN proyectos p ON h.ID_Proyecto = p.ID_Proyecto
-        WHERE p.Estado IN ('Cerrado', 'Cancelado')
-        ORDER BY h.ID_Proyecto, pr.ID_Hito, pr.Fecha
+        INNER JOIN {self.key_sets['hitos']} kh ON pr.ID_Hito = kh.ID_Hito
+            {self.get_incremental_filter('pruebas')}
+        ORDER BY kh.ID_Proyecto, pr.ID_Hito, pr.Fecha
         """
-        return self.execute_query(query, "pruebas")
+        return self.execute_query(query, "pruebas", chunk_size)
     
-    def extract_errores(self) -> pd.DataFrame:
-        query = """
+    def extract_errores(self, chunk_size: Optional[int] = None) -> pd.DataFrame:
+        # ID_Hito e ID_Proyecto salen del conjunto de tareas elegibles: sin join a tareas/hitos/proyectos
+        query = f"""
         SELECT 
             e.ID_Error,
             e.ID_Tarea,
-            t.ID_Hito,
-            h.ID_Proyecto,
+            kt.ID_Hito,
+            kt.ID_Proyecto,
             e.TipoError,
             e.Descripcion,
             e.FaseDeteccion,
             e.FechaDeteccion,
-            e.FechaCorreccion,
-            CURRENT_TIMESTAMP as fecha_extraccion
+            e.FechaCorreccion
         FROM errores e
-        INNER JOIN tareas t ON e.ID_Tarea = t.ID_Tarea
-        INNER JOIN hitos h ON t.ID_Hito = h.ID_Hito
-        INNER JOIN proyectos p ON h.ID_Proyecto = p.ID_Proyecto
-        WHERE p.Estado IN ('Cerrado', 'Cancelado')
-        ORDER BY h.ID_Proyecto, e.FechaDeteccion
+        INNER JOIN {self.key_sets['tareas']} kt ON e.ID_Tarea = kt.ID_Tarea
+            {self.get_incremental_filter('errores')}
+        ORDER BY kt.ID_Proyecto, e.FechaDeteccion
         """
-        return self.execute_query(query, "errores")
+        return self.execute_query(query, "errores", chunk_size)
     
-    def extract_riesgos(self) -> pd.DataFrame:
+    def extract_riesgos(self, chunk_size: Optional[int] = None) -> pd.DataFrame:
         # La tabla riesgos no existe en el esquema real
         logger.info("La tabla 'riesgos' no existe en el esquema actual - retornando DataFrame vacío")
-        return pd.DataFrame()
+        return iter([]) if chunk_size else pd.DataFrame()
     
-    def extract_gastos(self) -> pd.DataFrame:
-        query = """
+    def extract_gastos(self, chunk_size: Optional[int] = None) -> pd.DataFrame:
+        query = f"""
         SELECT 
             g.ID_Gasto,
             g.ID_Proyecto,
             g.TipoGasto,
             g.Categoria,
             g.Monto,
-            g.Fecha,
-            CURRENT_TIMESTAMP as fecha_extraccion
+            g.Fecha
         FROM gastos g
-        INNER JOIN proyectos p ON g.ID_Proyecto = p.ID_Proyecto
-        WHERE p.Estado IN ('Cerrado', 'Cancelado')
+        INNER JOIN {self.key_sets['proyectos']} k ON g.ID_Proyecto = k.ID_Proyecto
+            {self.get_incremental_filter('gastos')}
         ORDER BY g.ID_Proyecto, g.Fecha
         """
-        return self.execute_query(query, "gastos")
+        return self.execute_query(query, "gastos", chunk_size)
     
-    def extract_penalizaciones(self) -> pd.DataFrame:
-        query = """
+    def extract_penalizaciones(self, chunk_size: Optional[int] = None) -> pd.DataFrame:
+        query = f"""
         SELECT 
             p.ID_Penalizacion,
             p.ID_Contrato,
             c.ID_Cliente,
             p.Monto,
             p.Motivo,
-            p.Fecha,
-            CURRENT_TIMESTAMP as fecha_extraccion
+            p.Fecha
         FROM penalizaciones_contrato p
         INNER JOIN contratos c ON p.ID_Contrato = c.ID_Contrato
-        INNER JOIN proyectos pr ON c.ID_Proyecto = pr.ID_Proyecto
-        WHERE pr.Estado IN ('Cerrado', 'Cancelado')
+        INNER JOIN {self.key_sets['proyectos']} k ON c.ID_Proyecto = k.ID_Proyecto
+            {self.get_incremental_filter('penalizaciones')}
         ORDER BY p.ID_Contrato, p.Fecha
         """
-        return self.execute_query(query, "penalizaciones")
+        return self.execute_query(query, "penalizaciones", chunk_size)
 
     # ================= MÉTODO PRINCIPAL =================
     
@@ -305,60 +602,130 @@ class SGPExtractor:
         
         try:
             mode_msg = "INCREMENTAL" if self.incremental else "COMPLETA"
-            if self.incremental and self.control:
+            # Marcas pendientes de una ejecución anterior que no llegó al DW: se descartan
+            self.control.discard_pending()
+            self.prepare_extraction()
+            if self.incremental:
                 last_date = self.control.get_last_extraction_date()
                 logger.info(f"=== EXTRACCIÓN {mode_msg} - Desde: {last_date} ===")
             else:
                 logger.info(f"=== EXTRACCIÓN {mode_msg} ===")
             
             # 1. Tablas
-            logger.info("--- Extrayendo Tablas ---")
-            extracted_data['clientes'] = self.extract_clientes()
-            extracted_data['empleados'] = self.extract_empleados()
-            extracted_data['contratos'] = self.extract_contratos()
-            extracted_data['proyectos'] = self.extract_proyectos()
-            extracted_data['hitos'] = self.extract_hitos()
-            extracted_data['tareas'] = self.extract_tareas()
-            extracted_data['asignaciones'] = self.extract_asignaciones()
-            extracted_data['pruebas'] = self.extract_pruebas()
-            extracted_data['errores'] = self.extract_errores()
-            extracted_data['riesgos'] = self.extract_riesgos()
-            extracted_data['gastos'] = self.extract_gastos()
-            extracted_data['penalizaciones'] = self.extract_penalizaciones()
+            extracciones = {
+                'clientes': self.extract_clientes,
+                'empleados': self.extract_empleados,
+                'contratos': self.extract_contratos,
+                'proyectos': self.extract_proyectos,
+                'hitos': self.extract_hitos,
+                'tareas': self.extract_tareas,
+                'asignaciones': self.extract_asignaciones,
+                'pruebas': self.extract_pruebas,
+                'errores': self.extract_errores,
+                'riesgos': self.extract_riesgos,
+                'gastos': self.extract_gastos,
+                'penalizaciones': self.extract_penalizaciones,
+            }
+            
+            inicio = time.perf_counter()
+            if self.workers > 1:
+                # Las consultas son independientes: se reparten en el pool de conexiones
+                logger.info(f"--- Extrayendo Tablas en paralelo ({self.workers} conexiones) ---")
+                with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                    futuros = {nombre: executor.submit(extraer) for nombre, extraer in extracciones.items()}
+                    for nombre, futuro in futuros.items():
+                        extracted_data[nombre] = futuro.result()
+            else:
+                logger.info("--- Extrayendo Tablas ---")
+                for nombre, extraer in extracciones.items():
+                    extracted_data[nombre] = extraer()
+            total_seconds = time.perf_counter() - inicio
             
             logger.info("=== EXTRACCIÓN COMPLETADA EXITOSAMENTE ===")
+            suma_consultas = sum(stats['seconds'] for stats in self.query_stats.values())
+            logger.info(f"Tiempo de extracción: {total_seconds:.2f}s (suma por consulta: {suma_consultas:.2f}s)")
             
             # Resumen de extracción
             total_records = sum(len(df) for df in extracted_data.values())
             logger.info(f"Total de registros extraídos: {total_records}")
             
             for table_name, df in extracted_data.items():
-                logger.info(f"  - {table_name}: {len(df)} registros")
+                stats = self.query_stats.get(table_name)
+                if stats:
+                    logger.info(f"  - {table_name}: {len(df)} registros ({stats['seconds']:.2f}s)")
+                else:
+                    logger.info(f"  - {table_name}: {len(df)} registros")
+            log_memory_report(self.memory_stats)
+            if active_report() and self.memory_stats:
+                active_report().extra['extract_memory'] = self.memory_stats
             
-            # Actualizar fecha de control si hay datos nuevos
-            if self.incremental and self.control and total_records > 0:
-                self.control.update_last_extraction_date()
-                logger.info("Fecha de control incremental actualizada")
+            # Marcas de agua pendientes solo si todas las consultas terminaron bien:
+            # si no, la cascada de los proyectos recién cerrados se perdería
+            if self.failed_tables:
+                logger.warning(f"Marcas de agua sin actualizar, fallaron: {', '.join(self.failed_tables)}")
+            else:
+                self.save_watermarks(extracted_data)
+                logger.info("Marcas de agua pendientes: se confirman al cargar el DW")
+            
+            if self.snapshot and not self.failed_tables:
+                self.snapshot_key = SnapshotStore().save(
+                    extracted_data, self.extraction_timestamp, incremental=self.is_delta)
                 
         except Exception as e:
             logger.error(f"Error durante la extracción: {str(e)}")
         finally:
+            self.close_pool()
             self.disconnect()
             
         return extracted_data
 
 
-def extract_all(incremental: bool = True) -> Dict[str, pd.DataFrame]:
+def extract_all(incremental: bool = True, workers: int = 1, snapshot: bool = False,
+                compact: bool = True) -> Dict[str, pd.DataFrame]:
     """
     Función principal para extraer todos los datos
     
     Args:
         incremental: True, solo extrae registros nuevos
                     False, carga completa
+        workers: Consultas simultáneas (una conexión OLTP por consulta en curso)
+        snapshot: True, guarda un snapshot Parquet de lo extraído
+        compact: True, tipos compactos (category, datetime64, enteros reducidos)
     """
-    extractor = SGPExtractor(incremental=incremental)
+    extractor = SGPExtractor(incremental=incremental, workers=workers, snapshot=snapshot, compact=compact)
     return extractor.extract_all()
 
+def extract_chunks(table_name: str, chunk_size: int = 50000, incremental: bool = False) -> Iterator[pd.DataFrame]:
+    """
+    Extraer una tabla en bloques de chunk_size filas sin materializarla completa.
+    La conexión se cierra al agotar (o cerrar) el generador.
+    
+    Args:
+        table_name: Tabla de extract_all ('asignaciones', 'errores', ...)
+        chunk_size: Filas por DataFrame
+        incremental: True, aplica las marcas de agua (no las avanza)
+    """
+    extractor = SGPExtractor(incremental=incremental)
+    if not extractor.connect():
+        raise ConnectionError("No se pudo conectar a SGP")
+    try:
+        extractor.prepare_extraction()
+        yield from extractor.extract_chunks(table_name, chunk_size)
+    finally:
+        extractor.disconnect()
+
+def get_incremental_watermarks(control: Optional[IncrementalControl] = None) -> Dict[str, int]:
+    """
+    Marcas de agua de la última carga al DW; vacío (extracción completa) si falta la de
+    alguna tabla
+    """
+    marcas = (control or IncrementalControl()).get_watermarks()
+    return marcas if set(WATERMARK_COLUMNS) <= set(marcas) else {}
+
+def commit_incremental_control() -> bool:
+    """Confirmar las marcas de agua pendientes de la última extracción (tras cargarla al DW)"""
+    return IncrementalControl().commit_watermarks()
+
 def reset_incremental_control():
     from utils.incremental_control import IncrementalControl
     control = IncrementalControl()
@@ -3,10 +3,16 @@ Módulo de Carga (Load) - ETL Proyecto Escolar
 Carga datos transformados al Data Warehouse (MySQL)
 """
 import pandas as pd
+import numpy as np
 import mysql.connector
 from mysql.connector import Error as MySQLError
 import logging
-from typing import Dict
+import csv
+import tempfile
+import time
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
 import sys
 import os
 
@@ -14,20 +20,60 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config.db_config import DB_DW
+from utils.run_report import stage
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
+# Errores MySQL que indican que LOAD DATA LOCAL INFILE no está permitido
+# 1148: comando no permitido, 2068: rechazado por el cliente, 3948: local_infile desactivado en el servidor
+LOCAL_INFILE_ERRORS = {1148, 2068, 3948}
+
+# INSERT multi-fila: tamaño objetivo por sentencia. Por encima de unos pocos MB el
+# rendimiento casi no mejora; el factor deja margen ante filas más anchas que la muestra.
+MAX_STATEMENT_BYTES = 4 * 1024 * 1024
+PACKET_SAFETY_FACTOR = 0.5
+DEFAULT_MAX_ALLOWED_PACKET = 4 * 1024 * 1024
+ROW_SAMPLE_SIZE = 200
+
+# Carga con staging: se carga en <tabla>_staging y se publica con un único RENAME TABLE
+STAGING_SUFFIX = '_staging'
+OLD_SUFFIX = '_old'
+
+# Modo merge: hash por fila guardado en una tabla lateral (no se altera el esquema del DW)
+ROW_HASHES_TABLE = 'etl_row_hashes'
+ROW_HASHES_SCHEMA = """
+    tabla VARCHAR(64) NOT NULL,
+    clave VARCHAR(255) NOT NULL,
+    hash BIGINT UNSIGNED NOT NULL,
+    PRIMARY KEY (tabla, clave)
+"""
+DELETE_BATCH_SIZE = 1000
+
 class DWLoader:
-    def __init__(self):
+    def __init__(self, bulk: bool = False):
+        """
+        Args:
+            bulk: Si True, carga con LOAD DATA LOCAL INFILE (con respaldo a executemany)
+        """
         self.connection = None
         self.cursor = None
+        self.bulk = bulk
+        self.load_stats = {}
+        self.last_insert_stats = {}
+        self.last_merge_stats = {}
+        self.max_allowed_packet = None
     
     def connect(self):
         try:
-            self.connection = mysql.connector.connect(**DB_DW)
+            if self.bulk:
+                self.connection = mysql.connector.connect(**DB_DW, allow_local_infile=True)
+            else:
+                self.connection = mysql.connector.connect(**DB_DW)
             self.cursor = self.connection.cursor()
             logger.info("Conexión establecida con DW exitosamente")
+            if self.bulk:
+                self._check_local_infile()
             return True
         except Exception as e:
             logger.error(f"Error conectando al DW: {str(e)}")
@@ -88,44 +134,236 @@ class DWLoader:
             logger.warning(f"Error vaciando tabla {table_name}: {str(e)}")
             return False
     
-    def convert_pandas_types(self, df: pd.DataFrame) -> pd.DataFrame:
-        df_converted = df.copy()
+    @staticmethod
+    def column_to_native(serie: pd.Series) -> list:
+        """
+        Convertir una columna completa a objetos Python nativos en una sola pasada
+        (numpy -> int/float/bool, NaN/NaT -> None, fechas -> 'YYYY-MM-DD')
+        """
+        dtype = serie.dtype
         
-        # Convertir todos los valores a tipos Python nativos
-        for col in df_converted.columns:
-            
-            # Manejar fechas especialmente
-            if df_converted[col].dtype.name == 'object':
-                # Verificar si es una columna de fechas
-                first_non_null = df_converted[col].dropna().iloc[0] if not df_converted[col].dropna().empty else None
-                if first_non_null and hasattr(first_non_null, 'date'):
-                    # Es una fecha, convertir a string en formato MySQL
-                    df_converted[col] = df_converted[col].apply(lambda x: x.strftime('%Y-%m-%d') if x is not None else None)
-                else:
-                    # Es string u object regular
-                    df_converted[col] = df_converted[col].where(pd.notnull(df_converted[col]), None)
-            
-            # Luego convertir tipos numéricos
-            elif df_converted[col].dtype.name.startswith('int'):
-                # Convertir cualquier tipo de entero a int Python
-                df_converted[col] = df_converted[col].apply(lambda x: int(x) if pd.notnull(x) else None)
-            elif df_converted[col].dtype.name.startswith('float'):
-                # Convertir cualquier tipo de float a float Python
-                df_converted[col] = df_converted[col].apply(lambda x: float(x) if pd.notnull(x) else None)
-            elif df_converted[col].dtype.name == 'bool':
-                # Convertir bool a bool Python
-                df_converted[col] = df_converted[col].apply(lambda x: bool(x) if pd.notnull(x) else None)
-            else:
-                # Para otros tipos, simplemente reemplazar NaN con None
-                df_converted[col] = df_converted[col].where(pd.notnull(df_converted[col]), None)
+        if dtype.kind in 'iub':
+            # Enteros y booleanos numpy no tienen nulos: tolist() ya produce tipos nativos
+            return serie.to_numpy().tolist()
         
-        return df_converted
+        if dtype.kind == 'M':
+            valores = np.asarray(serie.dt.to_pydatetime(), dtype=object)
+        elif dtype == object:
+            valores = serie.to_numpy(dtype=object)
+            no_nulos = serie.dropna()
+            primero = no_nulos.iloc[0] if not no_nulos.empty else None
+            if primero is not None and hasattr(primero, 'date'):
+                # Es una columna de fechas, convertir a string en formato MySQL
+                valores = np.array([v.strftime('%Y-%m-%d') if v is not None and not pd.isna(v) else None
+                                    for v in valores], dtype=object)
+        else:
+            # float, nullable (Int64, boolean...), category: astype(object) produce escalares nativos
+            valores = serie.to_numpy(dtype=object)
+        
+        nulos = pd.isna(serie).to_numpy()
+        if nulos.any():
+            valores = valores.copy()
+            valores[nulos] = None
+        return valores.tolist()
+    
+    def iter_row_batches(self, df: pd.DataFrame, batch_size: int = 1000):
+        """
+        Generar lotes de tuplas listos para executemany.
+        Solo se convierte el lote actual, así la memoria pico es un lote y no una copia de la tabla.
+        """
+        for inicio in range(0, len(df), batch_size):
+            lote = df.iloc[inicio:inicio + batch_size]
+            columnas = [self.column_to_native(lote[col]) for col in lote.columns]
+            yield list(zip(*columnas))
+    
+    def get_statement_budget(self) -> int:
+        """Bytes máximos por sentencia INSERT según max_allowed_packet del servidor"""
+        if self.max_allowed_packet is None:
+            try:
+                self.cursor.execute("SELECT @@max_allowed_packet")
+                self.max_allowed_packet = int(self.cursor.fetchone()[0])
+            except Exception as e:
+                logger.warning(f"No se pudo leer max_allowed_packet, usando {DEFAULT_MAX_ALLOWED_PACKET}: {str(e)}")
+                self.max_allowed_packet = DEFAULT_MAX_ALLOWED_PACKET
+        return int(min(self.max_allowed_packet * PACKET_SAFETY_FACTOR, MAX_STATEMENT_BYTES))
+    
+    @staticmethod
+    def estimate_row_bytes(rows: list) -> float:
+        """Ancho medio estimado de una fila como literal SQL: (v1, 'v2', NULL)"""
+        if not rows:
+            return 1.0
+        total = 0
+        for row in rows:
+            total += 4 + 2 * len(row)  # "(", ")", ", " entre filas y separadores entre valores
+            for value in row:
+                if value is None:
+                    total += 4
+                elif isinstance(value, str):
+                    total += len(value.encode('utf-8')) + 2
+                else:
+                    total += len(str(value)) + 2
+        return total / len(rows)
+    
+    def _check_local_infile(self):
+        """Desactivar el modo bulk si el servidor no permite LOAD DATA LOCAL INFILE"""
+        try:
+            self.cursor.execute("SELECT @@GLOBAL.local_infile")
+            habilitado = self.cursor.fetchone()[0]
+        except mysql.connector.Error as e:
+            logger.warning(f"No se pudo consultar local_infile: {str(e)}")
+            return
+        if not habilitado:
+            logger.warning("El servidor no permite LOAD DATA LOCAL INFILE. Usando INSERT por lotes.")
+            self.bulk = False
     
     def load_dataframe_to_table(self, df: pd.DataFrame, table_name: str, mode: str = 'replace'):
         if df.empty:
             logger.warning(f"DataFrame vacío para tabla {table_name}")
             return 0
         
+        inicio = time.perf_counter()
+        
+        if mode in ('merge', 'upsert'):
+            self.last_insert_stats = {}
+            total_changed = self.load_with_merge(df, table_name, delete_missing=(mode == 'merge'))
+            self._report_load(table_name, total_changed, time.perf_counter() - inicio, 'MERGE')
+            return total_changed
+        
+        metodo = 'LOAD DATA' if self.bulk else 'INSERT'
+        total_inserted = None
+        
+        if self.bulk:
+            try:
+                total_inserted = self.load_with_infile(df, table_name, mode)
+            except mysql.connector.Error as e:
+                if e.errno not in LOCAL_INFILE_ERRORS:
+                    logger.error(f" Error cargando {table_name}: {str(e)}")
+                    raise
+                logger.warning(f"LOAD DATA LOCAL INFILE no permitido ({e.errno}). Usando INSERT por lotes.")
+                self.bulk = False
+                metodo = 'INSERT'
+        
+        if total_inserted is None:
+            self.last_insert_stats = {}
+            total_inserted = self.load_with_insert(df, table_name, mode)
+        
+        self._report_load(table_name, total_inserted, time.perf_counter() - inicio, metodo)
+        return total_inserted
+    
+    def load_chunks(self, chunks: Iterable[pd.DataFrame], table_name: str, mode: str = 'replace') -> int:
+        """
+        Cargar una tabla bloque por bloque (p. ej. desde extract_chunks + transform_chunks)
+        sin reunir todos los bloques en memoria
+        """
+        if mode in ('merge', 'upsert'):
+            raise ValueError(f"mode='{mode}' compara por hash de fila: no admite carga por bloques")
+        if mode == 'replace':
+            self.truncate_table(table_name)
+        
+        inicio = time.perf_counter()
+        total_inserted = 0
+        bloques = 0
+        metodo = 'INSERT'
+        for chunk in chunks:
+            if chunk.empty:
+                continue
+            total_inserted += self.load_dataframe_to_table(chunk, table_name, mode='append')
+            metodo = self.load_stats[table_name]['method']
+            bloques += 1
+        
+        self.last_insert_stats = {}
+        self._report_load(table_name, total_inserted, time.perf_counter() - inicio, metodo)
+        self.load_stats[table_name]['chunks'] = bloques
+        return total_inserted
+    
+    def _report_load(self, table_name: str, rows: int, seconds: float, method: str):
+        """Registrar y mostrar la velocidad de carga de una tabla"""
+        rate = rows / seconds if seconds > 0 else 0.0
+        stats = {'rows': rows, 'seconds': seconds, 'rows_per_sec': rate, 'method': method}
+        mensaje = f" {table_name}: {rows:,} registros en {seconds:.2f}s ({rate:,.0f} registros/s) [{method}]"
+        
+        if method == 'MERGE':
+            merge = self.last_merge_stats
+            stats.update(merge)
+            mensaje += (f" - {merge['inserted']:,} insertados, {merge['updated']:,} actualizados, "
+                        f"{merge['deleted']:,} eliminados, {merge['unchanged']:,} sin cambios")
+        
+        if method in ('INSERT', 'MERGE') and self.last_insert_stats.get('statements'):
+            statements = self.last_insert_stats['statements']
+            bytes_sent = self.last_insert_stats['bytes']
+            stats.update({
+                'statements': statements,
+                'bytes': bytes_sent,
+                'statements_per_sec': statements / seconds if seconds > 0 else 0.0,
+                'bytes_per_sec': bytes_sent / seconds if seconds > 0 else 0.0,
+            })
+            mensaje += (f" - {statements} sentencias ({stats['statements_per_sec']:,.1f}/s, "
+                        f"{rows / statements:,.0f} filas/sentencia, {stats['bytes_per_sec'] / 2**20:,.2f} MB/s)")
+        
+        self.load_stats[table_name] = stats
+        logger.info(mensaje)
+    
+    def prepare_for_infile(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Preparar columnas para escribir el CSV que lee LOAD DATA:
+        booleanos y flotantes enteros se escriben como enteros (evita '1.0' en columnas INT)
+        """
+        columnas = [col for col in df.columns if '_date' not in col.lower()]
+        df_bulk = df[columnas].copy()
+        
+        for col in df_bulk.columns:
+            serie = df_bulk[col]
+            if serie.dtype == bool:
+                df_bulk[col] = serie.astype(int)
+            elif serie.dtype.kind == 'f':
+                valores = serie.dropna().to_numpy()
+                if len(valores) and np.isfinite(valores).all() and (valores == np.round(valores)).all() \
+                        and np.abs(valores).max() < 2 ** 63:
+                    df_bulk[col] = serie.astype('Int64')
+        
+        return df_bulk
+    
+    def load_with_infile(self, df: pd.DataFrame, table_name: str, mode: str = 'replace') -> int:
+        """
+        Cargar un DataFrame escribiéndolo como CSV temporal y usando LOAD DATA LOCAL INFILE.
+        NULL se escribe sin comillas (FIELDS ENCLOSED BY no vacío lo interpreta como NULL).
+        """
+        self.cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+        df_bulk = self.prepare_for_infile(df)
+        
+        fd, path = tempfile.mkstemp(prefix=f'{table_name}_', suffix='.csv')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+                df_bulk.to_csv(
+                    f, index=False, header=False, na_rep='NULL',
+                    quoting=csv.QUOTE_MINIMAL, lineterminator='\n',
+                    date_format='%Y-%m-%d %H:%M:%S'
+                )
+            
+            if mode == 'replace':
+                logger.debug(f"Vaciando tabla {table_name}...")
+                self.truncate_table(table_name)
+            
+            columns = ', '.join(df_bulk.columns)
+            ruta = path.replace('\\', '/')
+            load_query = (
+                f"LOAD DATA LOCAL INFILE '{ruta}' INTO TABLE {table_name} "
+                "CHARACTER SET utf8mb4 "
+                "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+                "LINES TERMINATED BY '\\n' "
+                f"({columns})"
+            )
+            self.cursor.execute(load_query)
+            total_inserted = self.cursor.rowcount
+            self.connection.commit()
+            return total_inserted
+        except Exception:
+            self.connection.rollback()
+            raise
+        finally:
+            os.remove(path)
+    
+    def load_with_insert(self, df: pd.DataFrame, table_name: str, mode: str = 'replace', upsert: bool = False):
         try:
             # Asegurar que FK checks estén desactivados
             self.cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
@@ -135,49 +373,16 @@ class DWLoader:
             logger.debug(f"  Columnas: {list(df.columns)}")
             logger.debug(f"  Tipos: {df.dtypes.to_dict()}")
             
-            # Convertir tipos de pandas a tipos compatibles con MySQL
-            df_converted = self.convert_pandas_types(df)
-            
             # Limpiar columnas no deseadas que pueden crearse por pandas
-            # Eliminar cualquier columna con sufijo '_date' o similar que no esté en el original
-            original_columns = set(df.columns)
-            current_columns = set(df_converted.columns)
-            extra_columns = current_columns - original_columns
-            
-            # También buscar columnas con patrones problemáticos
-            suspicious_columns = [col for col in df_converted.columns if '_date' in col.lower()]
-            
-            if extra_columns:
-                logger.warning(f"Eliminando columnas extra generadas: {extra_columns}")
-                df_converted = df_converted.drop(columns=list(extra_columns))
+            suspicious_columns = [col for col in df.columns if '_date' in col.lower()]
+            df_converted = df
             
             if suspicious_columns:
                 logger.warning(f"Eliminando columnas sospechosas: {suspicious_columns}")
-                df_converted = df_converted.drop(columns=suspicious_columns, errors='ignore')
-            
-            # Debug: mostrar datos después de conversión
-            logger.debug(f"DESPUÉS conversión - Tabla: {table_name}")
-            logger.debug(f"  Columnas: {list(df_converted.columns)}")
-            logger.debug(f"  Tipos: {df_converted.dtypes.to_dict()}")
+                df_converted = df.drop(columns=suspicious_columns)
             
-            # Preparar datos
             records_to_insert = len(df_converted)
             
-            # Convertir DataFrame a lista de tuplas (aplicando conversión de tipos)
-            converted_rows = []
-            for _, row in df_converted.iterrows():
-                converted_row = []
-                for value in row:
-                    if pd.isna(value):
-                        converted_row.append(None)
-                    elif hasattr(value, 'item'):  # Para tipos numpy
-                        converted_row.append(value.item())  # Convierte numpy.int64 a int Python
-                    else:
-                        converted_row.append(value)
-                converted_rows.append(tuple(converted_row))
-            
-            data_tuples = converted_rows
-            
             # Crear placeholders para INSERT
             placeholders = ', '.join(['%s'] * len(df_converted.columns))
             columns = ', '.join(df_converted.columns)
@@ -193,23 +398,49 @@ class DWLoader:
                 logger.debug(f"Vaciando tabla {table_name}...")
                 self.truncate_table(table_name)
             
-            # INSERT datos
-            insert_query = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})"
+            # INSERT multi-fila: las filas por sentencia se ajustan al ancho medido de las filas
+            # para quedar por debajo de max_allowed_packet
+            insert_prefix = f"INSERT INTO {table_name} ({columns}) VALUES "
+            row_placeholder = f"({placeholders})"
+            insert_suffix = ""
+            if upsert:
+                # Claves existentes: actualizar todas las columnas con los valores nuevos
+                insert_suffix = " ON DUPLICATE KEY UPDATE " + ', '.join(
+                    f"{col} = VALUES({col})" for col in df_converted.columns)
+            budget = self.get_statement_budget() - len(insert_prefix) - len(insert_suffix)
+            
+            muestra = next(self.iter_row_batches(df_converted.iloc[:ROW_SAMPLE_SIZE], ROW_SAMPLE_SIZE))
+            rows_per_statement = max(1, int(budget / self.estimate_row_bytes(muestra)))
+            logger.debug(f"{table_name}: {rows_per_statement} filas por sentencia (presupuesto {budget:,} bytes)")
             
-            # Insertar en lotes para mejor rendimiento
-            batch_size = 1000
             total_inserted = 0
+            statements = 0
+            bytes_sent = 0
             
-            for i in range(0, len(data_tuples), batch_size):
-                batch = data_tuples[i:i + batch_size]
-                self.cursor.executemany(insert_query, batch)
+            while total_inserted < records_to_insert:
+                lote = df_converted.iloc[total_inserted:total_inserted + rows_per_statement]
+                batch = next(self.iter_row_batches(lote, len(lote)))
+                query = insert_prefix + ', '.join([row_placeholder] * len(batch)) + insert_suffix
+                self.cursor.execute(query, [value for row in batch for value in row])
+                
+                # Medir el tamaño real de la sentencia enviada y reajustar filas por sentencia
+                statement = getattr(self.cursor, 'statement', None) or ''
+                statement_bytes = len(statement) if isinstance(statement, bytes) else len(statement.encode('utf-8'))
+                if statement_bytes:
+                    row_bytes = max(1.0, (statement_bytes - len(insert_prefix) - len(insert_suffix)) / len(batch))
+                    rows_per_statement = max(1, int(budget / row_bytes))
+                
                 total_inserted += len(batch)
+                statements += 1
+                bytes_sent += statement_bytes
                 
-                if total_inserted % 5000 == 0:
+                if statements % 10 == 0:
                     logger.debug(f"{table_name}: {total_inserted}/{records_to_insert} registros insertados")
             
+            self.last_insert_stats = {'statements': statements, 'bytes': bytes_sent}
+            
             self.connection.commit()
-            logger.info(f" {table_name}: {total_inserted} registros cargados exitosamente")
+            logger.debug(f" {table_name}: {total_inserted} registros cargados exitosamente")
             return total_inserted
             
         except Exception as e:
@@ -217,6 +448,297 @@ class DWLoader:
             logger.error(f" Error cargando {table_name}: {str(e)}")
             raise
 
+    def add_missing_columns(self, table_name: str) -> list:
+        """
+        Agregar a una tabla existente las columnas de get_table_schemas() que le faltan
+        (p. ej. la jerarquía de dim_tiempo en un DW creado con una versión anterior)
+        """
+        schema = get_table_schemas().get(table_name)
+        if schema is None:
+            return []
+        
+        definiciones = {}
+        for linea in schema.splitlines():
+            linea = linea.strip().rstrip(',')
+            if linea and linea.split()[0].upper() not in ('INDEX', 'UNIQUE', 'PRIMARY', 'KEY', 'FOREIGN'):
+                definiciones[linea.split()[0]] = linea
+        
+        self.cursor.execute(
+            "SELECT COLUMN_NAME FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s", (table_name,)
+        )
+        existentes = {fila[0] for fila in self.cursor.fetchall()}
+        if not existentes:
+            return []
+        
+        faltantes = [col for col in definiciones if col not in existentes]
+        try:
+            for col in faltantes:
+                self.cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN {definiciones[col]}")
+                logger.info(f"Columna {table_name}.{col} agregada al DW")
+            self.connection.commit()
+        except mysql.connector.Error as e:
+            logger.warning(f"No se pudieron agregar columnas a {table_name}: {str(e)}")
+        return faltantes
+    
+    def get_primary_key(self, table_name: str) -> list:
+        self.cursor.execute(f"SHOW KEYS FROM {table_name} WHERE Key_name = 'PRIMARY'")
+        filas = sorted(self.cursor.fetchall(), key=lambda fila: fila[3])  # Seq_in_index
+        return [fila[4] for fila in filas]  # Column_name
+    
+    @staticmethod
+    def row_keys(df: pd.DataFrame, key_columns: list) -> pd.Series:
+        """Clave de cada fila como texto ('1', '1|2' si es compuesta), igual a la guardada en el DW"""
+        partes = []
+        for col in key_columns:
+            serie = df[col]
+            if serie.dtype.kind == 'f' and serie.dropna().mod(1).eq(0).all():
+                serie = serie.astype('Int64')
+            partes.append(serie.astype(str))
+        claves = partes[0]
+        for parte in partes[1:]:
+            claves = claves + '|' + parte
+        return claves.reset_index(drop=True)
+    
+    @staticmethod
+    def row_hashes(df: pd.DataFrame) -> pd.Series:
+        """Hash de contenido por fila (uint64), calculado por columnas sin recorrer filas"""
+        return pd.util.hash_pandas_object(df, index=False).reset_index(drop=True)
+    
+    def get_stored_hashes(self, table_name: str) -> pd.Series:
+        self.create_table_if_not_exists(ROW_HASHES_TABLE, ROW_HASHES_SCHEMA)
+        self.cursor.execute(f"SELECT clave, hash FROM {ROW_HASHES_TABLE} WHERE tabla = %s", (table_name,))
+        filas = self.cursor.fetchall()
+        if not filas:
+            return pd.Series(dtype='uint64', index=pd.Index([], dtype=object))
+        claves, hashes = zip(*filas)
+        return pd.Series(np.array(hashes, dtype='uint64'), index=pd.Index(claves, dtype=object))
+    
+    def get_table_keys(self, table_name: str, key_columns: list) -> pd.Index:
+        """Claves primarias presentes en la tabla, en el mismo formato que row_keys"""
+        self.cursor.execute(f"SELECT {', '.join(key_columns)} FROM {table_name}")
+        existentes = pd.DataFrame(self.cursor.fetchall(), columns=key_columns)
+        if existentes.empty:
+            return pd.Index([], dtype=object)
+        return pd.Index(self.row_keys(existentes, key_columns))
+    
+    @staticmethod
+    def merge_frame(df: pd.DataFrame) -> pd.DataFrame:
+        """Columnas que se escriben y comparan por hash (sin las que load_with_insert descarta)"""
+        suspicious_columns = [col for col in df.columns if '_date' in col.lower()]
+        return df.drop(columns=suspicious_columns).reset_index(drop=True)
+    
+    def row_hash_frame(self, table_name: str, df: pd.DataFrame,
+                       key_columns: Optional[list] = None) -> Optional[pd.DataFrame]:
+        """Filas (tabla, clave, hash) de etl_row_hashes para df; None si la tabla no tiene PK"""
+        key_columns = key_columns if key_columns is not None else self.get_primary_key(table_name)
+        if not key_columns:
+            return None
+        df_merge = self.merge_frame(df)
+        return pd.DataFrame({
+            'tabla': table_name,
+            'clave': self.row_keys(df_merge, key_columns).to_numpy(),
+            'hash': self.row_hashes(df_merge).to_numpy(),
+        })
+    
+    def save_row_hashes(self, table_name: str, hashes: Optional[pd.DataFrame]):
+        """
+        Tras una carga completa, reemplazar los hashes guardados por los de las filas cargadas
+        para que el siguiente merge detecte los cambios y las filas desaparecidas
+        """
+        self.clear_row_hashes([table_name])
+        if hashes is None or hashes.empty:
+            return
+        if hashes['clave'].duplicated().any():
+            logger.warning(f"Claves primarias duplicadas en {table_name}: no se guardan hashes de fila")
+            return
+        self.create_table_if_not_exists(ROW_HASHES_TABLE, ROW_HASHES_SCHEMA)
+        self.load_with_insert(hashes, ROW_HASHES_TABLE, mode='append')
+    
+    def clear_row_hashes(self, tables: list):
+        """Descartar los hashes guardados de las tablas indicadas"""
+        marcas = ', '.join(['%s'] * len(tables))
+        try:
+            self.cursor.execute(f"DELETE FROM {ROW_HASHES_TABLE} WHERE tabla IN ({marcas})", list(tables))
+            self.connection.commit()
+        except mysql.connector.Error as e:
+            if e.errno != 1146:  # La tabla de hashes aún no existe
+                raise
+    
+    def delete_rows(self, table_name: str, key_columns: list, keys: pd.DataFrame) -> int:
+        """DELETE por lotes de claves primarias"""
+        condicion = f"({', '.join(key_columns)})" if len(key_columns) > 1 else key_columns[0]
+        marca = f"({', '.join(['%s'] * len(key_columns))})" if len(key_columns) > 1 else '%s'
+        eliminados = 0
+        for batch in self.iter_row_batches(keys[key_columns], DELETE_BATCH_SIZE):
+            query = f"DELETE FROM {table_name} WHERE {condicion} IN ({', '.join([marca] * len(batch))})"
+            self.cursor.execute(query, [value for row in batch for value in row])
+            eliminados += len(batch)
+        return eliminados
+    
+    def load_with_merge(self, df: pd.DataFrame, table_name: str, delete_missing: bool = True) -> int:
+        """
+        Cargar solo las diferencias: compara el hash de cada fila con el guardado en
+        etl_row_hashes y ejecuta INSERT ... ON DUPLICATE KEY UPDATE para claves nuevas o
+        modificadas y DELETE para las que ya no vienen. df debe contener la tabla completa,
+        salvo con delete_missing=False (delta de una extracción incremental: no se elimina nada).
+        
+        Returns:
+            Número de filas insertadas o actualizadas
+        """
+        df_merge = self.merge_frame(df)
+        
+        key_columns = self.get_primary_key(table_name)
+        if not key_columns:
+            raise ValueError(f"La tabla {table_name} no tiene clave primaria: no se puede usar mode='merge'")
+        
+        claves = self.row_keys(df_merge, key_columns)
+        if claves.duplicated().any():
+            raise ValueError(f"Claves primarias duplicadas en los datos de {table_name}")
+        hashes = self.row_hashes(df_merge)
+        guardados = self.get_stored_hashes(table_name)
+        
+        posiciones = guardados.index.get_indexer(claves)
+        nuevos = posiciones == -1
+        cambiados = np.zeros(len(claves), dtype=bool)
+        cambiados[~nuevos] = guardados.to_numpy()[posiciones[~nuevos]] != hashes.to_numpy()[~nuevos]
+        escribir = nuevos | cambiados
+        if not delete_missing:
+            desaparecidos = pd.Index([], dtype=object)
+        elif len(guardados):
+            desaparecidos = guardados.index.difference(pd.Index(claves))
+        else:
+            # Sin hashes guardados (primer merge o tabla escrita por otro medio): todas las
+            # filas se escriben y las claves a eliminar salen de la propia tabla
+            desaparecidos = self.get_table_keys(table_name, key_columns).difference(pd.Index(claves))
+        
+        # Primero los datos y después los hashes: si algo falla a mitad, la siguiente
+        # ejecución vuelve a escribir esas filas (el upsert es idempotente)
+        try:
+            self.cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+            escritos = 0
+            if escribir.any():
+                escritos = self.load_with_insert(df_merge[escribir], table_name, mode='append', upsert=True)
+            stats_insert = self.last_insert_stats
+            
+            eliminados = 0
+            if len(desaparecidos):
+                claves_df = pd.DataFrame([clave.split('|') for clave in desaparecidos], columns=key_columns)
+                eliminados = self.delete_rows(table_name, key_columns, claves_df)
+                self.delete_rows(ROW_HASHES_TABLE, ['tabla', 'clave'],
+                                 pd.DataFrame({'tabla': table_name, 'clave': list(desaparecidos)}))
+            
+            if escritos:
+                hashes_escritos = pd.DataFrame({
+                    'tabla': table_name,
+                    'clave': claves[escribir].to_numpy(),
+                    'hash': hashes[escribir].to_numpy(),
+                })
+                self.load_with_insert(hashes_escritos, ROW_HASHES_TABLE, mode='append', upsert=True)
+            self.connection.commit()
+            self.last_insert_stats = stats_insert
+        except Exception as e:
+            self.connection.rollback()
+            logger.error(f" Error en merge de {table_name}: {str(e)}")
+            raise
+        
+        self.last_merge_stats = {
+            'inserted': int(nuevos.sum()),
+            'updated': int(cambiados.sum()),
+            'deleted': eliminados,
+            'unchanged': int((~escribir).sum()),
+        }
+        return escritos
+    
+    def create_staging_table(self, table_name: str) -> str:
+        """Crear <tabla>_staging vacía con la misma estructura que la tabla publicada"""
+        staging = f"{table_name}{STAGING_SUFFIX}"
+        self.cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+        self.cursor.execute(f"CREATE TABLE {staging} LIKE {table_name}")
+        self.connection.commit()
+        logger.debug(f"Tabla {staging} creada")
+        return staging
+    
+    def drop_staging_tables(self, tables: list):
+        for table_name in tables:
+            try:
+                self.cursor.execute(f"DROP TABLE IF EXISTS {table_name}{STAGING_SUFFIX}")
+            except Exception as e:
+                logger.warning(f"No se pudo eliminar {table_name}{STAGING_SUFFIX}: {str(e)}")
+        self.connection.commit()
+    
+    def count_rows(self, table_name: str) -> int:
+        self.cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
+        return int(self.cursor.fetchone()[0])
+    
+    def get_foreign_keys(self, tables: list) -> list:
+        """
+        Foreign keys del esquema actual que salen de o apuntan a las tablas indicadas.
+        CREATE TABLE ... LIKE no copia las FK, así que se recrean tras el intercambio.
+        """
+        marcas = ', '.join(['%s'] * len(tables))
+        self.cursor.execute(f"""
+            SELECT k.CONSTRAINT_NAME, k.TABLE_NAME, k.COLUMN_NAME,
+                   k.REFERENCED_TABLE_NAME, k.REFERENCED_COLUMN_NAME,
+                   r.UPDATE_RULE, r.DELETE_RULE
+            FROM information_schema.KEY_COLUMN_USAGE k
+            JOIN information_schema.REFERENTIAL_CONSTRAINTS r
+              ON r.CONSTRAINT_SCHEMA = k.CONSTRAINT_SCHEMA
+             AND r.CONSTRAINT_NAME = k.CONSTRAINT_NAME
+            WHERE k.TABLE_SCHEMA = DATABASE()
+              AND k.REFERENCED_TABLE_NAME IS NOT NULL
+              AND (k.TABLE_NAME IN ({marcas}) OR k.REFERENCED_TABLE_NAME IN ({marcas}))
+            ORDER BY k.TABLE_NAME, k.CONSTRAINT_NAME, k.ORDINAL_POSITION
+        """, list(tables) + list(tables))
+        
+        foreign_keys = {}
+        for nombre, tabla, columna, ref_tabla, ref_columna, on_update, on_delete in self.cursor.fetchall():
+            fk = foreign_keys.setdefault((tabla, nombre), {
+                'name': nombre, 'table': tabla, 'columns': [],
+                'referenced_table': ref_tabla, 'referenced_columns': [],
+                'on_update': on_update, 'on_delete': on_delete,
+            })
+            fk['columns'].append(columna)
+            fk['referenced_columns'].append(ref_columna)
+        return list(foreign_keys.values())
+    
+    def swap_staging_tables(self, tables: list):
+        """
+        Publicar todas las tablas *_staging con un único RENAME TABLE atómico:
+        las consultas concurrentes ven el DW anterior o el nuevo, nunca una carga a medias.
+        """
+        foreign_keys = self.get_foreign_keys(tables)
+        
+        self.cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+        for table_name in tables:
+            self.cursor.execute(f"DROP TABLE IF EXISTS {table_name}{OLD_SUFFIX}")
+        
+        renames = ', '.join(
+            f"{t} TO {t}{OLD_SUFFIX}, {t}{STAGING_SUFFIX} TO {t}" for t in tables
+        )
+        self.cursor.execute(f"RENAME TABLE {renames}")
+        logger.info(f"RENAME TABLE atómico: {len(tables)} tablas publicadas")
+        
+        # Las FK de tablas no intercambiadas siguieron a <tabla>_old: se sueltan antes de borrarla
+        for fk in foreign_keys:
+            if fk['table'] not in tables:
+                self.cursor.execute(f"ALTER TABLE {fk['table']} DROP FOREIGN KEY {fk['name']}")
+        for table_name in tables:
+            self.cursor.execute(f"DROP TABLE {table_name}{OLD_SUFFIX}")
+        
+        # Con FOREIGN_KEY_CHECKS = 0 las FK se agregan sin revalidar los datos
+        for fk in foreign_keys:
+            try:
+                self.cursor.execute(
+                    f"ALTER TABLE {fk['table']} ADD CONSTRAINT {fk['name']} "
+                    f"FOREIGN KEY ({', '.join(fk['columns'])}) "
+                    f"REFERENCES {fk['referenced_table']} ({', '.join(fk['referenced_columns'])}) "
+                    f"ON UPDATE {fk['on_update']} ON DELETE {fk['on_delete']}"
+                )
+            except mysql.connector.Error as e:
+                logger.warning(f"No se pudo recrear la FK {fk['name']} en {fk['table']}: {str(e)}")
+        self.connection.commit()
+
 def get_table_schemas():
     """Definir esquemas de todas las tablas del DW - Coinciden exactamente con DW.sql"""
     return {
@@ -255,7 +777,19 @@ def get_table_schemas():
             ID_Tiempo INT PRIMARY KEY,
             Dia INT,
             Mes INT,
-            Anio INT
+            Anio INT,
+            Fecha DATE,
+            Trimestre TINYINT,
+            SemanaISO TINYINT,
+            AnioISO INT,
+            InicioMes DATE,
+            AnioMes INT,
+            PeriodoTrimestre VARCHAR(8),
+            AnioFiscal INT,
+            TrimestreFiscal TINYINT,
+            PeriodoFiscal VARCHAR(10),
+            UNIQUE INDEX idx_fecha (Fecha),
+            INDEX idx_anio_mes (AnioMes)
         """,
         
         'dim_hitos': """
@@ -328,32 +862,135 @@ def get_table_schemas():
         """
     }
 
-def load_all_to_dw(transformed_data: Dict[str, pd.DataFrame]) -> Dict[str, int]:
+# Dependencias FK entre tablas del DW (DB/DW.sql): definen el orden y los niveles de carga
+LOAD_DEPENDENCIES = {
+    # Dimensiones independientes primero
+    'dim_clientes': [],
+    'dim_empleados': [],
+    'dim_gastos': [],
+    'dim_tiempo': [],
+    # Dimensiones dependientes (requieren las anteriores)
+    'dim_proyectos': ['dim_clientes'],
+    'dim_hitos': ['dim_proyectos', 'dim_tiempo'],
+    'dim_pruebas': ['dim_hitos'],
+    'dim_tareas': ['dim_hitos'],
+    # Tablas de hechos
+    'hechos_asignaciones': ['dim_empleados', 'dim_proyectos', 'dim_tiempo'],
+    'hechos_proyectos': ['dim_proyectos', 'dim_gastos', 'dim_tiempo'],
+}
+
+def load_levels(tables: list) -> list:
+    """
+    Agrupar las tablas en niveles: cada tabla queda un nivel por debajo de la
+    más profunda de las que referencia. Las tablas de un mismo nivel pueden
+    cargarse a la vez.
+    """
+    nivel = {}
+    for table_name in LOAD_DEPENDENCIES:
+        padres = [nivel[dep] for dep in LOAD_DEPENDENCIES[table_name] if dep in nivel]
+        nivel[table_name] = max(padres) + 1 if padres else 0
+    
+    niveles = []
+    for table_name in tables:
+        n = nivel.get(table_name, 0)
+        while len(niveles) <= n:
+            niveles.append([])
+        niveles[n].append(table_name)
+    return [grupo for grupo in niveles if grupo]
+
+def _load_table(loader: DWLoader, df: pd.DataFrame, table_name: str, staging: bool,
+                mode: str = 'replace') -> int:
+    """Cargar una tabla (o su copia *_staging) con la conexión del loader indicado"""
+    with stage('load', table_name, mode=mode, staging=staging) as registro:
+        if not staging:
+            # Cargar datos directamente (sin crear tablas)
+            records_loaded = loader.load_dataframe_to_table(df, table_name, mode=mode)
+        else:
+            # Cargar en la copia *_staging; la tabla publicada no se toca hasta el RENAME
+            staging_table = loader.create_staging_table(table_name)
+            records_loaded = loader.load_dataframe_to_table(df, staging_table, mode='append')
+            if staging_table in loader.load_stats:
+                loader.load_stats[table_name] = loader.load_stats.pop(staging_table)
+        registro['rows'] = records_loaded
+        registro['method'] = loader.load_stats.get(table_name, {}).get('method')
+    return records_loaded
+
+def _load_levels_parallel(loader: DWLoader, transformed_data: Dict[str, pd.DataFrame],
+                          tables: list, staging: bool, workers: int,
+                          mode: str = 'replace') -> Dict[str, int]:
+    """
+    Cargar nivel por nivel: las tablas de un nivel se reparten en un pool de
+    conexiones al DW y el siguiente nivel empieza cuando termina el anterior.
+    """
+    niveles = load_levels(tables)
+    pool_size = min(workers, max(len(grupo) for grupo in niveles))
+    
+    conexiones = queue.Queue()
+    loaders = []
+    for _ in range(pool_size):
+        worker_loader = DWLoader(bulk=loader.bulk)
+        if not worker_loader.connect():
+            for abierto in loaders:
+                abierto.disconnect()
+            raise Exception("No se pudo conectar al Data Warehouse")
+        worker_loader.cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+        loaders.append(worker_loader)
+        conexiones.put(worker_loader)
+    logger.info(f"Pool de {pool_size} conexiones al DW, {len(niveles)} niveles de carga")
+    
+    def cargar(table_name):
+        worker_loader = conexiones.get()
+        try:
+            return _load_table(worker_loader, transformed_data[table_name], table_name, staging, mode)
+        finally:
+            conexiones.put(worker_loader)
+    
+    resultados = {}
+    try:
+        with ThreadPoolExecutor(max_workers=pool_size) as executor:
+            for numero, grupo in enumerate(niveles):
+                inicio = time.perf_counter()
+                futuros = {table_name: executor.submit(cargar, table_name) for table_name in grupo}
+                for table_name, futuro in futuros.items():
+                    resultados[table_name] = futuro.result()
+                logger.info(f"Nivel {numero} ({', '.join(grupo)}) cargado en {time.perf_counter() - inicio:.2f}s")
+    finally:
+        for worker_loader in loaders:
+            loader.load_stats.update(worker_loader.load_stats)
+            worker_loader.disconnect()
+    return resultados
+
+def load_all_to_dw(transformed_data: Dict[str, pd.DataFrame], bulk: bool = False,
+                   staging: bool = False, workers: int = 1, mode: str = 'replace') -> Dict[str, int]:
     """
     Cargar todos los datos transformados al Data Warehouse
     (Asume que el esquema del DW ya existe)
     
     Args:
         transformed_data: Diccionario con todas las tablas transformadas
+        bulk: Si True, usa LOAD DATA LOCAL INFILE cuando el servidor lo permite
+        staging: Si True, carga en tablas *_staging, valida los conteos y publica
+                 todas las tablas con un único RENAME TABLE (el DW sigue consultable)
+        workers: Conexiones simultáneas al DW; con más de una, las tablas de un
+                 mismo nivel de LOAD_DEPENDENCIES se cargan en paralelo
+        mode: 'replace' reescribe cada tabla; 'merge' solo escribe las filas nuevas o
+              modificadas y elimina las que ya no existen (por hash de fila); 'upsert' es
+              'merge' sin eliminar, para el delta de una extracción incremental
         
     Returns:
         Dict con conteo de registros cargados por tabla
     """
-    loader = DWLoader()
+    if mode not in ('replace', 'merge', 'upsert'):
+        raise ValueError(f"Modo de carga no soportado: {mode}")
+    if mode != 'replace' and staging:
+        raise ValueError(f"mode='{mode}' escribe sobre las tablas publicadas: no es compatible con staging")
+    
+    loader = DWLoader(bulk=bulk)
     load_results = {}
+    staged_tables = []
     
     # Orden de carga: DIMENSIONES primero (según dependencias FK), luego HECHOS
-    load_order = [
-        # Dimensiones independientes primero
-        'dim_clientes', 'dim_empleados', 'dim_gastos', 'dim_tiempo',
-        # Dimensiones dependientes (requieren las anteriores)
-        'dim_proyectos',  # requiere dim_clientes
-        'dim_hitos',      # requiere dim_proyectos y dim_tiempo
-        'dim_pruebas',    # requiere dim_hitos
-        'dim_tareas',     # requiere dim_hitos
-        # Tablas de hechos al final (requieren todas las dimensiones)
-        'hechos_asignaciones', 'hechos_proyectos'
-    ]
+    load_order = list(LOAD_DEPENDENCIES)
     
     try:
         if not loader.connect():
@@ -368,28 +1005,60 @@ def load_all_to_dw(transformed_data: Dict[str, pd.DataFrame]) -> Dict[str, int]:
         logger.info(f" Tablas a cargar: {len(load_order)}")
         logger.info("Asumiendo que el esquema del DW ya existe")
         
-        total_records = 0
-        
         for table_name in load_order:
-            if table_name in transformed_data:
-                df = transformed_data[table_name]
-                
-                # Cargar datos directamente (sin crear tablas)
-                records_loaded = loader.load_dataframe_to_table(df, table_name, mode='replace')
-                load_results[table_name] = records_loaded
-                total_records += records_loaded
-                
-            else:
+            if table_name not in transformed_data:
                 logger.warning(f"warning Tabla {table_name} no encontrada en datos transformados")
                 load_results[table_name] = 0
+        tables = [t for t in load_order if t in transformed_data]
+        for table_name in tables:
+            loader.add_missing_columns(table_name)
+        if staging:
+            staged_tables.extend(tables)
+        
+        inicio = time.perf_counter()
+        if workers > 1 and tables:
+            load_results.update(_load_levels_parallel(loader, transformed_data, tables, staging, workers, mode))
+        else:
+            for table_name in tables:
+                load_results[table_name] = _load_table(loader, transformed_data[table_name], table_name, staging, mode)
+        total_seconds = time.perf_counter() - inicio
+        load_results = {t: load_results[t] for t in load_order}
+        total_records = sum(load_results.values())
+        
+        if staging:
+            # Validar conteos antes de publicar: si algo no cuadra el DW queda intacto
+            for table_name in staged_tables:
+                esperados = len(transformed_data[table_name])
+                cargados = loader.count_rows(f"{table_name}{STAGING_SUFFIX}")
+                if cargados != esperados:
+                    raise Exception(f"Conteo inválido en {table_name}{STAGING_SUFFIX}: "
+                                    f"{cargados} registros, se esperaban {esperados}")
+            loader.swap_staging_tables(staged_tables)
+        
+        if mode == 'replace':
+            # Los hashes pasan a describir lo recién cargado (base del siguiente merge)
+            for table_name in tables:
+                loader.save_row_hashes(table_name, loader.row_hash_frame(table_name, transformed_data[table_name]))
         
         logger.info("=" * 50)
         logger.info(" RESUMEN DE CARGA:")
         for table, count in load_results.items():
             status = "ok" if count > 0 else "warning"
-            logger.info(f"{status} {table}: {count:,} registros")
+            stats = loader.load_stats.get(table)
+            if stats and stats['method'] == 'MERGE':
+                status = "ok"
+                logger.info(f"{status} {table}: {stats['inserted']:,} insertados, {stats['updated']:,} actualizados, "
+                            f"{stats['deleted']:,} eliminados, {stats['unchanged']:,} sin cambios "
+                            f"en {stats['seconds']:.2f}s")
+            elif stats:
+                logger.info(f"{status} {table}: {count:,} registros en {stats['seconds']:.2f}s "
+                            f"({stats['rows_per_sec']:,.0f} registros/s, {stats['method']})")
+            else:
+                logger.info(f"{status} {table}: {count:,} registros")
         
+        suma_tablas = sum(stats['seconds'] for stats in loader.load_stats.values())
         logger.info(f" TOTAL REGISTROS CARGADOS: {total_records:,}")
+        logger.info(f" Tiempo de carga: {total_seconds:.2f}s (suma por tabla: {suma_tablas:.2f}s)")
         logger.info(" CARGA AL DATA WAREHOUSE COMPLETADA EXITOSAMENTE")
         
         # Reactivar foreign key checks
@@ -398,6 +1067,12 @@ def load_all_to_dw(transformed_data: Dict[str, pd.DataFrame]) -> Dict[str, int]:
         
     except Exception as e:
         logger.error(f" Error en carga al DW: {str(e)}")
+        # Las tablas publicadas no se modificaron: descartar las copias *_staging
+        if staged_tables:
+            try:
+                loader.drop_staging_tables(staged_tables)
+            except Exception:
+                pass
         # Asegurar que FK checks se reactiven incluso si hubo error
         try:
             loader.cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
@@ -409,3 +1084,39 @@ def load_all_to_dw(transformed_data: Dict[str, pd.DataFrame]) -> Dict[str, int]:
         loader.disconnect()
     
     return load_results
+
+def load_chunks_to_dw(chunks: Iterable[pd.DataFrame], table_name: str, bulk: bool = False,
+                      mode: str = 'replace') -> int:
+    """
+    Cargar al DW una tabla que llega por bloques, con una sola conexión
+    
+    Returns:
+        Registros cargados
+    """
+    loader = DWLoader(bulk=bulk)
+    if not loader.connect():
+        raise Exception("No se pudo conectar al Data Warehouse")
+    try:
+        loader.cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+        key_columns = loader.get_primary_key(table_name) if mode == 'replace' else []
+        hashes = []
+        
+        def con_hashes(chunks):
+            # Solo clave y hash de cada bloque: los bloques no se acumulan en memoria
+            for chunk in chunks:
+                if key_columns and not chunk.empty:
+                    hashes.append(loader.row_hash_frame(table_name, chunk, key_columns))
+                yield chunk
+        
+        with stage('load', table_name, mode=mode, chunked=True) as registro:
+            records = loader.load_chunks(con_hashes(chunks), table_name, mode=mode)
+            registro['rows'] = records
+        if mode == 'replace':
+            loader.save_row_hashes(table_name, pd.concat(hashes, ignore_index=True) if hashes else None)
+        return records
+    finally:
+        try:
+            loader.cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+        except Exception:
+            pass
+        loader.disconnect()
@@ -2,7 +2,8 @@
 Orquesta el proceso completo de Extract, Transform, Load
 """
 import logging
-from typing import Dict
+import time
+from typing import Dict, Optional
 import pandas as pd
 
 # Configurar logging
@@ -13,64 +14,60 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Imports de módulos ETL
-from extract.extract_gestion import extract_all, reset_incremental_control, get_last_extraction_info
+from extract.extract_gestion import (extract_all, reset_incremental_control, get_last_extraction_info,
+                                     get_incremental_watermarks, commit_incremental_control)
 
-# Imports de transformaciones individuales - Dimensiones
-from transform.transform_dim.dim_clientes import transform as transform_dim_clientes
-from transform.transform_dim.dim_empleados import transform as transform_dim_empleados
-from transform.transform_dim.dim_proyectos import transform as transform_dim_proyectos
-from transform.transform_dim.dim_tiempo import transform as transform_dim_tiempo
-from transform.transform_dim.dim_hitos import transform as transform_dim_hitos
-from transform.transform_dim.dim_tareas import transform as transform_dim_tareas
-from transform.transform_dim.dim_pruebas import transform as transform_dim_pruebas
-from transform.transform_dim.dim_gastos import transform as transform_dim_gastos
-
-# Imports de transformaciones - Hechos
-from transform.transform_fact.hechos_asignaciones import transform as transform_hechos_asignaciones
-from transform.transform_fact.hechos_proyectos import transform as transform_hechos_proyectos
+# Planificador de transformaciones (dimensiones y hechos según get_dependencies())
+from transform.scheduler import TRANSFORMACIONES, build_graph, run_graph, critical_path
 
 # Import de carga
 from load.load_to_dw import load_all_to_dw
 
+# Snapshots de datos crudos (--snapshot / --from-snapshot)
+from utils.snapshots import SnapshotStore
+
+# Caché de resultados de transformaciones (--no-cache)
+from utils.transform_cache import TransformCache
+
+# Reportes JSON por ejecución en logs/run_reports/ (--profile para volcados de cProfile)
+from utils.run_report import RunReport, active_report, stage
+
 # from load.load_to_dw import load_all  # Comentado hasta implementar
 
-def run_transformations(raw_data: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
-    transformed_data = {}
-    
+def run_transformations(raw_data: Dict[str, pd.DataFrame], max_workers: int = 4,
+                        cache: bool = True) -> Dict[str, pd.DataFrame]:
+    """
+    Ejecuta todas las transformaciones según el grafo de get_dependencies().
+    Las que no dependen entre sí (dim_clientes, dim_empleados, dim_proyectos,
+    dim_tiempo, dim_gastos...) se ejecutan en paralelo.
+    Con cache, los nodos cuyas entradas y código no cambiaron se leen de transform_cache/.
+    """
     logger.info("=== INICIANDO TRANSFORMACIONES ===")
-    
-    # Transformar dimensiones
-    logger.info("--- Transformando Dimensiones ---")
+    transform_cache = TransformCache() if cache else None
     
     try:
-        # Dimensiones independientes primero
-        transformed_data['dim_clientes'] = transform_dim_clientes(raw_data)
-        transformed_data['dim_empleados'] = transform_dim_empleados(raw_data)
-        transformed_data['dim_proyectos'] = transform_dim_proyectos(raw_data)
-        transformed_data['dim_tiempo'] = transform_dim_tiempo(raw_data)
-        transformed_data['dim_gastos'] = transform_dim_gastos(raw_data)
-        
-        # Dimensiones dependientes que necesitan otras dimensiones ya transformadas
-        # dim_hitos necesita dim_proyectos
-        combined_data_for_deps = {**raw_data, **transformed_data}
-        transformed_data['dim_hitos'] = transform_dim_hitos(combined_data_for_deps)
-        
-        # dim_tareas y dim_pruebas necesitan dim_hitos (que ya está disponible)
-        combined_data_for_deps2 = {**raw_data, **transformed_data}
-        transformed_data['dim_tareas'] = transform_dim_tareas(combined_data_for_deps2)
-        transformed_data['dim_pruebas'] = transform_dim_pruebas(combined_data_for_deps2)
-        
-        # Transformar hechos (necesitan tanto datos crudos como dimensiones)
-        logger.info("--- Transformando Hechos ---")
-        # Combinar datos crudos con dimensiones transformadas para los hechos
-        combined_data = {**raw_data, **transformed_data}
-        transformed_data['hechos_asignaciones'] = transform_hechos_asignaciones(combined_data)
-        transformed_data['hechos_proyectos'] = transform_hechos_proyectos(combined_data)
+        inicio = time.perf_counter()
+        transformed_data, tiempos = run_graph(raw_data, max_workers=max_workers, cache=transform_cache)
+        total = time.perf_counter() - inicio
         
         # Resumen de transformación
         logger.info("--- Resumen de Transformaciones ---")
+        nodos_cache = transform_cache.stats['nodes'] if transform_cache else {}
         for table_name, df in transformed_data.items():
-            logger.info(f"{table_name}: {len(df)} registros transformados")
+            origen = " (caché)" if nodos_cache.get(table_name) == 'hit' else ""
+            logger.info(f"{table_name}: {len(df)} registros transformados en {tiempos[table_name]:.3f}s{origen}")
+        
+        camino = critical_path(build_graph(TRANSFORMACIONES), tiempos)
+        logger.info(f"Camino crítico: {' -> '.join(camino)} ({sum(tiempos[n] for n in camino):.3f}s)")
+        logger.info(f"Tiempo total de transformación: {total:.3f}s (secuencial: {sum(tiempos.values()):.3f}s)")
+        
+        if transform_cache:
+            transform_cache.log_summary()
+            transform_cache.evict()
+            if active_report():
+                active_report().extra['transform_cache'] = {
+                    clave: transform_cache.stats[clave] for clave in ('hits', 'misses', 'saved_seconds')
+                }
             
     except Exception as e:
         logger.error(f"Error en transformaciones: {str(e)}")
@@ -79,14 +76,32 @@ def run_transformations(raw_data: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataF
     logger.info("=== TRANSFORMACIONES COMPLETADAS ===")
     return transformed_data
 
-def run_etl_complete(incremental: bool = True, include_load: bool = True):
+def run_etl_complete(incremental: bool = True, include_load: bool = True, load_options: Optional[Dict] = None,
+                     extract_options: Optional[Dict] = None, transform_options: Optional[Dict] = None):
     """
     Ejecuta el proceso ETL completo (Extract, Transform, Load)
     
+    Las marcas de agua de la extracción solo se confirman cuando la carga al DW termina bien:
+    la siguiente ejecución incremental extrae lo que falte desde la última carga.
+    
     Args:
-        incremental: Si True, ejecuta extracción incremental
+        incremental: Si True, ejecuta extracción incremental (con carga, el delta se carga con
+                     mode='upsert': no se eliminan las filas que no vienen en el delta)
         include_load: Si True, incluye la fase de carga al DW
+        load_options: Opciones de load_all_to_dw (bulk, staging, workers, mode)
+        extract_options: Opciones de extract_all (workers, snapshot, compact)
+        transform_options: Opciones de run_transformations (cache)
     """
+    load_options = dict(load_options or {})
+    if incremental and include_load and load_options.get('staging'):
+        # staging publica tablas completas con RENAME TABLE: un delta no puede reemplazarlas
+        logger.warning("La carga con staging requiere extracción completa: se ignora el modo incremental")
+        incremental = False
+    delta = incremental and bool(get_incremental_watermarks())
+    if delta and include_load and load_options.get('mode', 'replace') != 'upsert':
+        logger.info(f"Extracción incremental: carga con mode='upsert' en lugar de '{load_options.get('mode', 'replace')}'")
+        load_options['mode'] = 'upsert'
+    
     mode_msg = "INCREMENTAL" if incremental else "COMPLETA"
     phases_msg = "ETL COMPLETO" if include_load else "ET (Extract + Transform)"
     
@@ -100,7 +115,9 @@ def run_etl_complete(incremental: bool = True, include_load: bool = True):
         
         # 1. EXTRACCIÓN
         logger.info(f" FASE 1: EXTRACCIÓN {mode_msg}")
-        raw_data = extract_all(incremental=incremental)
+        with stage('phase', 'extract', aggregate=True) as registro:
+            raw_data = extract_all(incremental=incremental, **(extract_options or {}))
+            registro['rows'] = sum(len(df) for df in raw_data.values())
         
         if not raw_data:
             logger.warning("No se extrajeron datos. Finalizando proceso.")
@@ -108,12 +125,18 @@ def run_etl_complete(incremental: bool = True, include_load: bool = True):
         
         # 2. TRANSFORMACIÓN
         logger.info(" FASE 2: TRANSFORMACIÓN")
-        transformed_data = run_transformations(raw_data)
+        with stage('phase', 'transform', aggregate=True) as registro:
+            transformed_data = run_transformations(raw_data, **(transform_options or {}))
+            registro['rows'] = sum(len(df) for df in transformed_data.values())
         
         # 3. CARGA (opcional)
         if include_load:
             logger.info(" FASE 3: CARGA AL DATA WAREHOUSE")
-            load_results = load_all_to_dw(transformed_data)
+            with stage('phase', 'load', aggregate=True) as registro:
+                load_results = load_all_to_dw(transformed_data, **load_options)
+                registro['rows'] = sum(load_results.values())
+            if commit_incremental_control():
+                logger.info(" Marcas de agua de control incremental confirmadas")
             logger.info(f" ETL COMPLETO (Extract + Transform + Load) completado exitosamente")
             return transformed_data, load_results
         else:
@@ -124,9 +147,11 @@ def run_etl_complete(incremental: bool = True, include_load: bool = True):
         logger.error(f" Error en {phases_msg} {mode_msg}: {str(e)}")
         raise
 
-def run_extract_transform(incremental: bool = True):
+def run_extract_transform(incremental: bool = True, extract_options: Optional[Dict] = None,
+                          transform_options: Optional[Dict] = None):
     """Solo ejecuta Extract + Transform (sin Load)"""
-    return run_etl_complete(incremental=incremental, include_load=False)
+    return run_etl_complete(incremental=incremental, include_load=False, extract_options=extract_options,
+                            transform_options=transform_options)
 
 def run_etl():
     """
@@ -152,22 +177,28 @@ def run_etl():
         logger.error(f" Error en ETL completo: {str(e)}")
         raise
 
-def test_etl(include_load: bool = False):
+def test_etl(include_load: bool = False, load_options: Optional[Dict] = None, extract_options: Optional[Dict] = None,
+             transform_options: Optional[Dict] = None):
     """
     Función de prueba del ETL
     
     Args:
         include_load: Si True, ejecuta ETL completo con carga al DW
+        load_options: Opciones de load_all_to_dw (bulk, staging, workers, mode)
+        extract_options: Opciones de extract_all (workers, snapshot, compact)
+        transform_options: Opciones de run_transformations (cache)
     """
     test_type = "ETL COMPLETO (con carga)" if include_load else "ETL (solo Extract + Transform)"
     print(f" EJECUTANDO PRUEBA DE {test_type}")
     
     try:
         if include_load:
-            result = run_etl_complete(include_load=True)
+            result = run_etl_complete(include_load=True, load_options=load_options,
+                                      extract_options=extract_options, transform_options=transform_options)
             transformed_data, load_results = result if result else (None, None)
         else:
-            transformed_data = run_extract_transform()
+            transformed_data = run_extract_transform(extract_options=extract_options,
+                                                     transform_options=transform_options)
             load_results = None
         
         if transformed_data:
@@ -194,65 +225,189 @@ def test_etl(include_load: bool = False):
         print(f"\n❌ Error en prueba: {str(e)}")
         return None
 
-def run_full_load(include_load: bool = False):
+def run_full_load(include_load: bool = False, load_options: Optional[Dict] = None, extract_options: Optional[Dict] = None,
+                  transform_options: Optional[Dict] = None):
     """
     Ejecutar carga completa (no incremental)
     
     Args:
         include_load: Si True, incluye carga al DW
+        load_options: Opciones de load_all_to_dw (bulk, staging, workers, mode)
+        extract_options: Opciones de extract_all (workers, snapshot, compact)
+        transform_options: Opciones de run_transformations (cache)
     """
     logger.info("FORZANDO CARGA COMPLETA")
-    return run_etl_complete(incremental=False, include_load=include_load)
+    return run_etl_complete(incremental=False, include_load=include_load, load_options=load_options,
+                            extract_options=extract_options, transform_options=transform_options)
 
-def reset_and_run(include_load: bool = False):
+def reset_and_run(include_load: bool = False, load_options: Optional[Dict] = None, extract_options: Optional[Dict] = None,
+                  transform_options: Optional[Dict] = None):
     """
     Resetear control incremental y ejecutar carga completa
     
     Args:
         include_load: Si True, incluye carga al DW
+        load_options: Opciones de load_all_to_dw (bulk, staging, workers, mode)
+        extract_options: Opciones de extract_all (workers, snapshot, compact)
+        transform_options: Opciones de run_transformations (cache)
     """
     logger.info(" RESETEANDO CONTROL INCREMENTAL")
     reset_incremental_control()
-    return run_full_load(include_load=include_load)
+    return run_full_load(include_load=include_load, load_options=load_options, extract_options=extract_options,
+                         transform_options=transform_options)
+
+def run_from_snapshot(snapshot_key: Optional[str] = None, include_load: bool = False,
+                      load_options: Optional[Dict] = None, transform_options: Optional[Dict] = None):
+    """
+    Ejecuta Transform (+ Load) sobre un snapshot guardado, sin consultar el SGP
+    
+    Args:
+        snapshot_key: Timestamp del snapshot (por defecto el más reciente)
+        include_load: Si True, incluye la fase de carga al DW
+        load_options: Opciones de load_all_to_dw (bulk, staging, workers, mode)
+        transform_options: Opciones de run_transformations (cache)
+    """
+    logger.info(" FASE 1: LECTURA DE SNAPSHOT (sin extracción)")
+    with stage('phase', 'snapshot', aggregate=True) as registro:
+        raw_data, manifest = SnapshotStore().load(snapshot_key)
+        registro['rows'] = sum(len(df) for df in raw_data.values())
+    
+    load_options = dict(load_options or {})
+    if include_load and manifest.get('incremental'):
+        if load_options.get('staging'):
+            raise ValueError("El snapshot es incremental: la carga con staging requiere una extracción completa")
+        logger.info("Snapshot incremental: carga con mode='upsert'")
+        load_options['mode'] = 'upsert'
+    
+    logger.info(" FASE 2: TRANSFORMACIÓN")
+    with stage('phase', 'transform', aggregate=True) as registro:
+        transformed_data = run_transformations(raw_data, **(transform_options or {}))
+        registro['rows'] = sum(len(df) for df in transformed_data.values())
+    
+    if include_load:
+        logger.info(" FASE 3: CARGA AL DATA WAREHOUSE")
+        with stage('phase', 'load', aggregate=True) as registro:
+            load_results = load_all_to_dw(transformed_data, **load_options)
+            registro['rows'] = sum(load_results.values())
+        return transformed_data, load_results
+    return transformed_data
 
 def show_incremental_status():
     """
     Mostrar estado del control incremental
     """
     last_date = get_last_extraction_info()
-    print(f" Última extracción: {last_date}")
-    print(f" Próxima extracción será: INCREMENTAL (solo cambios desde {last_date})")
+    print(f" Última extracción cargada al DW: {last_date}")
+    if get_incremental_watermarks():
+        print(f" Próxima extracción será: INCREMENTAL (solo proyectos con cambios desde {last_date})")
+    else:
+        print(" Próxima extracción será: COMPLETA (sin marcas de agua de una carga previa)")
     print(" Para carga completa usar: reset_and_run() o run_full_load()")
 
 if __name__ == "__main__":
+    import contextlib
     import sys
     
-    if len(sys.argv) > 1:
-        if sys.argv[1] == "--full":
-            print("Ejecutando carga completa (Extract + Transform)...")
-            run_full_load(include_load=False)
-        elif sys.argv[1] == "--full-load":
-            print("Ejecutando ETL COMPLETO con carga al DW...")
-            run_full_load(include_load=True)
-        elif sys.argv[1] == "--reset":
-            print("Reseteando control y ejecutando carga completa...")
-            reset_and_run(include_load=False)
-        elif sys.argv[1] == "--reset-load":
-            print("Reseteando control y ejecutando ETL COMPLETO con carga al DW...")
-            reset_and_run(include_load=True)
-        elif sys.argv[1] == "--test-load":
-            print("Ejecutando prueba ETL COMPLETO con carga al DW...")
-            test_etl(include_load=True)
-        elif sys.argv[1] == "--status":
-            show_incremental_status()
-        else:
-            print("Opciones disponibles:")
-            print("  --full        : Carga completa (solo Extract + Transform)")
-            print("  --full-load   : ETL completo con carga al DW")
-            print("  --reset       : Reset + carga completa")
-            print("  --reset-load  : Reset + ETL completo con carga al DW")
-            print("  --test-load   : Prueba ETL completo con carga")
-            print("  --status      : Mostrar estado incremental")
+    # Opciones adicionales de carga:
+    #   --bulk    usa LOAD DATA LOCAL INFILE
+    #   --staging carga en tablas *_staging y las publica con un RENAME TABLE atómico
+    #   --merge   solo escribe filas nuevas/modificadas y elimina las desaparecidas
+    #   --parallel carga en paralelo las tablas sin dependencias FK entre sí (4 conexiones)
+    load_options = {
+        'bulk': '--bulk' in sys.argv[2:],
+        'staging': '--staging' in sys.argv[2:],
+        'workers': 4 if '--parallel' in sys.argv[2:] else 1,
+        'mode': 'merge' if '--merge' in sys.argv[2:] else 'replace',
+    }
+    # Opciones adicionales de extracción:
+    #   --parallel-extract consultas OLTP concurrentes (4 conexiones)
+    #   --snapshot         guarda las tablas crudas en snapshots/<timestamp>/ (Parquet)
+    #   --no-compact       conserva los tipos de pandas.read_sql (sin category/downcast)
+    extract_options = {
+        'workers': 4 if '--parallel-extract' in sys.argv[2:] else 1,
+        'snapshot': '--snapshot' in sys.argv[2:],
+        'compact': '--no-compact' not in sys.argv[2:],
+    }
+    # Opciones adicionales de transformación:
+    #   --no-cache         recalcula todos los nodos sin leer ni escribir transform_cache/
+    transform_options = {
+        'cache': '--no-cache' not in sys.argv[2:],
+    }
+    
+    # Reporte JSON de la ejecución (tiempos/memoria por consulta, nodo y tabla):
+    #   --profile          guarda además un volcado de cProfile por etapa
+    modos_con_reporte = {'--test', '--full', '--full-load', '--reset', '--reset-load', '--test-load',
+                         '--incremental-load', '--from-snapshot'}
+    modo = sys.argv[1] if len(sys.argv) > 1 else '--test'
+    if modo in modos_con_reporte:
+        reporte = RunReport(mode=modo.lstrip('-'), profile='--profile' in sys.argv[2:])
     else:
-        # Ejecución normal (incremental, solo Extract + Transform)
-        test_etl(include_load=False)
+        reporte = contextlib.nullcontext()
+    
+    with reporte:
+        if len(sys.argv) > 1:
+            if sys.argv[1] == "--test":
+                print("Ejecutando prueba ETL (Extract + Transform)...")
+                test_etl(include_load=False, extract_options=extract_options,
+                         transform_options=transform_options)
+            elif sys.argv[1] == "--full":
+                print("Ejecutando carga completa (Extract + Transform)...")
+                run_full_load(include_load=False, extract_options=extract_options,
+                              transform_options=transform_options)
+            elif sys.argv[1] == "--full-load":
+                print("Ejecutando ETL COMPLETO con carga al DW...")
+                run_full_load(include_load=True, load_options=load_options, extract_options=extract_options,
+                              transform_options=transform_options)
+            elif sys.argv[1] == "--reset":
+                print("Reseteando control y ejecutando carga completa...")
+                reset_and_run(include_load=False, extract_options=extract_options,
+                              transform_options=transform_options)
+            elif sys.argv[1] == "--reset-load":
+                print("Reseteando control y ejecutando ETL COMPLETO con carga al DW...")
+                reset_and_run(include_load=True, load_options=load_options, extract_options=extract_options,
+                              transform_options=transform_options)
+            elif sys.argv[1] == "--test-load":
+                print("Ejecutando prueba ETL COMPLETO con carga al DW...")
+                test_etl(include_load=True, load_options=load_options, extract_options=extract_options,
+                         transform_options=transform_options)
+            elif sys.argv[1] == "--incremental-load":
+                print("Ejecutando ETL INCREMENTAL con carga al DW...")
+                run_etl_complete(incremental=True, include_load=True, load_options=load_options,
+                                 extract_options=extract_options, transform_options=transform_options)
+            elif sys.argv[1] == "--from-snapshot":
+                # --from-snapshot [TIMESTAMP] [--load]: sin extracción, desde un snapshot guardado
+                snapshot_key = sys.argv[2] if len(sys.argv) > 2 and not sys.argv[2].startswith('--') else None
+                include_load = '--load' in sys.argv[2:]
+                print(f"Ejecutando desde snapshot {snapshot_key or '(más reciente)'}...")
+                run_from_snapshot(snapshot_key, include_load=include_load, load_options=load_options,
+                                  transform_options=transform_options)
+            elif sys.argv[1] == "--status":
+                show_incremental_status()
+            else:
+                print("Opciones disponibles:")
+                print("  --test        : Prueba incremental (solo Extract + Transform, opción por defecto)")
+                print("  --full        : Carga completa (solo Extract + Transform)")
+                print("  --full-load   : ETL completo con carga al DW")
+                print("  --reset       : Reset + carga completa")
+                print("  --reset-load  : Reset + ETL completo con carga al DW")
+                print("  --test-load   : Prueba ETL completo con carga (incremental)")
+                print("  --incremental-load : ETL incremental con carga al DW (delta + upsert)")
+                print("  --from-snapshot [TIMESTAMP] [--load] : Transformar (y cargar) desde un snapshot, sin extraer")
+                print("  --status      : Mostrar estado incremental")
+                print("  Opciones extra para modos con carga:")
+                print("    --bulk      : LOAD DATA LOCAL INFILE")
+                print("    --staging   : Cargar en tablas *_staging y publicarlas con RENAME TABLE atómico")
+                print("    --parallel  : Cargar por niveles de FK con 4 conexiones al DW")
+                print("    --merge     : Cargar solo los cambios (hash por fila, upsert + delete)")
+                print("  Opciones extra de extracción:")
+                print("    --parallel-extract : 4 conexiones OLTP")
+                print("    --snapshot         : Guardar snapshot Parquet de los datos crudos")
+                print("    --no-compact       : No compactar tipos de los datos crudos")
+                print("  Opciones extra de transformación:")
+                print("    --no-cache         : Recalcular todas las transformaciones sin usar transform_cache/")
+                print("  Reporte de ejecución (logs/run_reports/<timestamp>.json):")
+                print("    --profile          : Guardar además un volcado de cProfile por etapa")
+        else:
+            # Ejecución normal (incremental, solo Extract + Transform)
+            test_etl(include_load=False, extract_options=extract_options,
+                     transform_options=transform_options)
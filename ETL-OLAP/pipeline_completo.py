@@ -98,6 +98,20 @@ def iniciar_dashboard_background():
     except Exception as e:
         print(f"[ERROR] Error al iniciar dashboard: {e}")
 
+def mostrar_reporte_etl():
+    """
+    Muestra las etapas más lentas del último reporte de main_etl.py (logs/run_reports/)
+    """
+    from utils.run_report import latest_report
+    
+    reporte = latest_report()
+    if not reporte:
+        return
+    print(f"\n[REPORTE ETL] {reporte['run_id']} ({reporte['seconds']:.2f} segundos, {reporte['status']})")
+    etapas = [etapa for etapa in reporte['stages'] if etapa['phase'] != 'phase']
+    for etapa in sorted(etapas, key=lambda e: -e['seconds'])[:5]:
+        print(f"  {etapa['phase']}/{etapa['name']}: {etapa['seconds']:.2f} segundos")
+
 def main():
     """
     Función principal que ejecuta todo el pipeline
@@ -118,10 +132,12 @@ def main():
     print("\n[FASE 1] EXTRACT-TRANSFORM-LOAD")
     print("=" * 50)
     
+    inicio_fase = time.time()
     etl_exitoso = ejecutar_comando(
         "python main_etl.py --test-load",
         "ETL Completo con carga al Data Warehouse"
     )
+    tiempos_fase = {'ETL': time.time() - inicio_fase}
     
     if not etl_exitoso:
         print("[ERROR] ETL fallo. No se puede continuar con OLAP.")
@@ -135,10 +151,12 @@ def main():
     print("\n[FASE 2] ANALISIS OLAP")
     print("=" * 50)
     
+    inicio_fase = time.time()
     olap_exitoso = ejecutar_comando(
         "python OLAP/generar_cubos_kpis.py",
         "Generacion de cubos OLAP para KPIs"
     )
+    tiempos_fase['OLAP'] = time.time() - inicio_fase
     
     if not olap_exitoso:
         print("[WARNING] OLAP fallo, pero ETL fue exitoso")
@@ -154,6 +172,9 @@ def main():
     print("\n[EXITO] PIPELINE COMPLETADO EXITOSAMENTE")
     print("=" * 80)
     print(f"Tiempo total: {tiempo_total:.2f} segundos")
+    for fase, segundos in tiempos_fase.items():
+        print(f"  {fase}: {segundos:.2f} segundos")
+    mostrar_reporte_etl()
     print(f"Finalizacion: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
     print("\n[CUBOS OLAP] CUBOS GENERADOS EN MEMORIA:")
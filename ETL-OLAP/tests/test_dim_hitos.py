@@ -0,0 +1,46 @@
+"""
+dim_hitos vectorizado vs. implementación fila a fila (transform_por_fila) sobre datos sintéticos
+
+Uso:
+    python -m pytest tests/
+"""
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+import pytest
+
+from benchmarks.datos_sinteticos import generar_datos_crudos
+from transform.transform_dim.dim_proyectos import transform as transform_dim_proyectos
+from transform.transform_dim.dim_tiempo import transform as transform_dim_tiempo
+from transform.transform_dim.dim_hitos import transform, transform_por_fila
+
+COLUMNAS_FECHA = ['FechaInicio', 'FechaInicioReal', 'FechaFinPlanificada', 'FechaFinReal']
+
+def preparar_entrada(num_proyectos: int, fechas_como_date: bool) -> dict:
+    datos = generar_datos_crudos(num_proyectos)
+    if fechas_como_date:
+        # Objetos datetime.date (y None), como los devuelve mysql-connector para columnas DATE
+        hitos = datos['hitos']
+        for col in COLUMNAS_FECHA:
+            fechas = pd.to_datetime(hitos[col])
+            hitos[col] = pd.Series(fechas.dt.date, index=hitos.index, dtype=object).where(fechas.notna(), None)
+    datos['dim_proyectos'] = transform_dim_proyectos(datos)
+    datos['dim_tiempo'] = transform_dim_tiempo(datos)
+    return datos
+
+@pytest.mark.parametrize('fechas_como_date', [True, False], ids=['date', 'datetime64'])
+def test_vectorizado_igual_a_fila_a_fila(fechas_como_date):
+    datos = preparar_entrada(200, fechas_como_date)
+    resultado = transform(datos)
+    assert len(resultado) > 0
+    pd.testing.assert_frame_equal(resultado, transform_por_fila(datos))
+
+def test_hitos_de_proyectos_fuera_de_dim_proyectos():
+    datos = preparar_entrada(50, fechas_como_date=True)
+    datos['dim_proyectos'] = datos['dim_proyectos'].iloc[::2]
+    resultado = transform(datos)
+    assert set(resultado['ID_proyectos']) <= set(datos['dim_proyectos']['ID_Proyecto'])
+    pd.testing.assert_frame_equal(resultado, transform_por_fila(datos))
@@ -1,5 +1,6 @@
 import pandas as pd
 import logging
+from typing import Callable, Dict, Iterable, Iterator, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -11,6 +12,41 @@ def ensure_df(df: pd.DataFrame) -> pd.DataFrame:
 def empty_df_with_columns(columns):
     return pd.DataFrame(columns=columns)
 
+def parse_fechas(df: pd.DataFrame, columna: str) -> pd.Series:
+    """Convierte una columna de fechas a datetime (NaT si no existe o no es válida)"""
+    if columna not in df.columns:
+        return pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+    return pd.to_datetime(df[columna], errors='coerce')
+
+def retraso_dias(fecha_real: pd.Series, fecha_planificada: pd.Series) -> pd.Series:
+    """max(0, real - planificada) en días; 0 si falta alguna de las fechas"""
+    return (fecha_real - fecha_planificada).dt.days.clip(lower=0).fillna(0).astype('int64')
+
 def log_transform_info(table_name: str, input_rows: int, output_rows: int):
     """Log simple para transformaciones"""
     logger.info(f"{table_name}: {input_rows} → {output_rows} registros procesados")
+
+def transform_chunks(transform: Callable[[Dict[str, pd.DataFrame]], pd.DataFrame],
+                     chunks: Iterable[pd.DataFrame], input_name: str,
+                     context: Optional[Dict[str, pd.DataFrame]] = None,
+                     id_column: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """
+    Aplicar una transformación fila a fila (p. ej. hechos_asignaciones) bloque por bloque.
+    
+    Args:
+        transform: Función transform(df_dict) del módulo
+        chunks: Bloques de la tabla de entrada (extract_chunks)
+        input_name: Clave de la tabla en df_dict ('asignaciones', ...)
+        context: Tablas pequeñas completas que la transformación necesita (dimensiones)
+        id_column: ID secuencial que la transformación numera desde 1; se desplaza
+                   para que la numeración continúe entre bloques (no usar con claves
+                   naturales como ID_HechoAsignacion)
+    """
+    context = context or {}
+    generados = 0
+    for chunk in chunks:
+        resultado = transform({**context, input_name: chunk})
+        if id_column and not resultado.empty:
+            resultado[id_column] = resultado[id_column] + generados
+        generados += len(resultado)
+        yield resultado
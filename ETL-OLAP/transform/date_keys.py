@@ -0,0 +1,86 @@
+"""
+Claves de tiempo
+Mapeo vectorizado fecha -> ID_Tiempo construido a partir de la dim_tiempo generada,
+para que dim_hitos y las tablas de hechos usen exactamente las mismas claves que la dimensión.
+"""
+import logging
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+def fechas_dim_tiempo(dim_tiempo: pd.DataFrame) -> np.ndarray:
+    """Fecha (datetime64[D]) de cada fila de dim_tiempo, a partir de Fecha o de Anio/Mes/Dia"""
+    if 'Fecha' in dim_tiempo.columns:
+        fechas = pd.to_datetime(dim_tiempo['Fecha'])
+    else:
+        fechas = pd.to_datetime(pd.DataFrame({
+            'year': dim_tiempo['Anio'], 'month': dim_tiempo['Mes'], 'day': dim_tiempo['Dia']
+        }))
+    return fechas.to_numpy(dtype='datetime64[D]')
+
+def to_datetime64(fechas) -> np.ndarray:
+    """Convertir Series/array/lista de fechas (str, date, Timestamp) a datetime64[D]; no válidas -> NaT"""
+    if isinstance(fechas, np.ndarray) and np.issubdtype(fechas.dtype, np.datetime64):
+        return fechas.astype('datetime64[D]')
+    return np.asarray(pd.to_datetime(pd.Series(fechas), errors='coerce').to_numpy(dtype='datetime64[D]'))
+
+class DateKeyMapper:
+    """
+    Mapeo fecha -> ID_Tiempo de una dim_tiempo concreta.
+    Si la dimensión es un rango diario contiguo con IDs consecutivos (como la genera
+    dim_tiempo.transform) se resuelve con aritmética de datetime64; si no, con searchsorted.
+    Fechas fuera del rango toman la clave del extremo más cercano de la dimensión.
+    """
+
+    def __init__(self, dim_tiempo: pd.DataFrame):
+        if dim_tiempo is None or dim_tiempo.empty:
+            self.fechas = np.array([], dtype='datetime64[D]')
+            self.ids = np.array([], dtype='int64')
+        else:
+            fechas = fechas_dim_tiempo(dim_tiempo)
+            orden = np.argsort(fechas, kind='stable')
+            self.fechas = fechas[orden]
+            self.ids = dim_tiempo['ID_Tiempo'].to_numpy(dtype='int64')[orden]
+
+        self.contiguo = len(self.fechas) > 0 and bool(
+            (np.diff(self.fechas).astype('int64') == 1).all() and (np.diff(self.ids) == 1).all()
+        )
+
+    def __len__(self) -> int:
+        return len(self.fechas)
+
+    @property
+    def empty(self) -> bool:
+        return len(self.fechas) == 0
+
+    def map(self, fechas, sin_fecha: Optional[int] = 0):
+        """
+        Claves ID_Tiempo de un conjunto de fechas en una sola operación
+
+        Args:
+            fechas: Series, array o lista de fechas
+            sin_fecha: Clave para fechas nulas o no válidas; con None se devuelve
+                       un array entero nullable (pd.NA en esas posiciones)
+
+        Returns:
+            np.ndarray int64 (o IntegerArray si sin_fecha es None), alineado con la entrada
+        """
+        valores = to_datetime64(fechas)
+        nulos = np.isnat(valores)
+
+        if self.empty:
+            ids = np.zeros(len(valores), dtype='int64')
+            nulos = np.ones(len(valores), dtype=bool)
+        elif self.contiguo:
+            dias = (valores - self.fechas[0]).astype('int64')
+            ids = self.ids[0] + np.clip(dias, 0, len(self.fechas) - 1)
+        else:
+            posiciones = np.searchsorted(self.fechas, valores, side='right') - 1
+            ids = self.ids[np.clip(posiciones, 0, len(self.fechas) - 1)]
+
+        if sin_fecha is None:
+            return pd.arrays.IntegerArray(np.where(nulos, 0, ids), nulos)
+        return np.where(nulos, sin_fecha, ids).astype('int64')
@@ -0,0 +1,167 @@
+"""
+Planificador de transformaciones
+Construye el grafo de dependencias a partir de get_dependencies() de cada módulo
+y ejecuta en paralelo los nodos cuyas dependencias ya están disponibles
+"""
+import importlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from types import ModuleType
+from typing import Dict, List, Optional, Set, Tuple
+import sys
+import os
+
+import pandas as pd
+
+# Agregar path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.run_report import stage
+from utils.transform_cache import TransformCache, fingerprint_df
+
+logger = logging.getLogger(__name__)
+
+# Nodos del grafo: nombre de la tabla destino -> módulo con transform() y get_dependencies()
+TRANSFORMACIONES: Dict[str, ModuleType] = {
+    nombre: importlib.import_module(f'transform.{paquete}.{nombre}')
+    for paquete, nombre in [
+        ('transform_dim', 'dim_clientes'),
+        ('transform_dim', 'dim_empleados'),
+        ('transform_dim', 'dim_proyectos'),
+        ('transform_dim', 'dim_tiempo'),
+        ('transform_dim', 'dim_gastos'),
+        ('transform_dim', 'dim_hitos'),
+        ('transform_dim', 'dim_tareas'),
+        ('transform_dim', 'dim_pruebas'),
+        ('transform_fact', 'hechos_asignaciones'),
+        ('transform_fact', 'hechos_proyectos'),
+    ]
+}
+
+def build_graph(nodos: Dict[str, ModuleType]) -> Dict[str, Set[str]]:
+    """
+    Retorna {nodo: nodos de los que depende}. Las dependencias que no son
+    nodos del grafo se consideran tablas crudas de la extracción.
+    """
+    grafo = {nombre: set(modulo.get_dependencies()) & set(nodos) for nombre, modulo in nodos.items()}
+    
+    # Validar que no haya ciclos (orden topológico de Kahn)
+    pendientes = {nombre: set(deps) for nombre, deps in grafo.items()}
+    while pendientes:
+        listos = [nombre for nombre, deps in pendientes.items() if not deps]
+        if not listos:
+            raise ValueError(f"Dependencias cíclicas entre transformaciones: {sorted(pendientes)}")
+        for nombre in listos:
+            del pendientes[nombre]
+        for deps in pendientes.values():
+            deps.difference_update(listos)
+    
+    return grafo
+
+def run_graph(raw_data: Dict[str, pd.DataFrame], nodos: Dict[str, ModuleType] = None,
+              max_workers: int = 4, cache: Optional[TransformCache] = None
+              ) -> Tuple[Dict[str, pd.DataFrame], Dict[str, float]]:
+    """
+    Ejecuta las transformaciones respetando sus dependencias.
+    Cada nodo recibe solo las tablas que declara en get_dependencies().
+    Con cache, los nodos cuyas entradas y código no cambiaron se leen de la caché
+    (la huella de una entrada producida por otro nodo es la clave de ese nodo).
+    
+    Returns:
+        (tablas transformadas en el orden de registro, segundos por nodo)
+    """
+    nodos = nodos or TRANSFORMACIONES
+    grafo = build_graph(nodos)
+    
+    resultados: Dict[str, pd.DataFrame] = {}
+    tiempos: Dict[str, float] = {}
+    pendientes = dict(grafo)
+    claves: Dict[str, Optional[str]] = {}
+    huellas_crudas: Dict[str, Optional[str]] = {}
+    lock_huellas = threading.Lock()
+    
+    def huella(dep: str) -> Optional[str]:
+        if dep in claves:
+            return claves[dep] and f"nodo:{claves[dep]}"
+        if dep not in raw_data:
+            return "ausente"
+        with lock_huellas:
+            if dep not in huellas_crudas:
+                huellas_crudas[dep] = fingerprint_df(raw_data[dep])
+            return huellas_crudas[dep]
+    
+    def entradas_de(nombre: str) -> Dict[str, pd.DataFrame]:
+        """Solo las tablas declaradas por el nodo (referencias, sin copiar)"""
+        entradas = {}
+        for dep in nodos[nombre].get_dependencies():
+            if dep in resultados:
+                entradas[dep] = resultados[dep]
+            elif dep in raw_data:
+                entradas[dep] = raw_data[dep]
+        return entradas
+    
+    def ejecutar(nombre: str, entradas: Dict[str, pd.DataFrame]) -> Tuple[str, pd.DataFrame, float]:
+        with stage('transform', nombre) as registro:
+            inicio = time.perf_counter()
+            df = None
+            if cache is not None:
+                huellas = {dep: huella(dep) for dep in nodos[nombre].get_dependencies()}
+                claves[nombre] = cache.key(nombre, nodos[nombre], huellas)
+                df = cache.get(nombre, claves[nombre])
+                registro['cache'] = 'miss' if df is None else 'hit'
+            
+            if df is None:
+                df = nodos[nombre].transform(entradas)
+                if cache is not None:
+                    cache.put(nombre, claves[nombre], df, time.perf_counter() - inicio)
+            registro['rows'] = len(df)
+            registro['input_rows'] = sum(len(entrada) for entrada in entradas.values())
+        return nombre, df, time.perf_counter() - inicio
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        en_curso = {}
+        while pendientes or en_curso:
+            # Lanzar todos los nodos cuyas dependencias ya terminaron
+            listos = [nombre for nombre, deps in pendientes.items() if deps <= resultados.keys()]
+            for nombre in listos:
+                del pendientes[nombre]
+                en_curso[executor.submit(ejecutar, nombre, entradas_de(nombre))] = nombre
+            
+            terminados, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+            for futuro in terminados:
+                del en_curso[futuro]
+                try:
+                    nombre, df, segundos = futuro.result()
+                except Exception:
+                    for otro in en_curso:
+                        otro.cancel()
+                    raise
+                resultados[nombre] = df
+                tiempos[nombre] = segundos
+                logger.debug(f"{nombre}: transformado en {segundos:.3f}s")
+    
+    ordenados = {nombre: resultados[nombre] for nombre in nodos}
+    return ordenados, tiempos
+
+def critical_path(grafo: Dict[str, Set[str]], tiempos: Dict[str, float]) -> List[str]:
+    """Camino de mayor duración acumulada en el grafo (cota inferior del tiempo total)"""
+    acumulado: Dict[str, float] = {}
+    previo: Dict[str, str] = {}
+    
+    def costo(nombre: str) -> float:
+        if nombre not in acumulado:
+            mejor = max(grafo[nombre], key=costo, default=None)
+            acumulado[nombre] = tiempos.get(nombre, 0.0) + (costo(mejor) if mejor else 0.0)
+            previo[nombre] = mejor
+        return acumulado[nombre]
+    
+    if not grafo:
+        return []
+    nodo = max(grafo, key=costo)
+    camino = []
+    while nodo:
+        camino.append(nodo)
+        nodo = previo[nodo]
+    return camino[::-1]
@@ -26,7 +26,7 @@ def transform(df_dict: Dict[str, pd.DataFrame]) -> pd.DataFrame:
     
     # Limpiar datos (sin incluir NombreCompleto)
     df['Rol'] = df['Rol'].astype(str).str.strip()
-    df['Seniority'] = df['Seniority'].fillna('No especificado').astype(str).str.strip()
+    df['Seniority'] = df['Seniority'].astype(object).fillna('No especificado').astype(str).str.strip()
 
     # Seleccionar SOLO las columnas requeridas para el DW (sin NombreCompleto)
     result = df[['ID_Empleado','CodigoEmpleado','Rol','Seniority']]
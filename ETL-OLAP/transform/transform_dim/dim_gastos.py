@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 import logging
 from typing import Dict
@@ -14,52 +15,83 @@ logger = logging.getLogger(__name__)
 def get_dependencies():
     return ['gastos', 'penalizaciones']
 
+COLUMNAS_DIM_GASTOS = ['ID_Finanza', 'TipoGasto', 'Categoria', 'Monto']
+
+# Rango de ID_Finanza (INT con signo del DW)
+MAX_CLAVE = 2**31 - 1
+
+def normalizar_gastos(df: pd.DataFrame) -> pd.DataFrame:
+    """TipoGasto, Categoria y Monto limpios, con los mismos valores por defecto que la dimensión"""
+    resultado = pd.DataFrame(index=df.index)
+    for col in ['TipoGasto', 'Categoria']:
+        valores = df[col] if col in df.columns else pd.Series('No especificado', index=df.index)
+        resultado[col] = valores.astype(object).fillna('No especificado').astype(str).str.strip()
+    monto = df['Monto'] if 'Monto' in df.columns else pd.Series(0, index=df.index)
+    resultado['Monto'] = pd.to_numeric(monto, errors='coerce').fillna(0).astype(float)
+    return resultado
+
+def claves_combinaciones(combinaciones: pd.DataFrame) -> pd.Series:
+    """
+    ID_Finanza estable de cada combinación (TipoGasto, Categoria) distinta: depende solo
+    del contenido de la combinación, así no cambia entre ejecuciones ni según qué otras
+    combinaciones aparezcan. Dos combinaciones con la misma clave son un error.
+    """
+    hashes = pd.util.hash_pandas_object(combinaciones[['TipoGasto', 'Categoria']], index=False)
+    claves = pd.Series((hashes.to_numpy() % np.uint64(MAX_CLAVE)).astype('int64') + 1, index=combinaciones.index)
+    
+    repetidas = claves.duplicated(keep=False)
+    if repetidas.any():
+        choques = combinaciones.loc[repetidas, ['TipoGasto', 'Categoria']].assign(ID_Finanza=claves[repetidas])
+        raise ValueError(f"dim_gastos: colisión de ID_Finanza entre combinaciones distintas:\n{choques}")
+    return claves
+
+def claves_gasto(gastos: pd.DataFrame, dim_gastos: pd.DataFrame) -> pd.Series:
+    """
+    ID_Finanza de cada fila de gastos (mapeo fila -> dimensión), alineado con su índice:
+    se busca su combinación (TipoGasto, Categoria) en dim_gastos. Sin combinación -> 0.
+    """
+    if gastos.empty:
+        return pd.Series(dtype='int64', index=gastos.index)
+    normalizados = normalizar_gastos(gastos)
+    dimension = pd.DataFrame(columns=['TipoGasto', 'Categoria', 'ID_Finanza']) if dim_gastos is None or dim_gastos.empty \
+        else dim_gastos[['TipoGasto', 'Categoria', 'ID_Finanza']].astype({'TipoGasto': str, 'Categoria': str})
+    claves = normalizados.merge(dimension, on=['TipoGasto', 'Categoria'], how='left')['ID_Finanza']
+    
+    sin_clave = claves.isna()
+    if sin_clave.any():
+        logger.warning(f'dim_gastos: {int(sin_clave.sum())} gastos sin combinación en dim_gastos, ID_Finanza = 0')
+    return pd.Series(claves.fillna(0).to_numpy(dtype='int64'), index=gastos.index)
+
 def transform(df_dict: Dict[str, pd.DataFrame]) -> pd.DataFrame:
     """
-    Combina:
+    Una fila por combinación (TipoGasto, Categoria) distinta, con el monto total:
     - Tabla gastos: TipoGasto, Categoria, Monto
-    - Tabla penalizaciones: se agrega como TipoGasto='Penalizaciones' con su monto
+    - Tabla penalizaciones: se agrega como TipoGasto='Penalizaciones', Categoria='OPEX'
     """
     gastos = ensure_df(df_dict.get('gastos', pd.DataFrame()))
     penalizaciones = ensure_df(df_dict.get('penalizaciones', pd.DataFrame()))
     
-    gastos_data = []
-    
-    # Procesar gastos regulares
+    partes = []
     if not gastos.empty:
-        for _, row in gastos.iterrows():
-            gastos_data.append({
-                'TipoGasto': row.get('TipoGasto', 'No especificado'),
-                'Categoria': row.get('Categoria', 'No especificado'),
-                'Monto': float(row.get('Monto', 0))
-            })
+        partes.append(normalizar_gastos(gastos))
     
-    # Procesar penalizaciones como tipo de gasto especial
+    # Penalizaciones como tipo de gasto especial (gastos operativos)
     if not penalizaciones.empty:
-        for _, row in penalizaciones.iterrows():
-            gastos_data.append({
-                'TipoGasto': 'Penalizaciones',
-                'Categoria': 'OPEX',  # Las penalizaciones son gastos operativos
-                'Monto': float(row.get('Monto', 0))
-            })
+        partes.append(normalizar_gastos(
+            penalizaciones[['Monto']].assign(TipoGasto='Penalizaciones', Categoria='OPEX')
+        ))
     
-    # Crear DataFrame resultado
-    if not gastos_data:
+    if not partes:
         logger.warning('dim_gastos: No hay datos de gastos para procesar')
-        return pd.DataFrame(columns=['ID_Finanza', 'TipoGasto', 'Categoria', 'Monto'])
-    
-    result = pd.DataFrame(gastos_data)
-    
-    # Agregar ID secuencial
-    result.insert(0, 'ID_Finanza', range(1, len(result) + 1))
+        return pd.DataFrame(columns=COLUMNAS_DIM_GASTOS)
     
-    # Limpiar datos
-    result['TipoGasto'] = result['TipoGasto'].astype(str).str.strip()
-    result['Categoria'] = result['Categoria'].astype(str).str.strip()
-    result['Monto'] = pd.to_numeric(result['Monto'], errors='coerce').fillna(0)
+    movimientos = pd.concat(partes, ignore_index=True)
+    result = movimientos.groupby(['TipoGasto', 'Categoria'], as_index=False, sort=True)['Monto'].sum()
+    result['ID_Finanza'] = claves_combinaciones(result)
+    result = result[COLUMNAS_DIM_GASTOS]
     
     # Log del resultado
     total_input = len(gastos) + len(penalizaciones)
     log_transform_info('dim_gastos', total_input, len(result))
     
-    return result
\ No newline at end of file
+    return result
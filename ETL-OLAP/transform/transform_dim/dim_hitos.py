@@ -7,52 +7,86 @@ import os
 # Agregar path para imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from transform.common import ensure_df, log_transform_info
+from transform.common import ensure_df, log_transform_info, parse_fechas, retraso_dias
+from transform.date_keys import DateKeyMapper
 
 logger = logging.getLogger(__name__)
 
 def get_dependencies():
-    return ['hitos', 'proyectos', 'dim_proyectos']
+    return ['hitos', 'proyectos', 'dim_proyectos', 'dim_tiempo']
 
-def transform(df_dict: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+COLUMNAS_DIM_HITOS = ['ID_Hito', 'CodigoHito', 'ID_proyectos', 'ID_FechaInicio', 'ID_FechaFin', 'RetrasoInicioDias', 'RetrasoFinDias']
+
+def _hitos_validos(df_dict: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """Hitos crudos de proyectos presentes en dim_proyectos (vacío si no queda ninguno)"""
     hitos = ensure_df(df_dict.get('hitos', pd.DataFrame()))
     dim_proyectos = ensure_df(df_dict.get('dim_proyectos', pd.DataFrame()))
     
     if hitos.empty:
         logger.warning('dim_hitos: No hay datos de hitos')
-        return pd.DataFrame(columns=['ID_Hito','CodigoHito','ID_proyectos','ID_FechaInicio','ID_FechaFin','RetrasoInicioDias','RetrasoFinDias'])
+        return hitos
 
     df = hitos.copy()
     df['CodigoHito'] = df['ID_Hito']
     
     # Filtrar hitos que pertenecen a proyectos válidos en dim_proyectos
     if not dim_proyectos.empty:
-        proyectos_validos = set(dim_proyectos['ID_Proyecto'].unique())
         df_antes_filtro = len(df)
-        df = df[df['ID_Proyecto'].isin(proyectos_validos)]
+        df = df[df['ID_Proyecto'].isin(dim_proyectos['ID_Proyecto'].unique())]
         if len(df) < df_antes_filtro:
             logger.info(f'dim_hitos: Filtrados {df_antes_filtro - len(df)} hitos con proyectos inexistentes en dim_proyectos')
     
     if df.empty:
         logger.warning('dim_hitos: No quedan hitos después de filtrar por proyectos válidos')
-        return pd.DataFrame(columns=['ID_Hito','CodigoHito','ID_proyectos','ID_FechaInicio','ID_FechaFin','RetrasoInicioDias','RetrasoFinDias'])
+    return df
+
+def _resultado(df: pd.DataFrame) -> pd.DataFrame:
+    """Seleccionar y renombrar las columnas finales según el esquema del DW"""
+    result = df[['ID_Hito','CodigoHito','ID_Proyecto','ID_FechaInicio','ID_FechaFinalizacion','RetrasoInicioDias','RetrasoFinDias']].copy()
+    return result.rename(columns={
+        'ID_Proyecto': 'ID_proyectos',
+        'ID_FechaFinalizacion': 'ID_FechaFin'
+    })
+
+def transform(df_dict: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    df = _hitos_validos(df_dict)
+    if df.empty:
+        return pd.DataFrame(columns=COLUMNAS_DIM_HITOS)
     
-    # Función para convertir fecha a ID de dim_tiempo
-    def fecha_to_tiempo_id(fecha_str):
-        if pd.isna(fecha_str) or str(fecha_str) == 'None':
-            return None
-        try:
-            fecha = pd.to_datetime(fecha_str)
-            # Generar ID basado en días desde 2019-01-01 (fecha base de dim_tiempo)
-            base_date = pd.to_datetime('2019-01-01')
-            days_diff = (fecha - base_date).days + 1
-            return max(1, days_diff) if days_diff > 0 else 1
-        except:
-            return 1  # Default al primer ID de tiempo
+    claves_tiempo = DateKeyMapper(ensure_df(df_dict.get('dim_tiempo', pd.DataFrame())))
+    if claves_tiempo.empty:
+        logger.warning('dim_hitos: dim_tiempo vacía, ID_FechaInicio/ID_FechaFin quedan en NULL')
+    
+    # Cada columna de fecha se convierte una sola vez
+    fecha_inicio = parse_fechas(df, 'FechaInicio')
+    fecha_inicio_real = parse_fechas(df, 'FechaInicioReal')
+    fecha_fin_plan = parse_fechas(df, 'FechaFinPlanificada')
+    fecha_fin_real = parse_fechas(df, 'FechaFinReal')
     
-    # Mapear fechas a IDs de dim_tiempo
-    df['ID_FechaInicio'] = df['FechaInicio'].apply(fecha_to_tiempo_id)
-    df['ID_FechaFinalizacion'] = df['FechaFinReal'].apply(fecha_to_tiempo_id)
+    # Mapear fechas a IDs de dim_tiempo (sin fecha -> NULL)
+    df['ID_FechaInicio'] = claves_tiempo.map(fecha_inicio, sin_fecha=None)
+    df['ID_FechaFinalizacion'] = claves_tiempo.map(fecha_fin_real, sin_fecha=None)
+    
+    # RetrasoInicioDias: FechaInicioReal - FechaInicio; RetrasoFinDias: FechaFinReal - FechaFinPlanificada
+    df['RetrasoInicioDias'] = retraso_dias(fecha_inicio_real, fecha_inicio)
+    df['RetrasoFinDias'] = retraso_dias(fecha_fin_real, fecha_fin_plan)
+    
+    result = _resultado(df)
+    log_transform_info('dim_hitos', len(ensure_df(df_dict.get('hitos', pd.DataFrame()))), len(result))
+    return result
+
+def transform_por_fila(df_dict: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Implementación original con apply fila a fila.
+    Se conserva como referencia para validar y medir la versión vectorizada.
+    """
+    df = _hitos_validos(df_dict)
+    if df.empty:
+        return pd.DataFrame(columns=COLUMNAS_DIM_HITOS)
+    
+    claves_tiempo = DateKeyMapper(ensure_df(df_dict.get('dim_tiempo', pd.DataFrame())))
+    df['ID_FechaInicio'] = claves_tiempo.map(df['FechaInicio'], sin_fecha=None)
+    df['ID_FechaFinalizacion'] = claves_tiempo.map(df['FechaFinReal'], sin_fecha=None)
     
     # Calcular RetrasoInicioDias: FechaInicioReal - FechaInicio
     def calcular_retraso_inicio(fecha_real, fecha_planificada):
@@ -87,15 +121,5 @@ def transform(df_dict: Dict[str, pd.DataFrame]) -> pd.DataFrame:
         lambda row: calcular_retraso_fin(row.get('FechaFinReal'), row.get('FechaFinPlanificada')), 
         axis=1
     )
-
-    # Seleccionar columnas finales para el DW
-    result = df[['ID_Hito','CodigoHito','ID_Proyecto','ID_FechaInicio','ID_FechaFinalizacion','RetrasoInicioDias','RetrasoFinDias']].copy()
-    
-    # Renombrar las columnas para que coincidan con el esquema del DW
-    result = result.rename(columns={
-        'ID_Proyecto': 'ID_proyectos',
-        'ID_FechaFinalizacion': 'ID_FechaFin'
-    })
     
-    log_transform_info('dim_hitos', len(hitos), len(result))
-    return result
+    return _resultado(df)
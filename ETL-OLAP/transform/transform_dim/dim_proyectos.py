@@ -39,7 +39,7 @@ def transform(df_dict: Dict[str, pd.DataFrame]) -> pd.DataFrame:
         df['Cancelado'] = 0
     
     # Limpiar versión
-    df['Version'] = df['Version'].fillna('1.0').astype(str).str.strip()
+    df['Version'] = df['Version'].astype(str).where(df['Version'].notna(), '1.0').str.strip()
     
     # Obtener ID_Cliente desde contratos
     contratos = df_dict.get('contratos', pd.DataFrame())
@@ -1,7 +1,7 @@
+import numpy as np
 import pandas as pd
 import logging
 from typing import Dict
-from datetime import datetime, timedelta
 import sys
 import os
 
@@ -15,105 +15,95 @@ logger = logging.getLogger(__name__)
 def get_dependencies():
     return ['proyectos', 'hitos', 'asignaciones', 'gastos', 'penalizaciones']
 
-# Removed subdimensions - now using simplified structure
+# Columnas de fecha de cada tabla cruda que dim_tiempo debe cubrir
+COLUMNAS_FECHA = {
+    'proyectos': ['FechaInicio', 'FechaFin', 'FechaFinReal'],
+    'hitos': ['FechaInicio', 'FechaFinPlanificada', 'FechaFinReal'],
+    'asignaciones': ['FechaAsignacion'],
+    'gastos': ['Fecha'],
+    'penalizaciones': ['Fecha'],
+}
 
-def extract_dates_from_data(df_dict: Dict[str, pd.DataFrame]) -> list:
-    fechas = set()
-    
-    # Proyectos
-    proyectos = df_dict.get('proyectos', pd.DataFrame())
-    if not proyectos.empty:
-        for col in ['FechaInicio', 'FechaFin']:
-            if col in proyectos.columns:
-                fechas.update(proyectos[col].dropna().tolist())
-    
-    # Hitos
-    hitos = df_dict.get('hitos', pd.DataFrame())
-    if not hitos.empty:
-        for col in ['FechaInicio', 'FechaFinPlanificada', 'FechaFinReal']:
-            if col in hitos.columns:
-                fechas.update(hitos[col].dropna().tolist())
-    
-    # Asignaciones
-    asignaciones = df_dict.get('asignaciones', pd.DataFrame())
-    if not asignaciones.empty and 'FechaAsignacion' in asignaciones.columns:
-        fechas.update(asignaciones['FechaAsignacion'].dropna().tolist())
+# Rango mínimo del calendario (cubre todo el SGP)
+INICIO_CALENDARIO = pd.Timestamp(2019, 1, 1)
+FIN_CALENDARIO = pd.Timestamp(2025, 12, 31)
+
+# ID_Tiempo = días desde esta fecha: la clave de un día no depende del rango del calendario,
+# así una carga incremental produce las mismas claves que una completa
+EPOCA_ID_TIEMPO = pd.Timestamp(1899, 12, 31)
+
+# Mes en que empieza el año fiscal (1 = año calendario); el año fiscal se nombra por el año en que termina
+MES_INICIO_FISCAL = 1
+
+def extract_dates_from_data(df_dict: Dict[str, pd.DataFrame]) -> pd.DatetimeIndex:
+    """Fechas válidas distintas (normalizadas a día) presentes en las tablas crudas"""
+    columnas = []
+    for tabla, nombres in COLUMNAS_FECHA.items():
+        df = df_dict.get(tabla, pd.DataFrame())
+        if df is None or df.empty:
+            continue
+        for col in nombres:
+            if col in df.columns:
+                columnas.append(pd.to_datetime(df[col], errors='coerce').to_numpy(dtype='datetime64[D]'))
     
-    # Gastos
-    gastos = df_dict.get('gastos', pd.DataFrame())
-    if not gastos.empty and 'Fecha' in gastos.columns:
-        fechas.update(gastos['Fecha'].dropna().tolist())
+    if not columnas:
+        return pd.DatetimeIndex([])
+    fechas = np.unique(np.concatenate(columnas))
+    return pd.DatetimeIndex(fechas[~np.isnat(fechas)])
+
+def build_calendar(inicio, fin) -> pd.DataFrame:
+    """Calendario diario [inicio, fin] con la jerarquía temporal precalculada"""
+    fechas = pd.date_range(pd.Timestamp(inicio).normalize(), pd.Timestamp(fin).normalize(), freq='D')
+    anio = fechas.year.to_numpy()
+    mes = fechas.month.to_numpy()
+    trimestre = (mes - 1) // 3 + 1
+    iso = fechas.isocalendar()
     
-    # Penalizaciones  
-    penalizaciones = df_dict.get('penalizaciones', pd.DataFrame())
-    if not penalizaciones.empty and 'Fecha' in penalizaciones.columns:
-        fechas.update(penalizaciones['Fecha'].dropna().tolist())
+    mes_fiscal = (mes - MES_INICIO_FISCAL) % 12 + 1
+    anio_fiscal = anio + (mes >= MES_INICIO_FISCAL) * (MES_INICIO_FISCAL > 1)
+    trimestre_fiscal = (mes_fiscal - 1) // 3 + 1
     
-    # Filtrar fechas válidas y convertir
-    fechas_validas = []
-    for fecha in fechas:
-        try:
-            if isinstance(fecha, str):
-                fecha_dt = pd.to_datetime(fecha)
-            else:
-                fecha_dt = pd.to_datetime(fecha)
-            fechas_validas.append(fecha_dt.date())
-        except:
-            continue
+    # Las etiquetas de texto se arman una vez por mes del calendario y se expanden por índice
+    anio_mes = anio * 100 + mes
+    meses, posicion = np.unique(anio_mes, return_inverse=True)
+    anio_u, mes_u = meses // 100, meses % 100
+    mes_fiscal_u = (mes_u - MES_INICIO_FISCAL) % 12 + 1
+    anio_fiscal_u = anio_u + (mes_u >= MES_INICIO_FISCAL) * (MES_INICIO_FISCAL > 1)
+    periodo_trimestre = np.array([f'{a}-Q{(m - 1) // 3 + 1}' for a, m in zip(anio_u, mes_u)], dtype=object)
+    periodo_fiscal = np.array([f'FY{a}-P{m:02d}' for a, m in zip(anio_fiscal_u, mes_fiscal_u)], dtype=object)
     
-    return sorted(list(set(fechas_validas)))
+    return pd.DataFrame({
+        'ID_Tiempo': (fechas - EPOCA_ID_TIEMPO).days.to_numpy(dtype='int64'),
+        'Dia': fechas.day.to_numpy(),
+        'Mes': mes,
+        'Anio': anio,
+        'Fecha': fechas,
+        'Trimestre': trimestre,
+        'SemanaISO': iso['week'].to_numpy(dtype='int64'),
+        'AnioISO': iso['year'].to_numpy(dtype='int64'),
+        'InicioMes': fechas - pd.to_timedelta(fechas.day - 1, unit='D'),
+        'AnioMes': anio_mes,
+        'PeriodoTrimestre': periodo_trimestre[posicion],
+        'AnioFiscal': anio_fiscal,
+        'TrimestreFiscal': trimestre_fiscal,
+        'PeriodoFiscal': periodo_fiscal[posicion],
+    })
 
 def transform(df_dict: Dict[str, pd.DataFrame]) -> pd.DataFrame:
     
     # Extraer fechas de los datos
     fechas_encontradas = extract_dates_from_data(df_dict)
     
-    if not fechas_encontradas:
+    if fechas_encontradas.empty:
         logger.warning('dim_tiempo: No se encontraron fechas en los datos')
-        # Crear rango desde 2019 hasta actualidad para cubrir todo el SGP
-        start_date = datetime(2019, 1, 1).date()
-        end_date = datetime(2025, 12, 31).date()
-        fechas_rango = []
-        current_date = start_date
-        while current_date <= end_date:
-            fechas_rango.append(current_date)
-            current_date += timedelta(days=1)
-        fechas_encontradas = fechas_rango
+        inicio, fin = INICIO_CALENDARIO, FIN_CALENDARIO
     else:
-        # Si encontramos fechas, expandir el rango para asegurar cobertura completa
-        min_fecha = min(fechas_encontradas)
-        max_fecha = max(fechas_encontradas)
-        
-        # Expandir hacia atrás hasta 2019 si es necesario
-        start_expand = datetime(2019, 1, 1).date()
-        if min_fecha > start_expand:
-            min_fecha = start_expand
-            
-        # Expandir hacia adelante hasta 2025 si es necesario  
-        end_expand = datetime(2025, 12, 31).date()
-        if max_fecha < end_expand:
-            max_fecha = end_expand
-        
-        # Generar rango completo de fechas
-        fechas_completas = []
-        current_date = min_fecha
-        while current_date <= max_fecha:
-            fechas_completas.append(current_date)
-            current_date += timedelta(days=1)
-        fechas_encontradas = sorted(fechas_completas)
-    
-    logger.info(f'dim_tiempo: Generando {len(fechas_encontradas)} fechas desde {fechas_encontradas[0]} hasta {fechas_encontradas[-1]}')
+        # Expandir el rango para cubrir al menos 2019-2025
+        inicio = min(fechas_encontradas[0], INICIO_CALENDARIO)
+        fin = max(fechas_encontradas[-1], FIN_CALENDARIO)
     
-    # Crear dimensión tiempo simplificada
-    dim_tiempo = []
-    for i, fecha in enumerate(fechas_encontradas, 1):
-        dim_tiempo.append({
-            'ID_Tiempo': i,
-            'Dia': fecha.day,
-            'Mes': fecha.month,
-            'Anio': fecha.year
-        })
+    result = build_calendar(inicio, fin)
+    logger.info(f'dim_tiempo: Generando {len(result)} fechas desde {inicio.date()} hasta {fin.date()}')
     
-    result = pd.DataFrame(dim_tiempo)
     log_transform_info('dim_tiempo', len(fechas_encontradas), len(result))
-    return result
\ No newline at end of file
+    return result
@@ -8,11 +8,12 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from transform.common import ensure_df, log_transform_info
+from transform.date_keys import DateKeyMapper
 
 logger = logging.getLogger(__name__)
 
 def get_dependencies():
-    return ['asignaciones', 'empleados', 'proyectos', 'dim_proyectos']
+    return ['asignaciones', 'empleados', 'proyectos', 'dim_proyectos', 'dim_tiempo']
 
 def transform(df_dict: Dict[str, pd.DataFrame]) -> pd.DataFrame:
     # Obtener datos de entrada
@@ -31,8 +32,8 @@ def transform(df_dict: Dict[str, pd.DataFrame]) -> pd.DataFrame:
     # Trabajar con copia
     df = asignaciones.copy()
     
-    # ID_HechoAsignacion: ID generado secuencial
-    df['ID_HechoAsignacion'] = range(1, len(df) + 1)
+    # ID_HechoAsignacion: clave natural de la asignación (estable entre ejecuciones, para mode='merge')
+    df['ID_HechoAsignacion'] = df['ID_Asignacion']
     
     # Filtrar asignaciones que pertenecen a proyectos válidos en dim_proyectos
     if not dim_proyectos.empty:
@@ -41,33 +42,10 @@ def transform(df_dict: Dict[str, pd.DataFrame]) -> pd.DataFrame:
         df = df[df['ID_Proyecto'].isin(proyectos_validos)]
         if len(df) < df_antes_filtro:
             logger.info(f'hechos_asignaciones: Filtradas {df_antes_filtro - len(df)} asignaciones con proyectos inexistentes en dim_proyectos')
-        
-        # Regenerar ID_HechoAsignacion después del filtro
-        df['ID_HechoAsignacion'] = range(1, len(df) + 1)
     
-    # ID_FechaAsignacion: Mapear fecha a ID de dim_tiempo
+    # ID_FechaAsignacion: Mapear fecha a ID de dim_tiempo (fuera de rango -> extremo más cercano)
     if not dim_tiempo.empty:
-        # Convertir fechas a formato date para mapeo
-        df['FechaAsignacion_date'] = pd.to_datetime(df['FechaAsignacion'], errors='coerce').dt.date
-        
-        # Como dim_tiempo solo tiene Dia, Mes, Anio, creamos un mapeo simple
-        # usando el ID_Tiempo secuencial basado en la fecha desde 2019-01-01
-        def fecha_to_tiempo_id(fecha_date):
-            if pd.isna(fecha_date):
-                return 0
-            try:
-                base_date = pd.to_datetime('2019-01-01').date()
-                days_diff = (fecha_date - base_date).days + 1
-                return max(1, days_diff) if days_diff > 0 else 1
-            except:
-                return 1
-        
-        df['ID_FechaAsignacion'] = df['FechaAsignacion_date'].apply(fecha_to_tiempo_id)
-        
-        # Manejar fechas fuera de rango
-        max_tiempo_id = len(dim_tiempo) if len(dim_tiempo) > 0 else 2557  # Rango hasta 2025
-        df['ID_FechaAsignacion'] = df['ID_FechaAsignacion'].clip(upper=max_tiempo_id)
-        
+        df['ID_FechaAsignacion'] = DateKeyMapper(dim_tiempo).map(df['FechaAsignacion'], sin_fecha=0)
     else:
         logger.warning('hechos_asignaciones: dim_tiempo vacía, usando 0 como ID_FechaAsignacion')
         df['ID_FechaAsignacion'] = 0
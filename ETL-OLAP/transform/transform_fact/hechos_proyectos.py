@@ -1,26 +1,26 @@
 import pandas as pd
 import logging
 from typing import Dict, Optional
-from datetime import datetime
 import sys
 import os
 
 # Agregar path para imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from transform.common import ensure_df, log_transform_info
+from transform.common import ensure_df, log_transform_info, parse_fechas, retraso_dias
+from transform.date_keys import DateKeyMapper
+from transform.transform_dim.dim_gastos import claves_gasto
 
 logger = logging.getLogger(__name__)
 
 def get_dependencies():
-    return ['proyectos', 'contratos', 'errores', 'asignaciones', 'hitos', 'tareas', 'gastos', 'penalizaciones', 'dim_tiempo', 'dim_proyectos', 'dim_gastos']
+    return ['proyectos', 'contratos', 'errores', 'asignaciones', 'hitos', 'tareas', 'pruebas', 'gastos', 'penalizaciones', 'dim_tiempo', 'dim_proyectos', 'dim_gastos', 'dim_tareas']
 
 def calculate_project_metrics(proyecto_id: int, df_dict: Dict[str, pd.DataFrame]) -> Optional[Dict]: 
     # Obtener datos principales
     proyectos = df_dict.get('proyectos', pd.DataFrame())
     contratos = df_dict.get('contratos', pd.DataFrame())
     gastos = df_dict.get('gastos', pd.DataFrame())  # Raw gastos para montos
-    dim_gastos = df_dict.get('dim_gastos', pd.DataFrame())  # Dimension gastos para IDs
     penalizaciones = df_dict.get('penalizaciones', pd.DataFrame())
     dim_tiempo = df_dict.get('dim_tiempo', pd.DataFrame())
     
@@ -67,53 +67,12 @@ def calculate_project_metrics(proyecto_id: int, df_dict: Dict[str, pd.DataFrame]
         if pd.notna(fecha_fin_real) and pd.notna(fecha_fin_plan):
             metrics['RetrasoFinalDias'] = max(0, (fecha_fin_real - fecha_fin_plan).days)
         
-        # Mapear fechas a ID_Tiempo usando fórmula matemática
-        # dim_tiempo empieza en 2018-01-01 con ID_Tiempo=1 (según log: desde 2018-01-01 hasta 2027-03-29)
-        base_date = datetime(2018, 1, 1).date()
-        
-        if pd.notna(fecha_inicio):
-            try:
-                if isinstance(fecha_inicio, str):
-                    fecha_inicio_date = pd.to_datetime(fecha_inicio).date()
-                elif hasattr(fecha_inicio, 'date'):
-                    fecha_inicio_date = fecha_inicio.date()
-                else:
-                    # Convertir directamente a date si es posible
-                    fecha_inicio_date = pd.to_datetime(str(fecha_inicio)).date()
-                
-                # Calcular días desde la fecha base + 1 (porque ID_Tiempo empieza en 1)
-                dias_desde_base = (fecha_inicio_date - base_date).days + 1  # type: ignore
-                # Validar que esté dentro del rango de dim_tiempo (1 a 3375)
-                if 1 <= dias_desde_base <= 3375:
-                    metrics['ID_FechaInicio'] = dias_desde_base
-                else:
-                    # Si está fuera del rango, usar fecha por defecto (2018-01-01 = ID 1)
-                    metrics['ID_FechaInicio'] = 1
-            except Exception:
-                metrics['ID_FechaInicio'] = 1
-        
-        if pd.notna(fecha_fin_real) or pd.notna(fecha_fin_plan):
-            fecha_fin_para_mapeo = fecha_fin_real if pd.notna(fecha_fin_real) else fecha_fin_plan
-            
-            try:
-                if isinstance(fecha_fin_para_mapeo, str):
-                    fecha_fin_date = pd.to_datetime(fecha_fin_para_mapeo).date()
-                elif hasattr(fecha_fin_para_mapeo, 'date'):
-                    fecha_fin_date = fecha_fin_para_mapeo.date()
-                else:
-                    # Convertir directamente a date si es posible
-                    fecha_fin_date = pd.to_datetime(str(fecha_fin_para_mapeo)).date()
-                
-                # Calcular días desde la fecha base + 1 (porque ID_Tiempo empieza en 1)
-                dias_desde_base = (fecha_fin_date - base_date).days + 1  # type: ignore
-                # Validar que esté dentro del rango de dim_tiempo (1 a 3375)
-                if 1 <= dias_desde_base <= 3375:
-                    metrics['ID_FechaFin'] = dias_desde_base
-                else:
-                    # Si está fuera del rango, usar fecha por defecto (2018-01-01 = ID 1)
-                    metrics['ID_FechaFin'] = 1
-            except Exception:
-                metrics['ID_FechaFin'] = 1
+        # Mapear fechas a ID_Tiempo con las claves de dim_tiempo (sin fecha -> 0)
+        claves_tiempo = DateKeyMapper(dim_tiempo)
+        fecha_fin_para_mapeo = fecha_fin_real if pd.notna(fecha_fin_real) else fecha_fin_plan
+        id_inicio, id_fin = claves_tiempo.map([fecha_inicio, fecha_fin_para_mapeo], sin_fecha=0)
+        metrics['ID_FechaInicio'] = int(id_inicio)
+        metrics['ID_FechaFin'] = int(id_fin)
     except Exception as e:
         logger.warning(f'Error calculando fechas para proyecto {proyecto_id}: {e}')
     
@@ -133,12 +92,10 @@ def calculate_project_metrics(proyecto_id: int, df_dict: Dict[str, pd.DataFrame]
     if not gastos_proyecto.empty:
         costo_gastos = float(gastos_proyecto['Monto'].sum())
         
-        # ID_Gasto: usar el primer gasto disponible en dim_gastos
-        # Simplificado para evitar problemas de FK constraint
-        if not dim_gastos.empty:
-            metrics['ID_Gasto'] = int(dim_gastos.iloc[0]['ID_Finanza'])
-        else:
-            metrics['ID_Gasto'] = 1  # Default ID
+        # ID_Gasto: combinación (TipoGasto, Categoria) de dim_gastos con mayor monto en el proyecto
+        claves = claves_gasto(gastos_proyecto, df_dict.get('dim_gastos', pd.DataFrame()))
+        monto_por_clave = gastos_proyecto['Monto'].astype(float).groupby(claves).sum()
+        metrics['ID_Gasto'] = int(monto_por_clave.idxmax())
         
         # ProporcionCAPEX_OPEX: CAPEX / OPEX
         gastos_capex = gastos_proyecto[gastos_proyecto['Categoria'] == 'CAPEX']['Monto'].sum()
@@ -273,6 +230,156 @@ def calculate_project_metrics(proyecto_id: int, df_dict: Dict[str, pd.DataFrame]
     
     return metrics
 
+COLUMNAS_HECHOS = [
+    'ID_Hecho', 'ID_Proyecto', 'ID_Gasto', 'ID_FechaInicio', 'ID_FechaFin',
+    'RetrasoInicioDias', 'RetrasoFinalDias', 'Presupuesto', 'CosteReal',
+    'DesviacionPresupuestal', 'PenalizacionesMonto', 'ProporcionCAPEX_OPEX',
+    'TasaDeErroresEncontrados', 'TasaDeExitoEnPruebas', 'ProductividadPromedio',
+    'PorcentajeTareasRetrasadas', 'PorcentajeHitosRetrasados'
+]
+
+def calculate_all_metrics(df_dict: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Calcula las métricas de todos los proyectos de dim_proyectos en bloque:
+    un groupby/merge por tabla origen en lugar de filtrar cada tabla por proyecto.
+    Reproduce las reglas de calculate_project_metrics.
+    """
+    dim_proyectos = ensure_df(df_dict.get('dim_proyectos', pd.DataFrame()))
+    proyectos = ensure_df(df_dict.get('proyectos', pd.DataFrame()))
+    contratos = ensure_df(df_dict.get('contratos', pd.DataFrame()))
+    gastos = ensure_df(df_dict.get('gastos', pd.DataFrame()))
+    penalizaciones = ensure_df(df_dict.get('penalizaciones', pd.DataFrame()))
+    asignaciones = ensure_df(df_dict.get('asignaciones', pd.DataFrame()))
+    errores = ensure_df(df_dict.get('errores', pd.DataFrame()))
+    tareas = ensure_df(df_dict.get('tareas', pd.DataFrame()))
+    hitos = ensure_df(df_dict.get('hitos', pd.DataFrame()))
+    pruebas = ensure_df(df_dict.get('pruebas', pd.DataFrame()))
+    dim_tareas = ensure_df(df_dict.get('dim_tareas', pd.DataFrame()))
+    dim_gastos = ensure_df(df_dict.get('dim_gastos', pd.DataFrame()))
+    
+    if dim_proyectos.empty or proyectos.empty:
+        return pd.DataFrame(columns=COLUMNAS_HECHOS)
+    
+    # Primer registro de cada proyecto (equivale a proyecto_data.iloc[0])
+    primer_proyecto = proyectos.drop_duplicates(subset=['ID_Proyecto'], keep='first').set_index('ID_Proyecto')
+    ids = pd.Index(dim_proyectos['ID_Proyecto'].unique())
+    ids = ids[ids.isin(primer_proyecto.index)]
+    if len(ids) == 0:
+        return pd.DataFrame(columns=COLUMNAS_HECHOS)
+    
+    base = primer_proyecto.loc[ids]
+    metrics = pd.DataFrame(index=ids)
+    
+    # === RETRASOS Y FECHAS ===
+    fecha_inicio = parse_fechas(base, 'FechaInicio')
+    fecha_inicio_real = parse_fechas(base, 'FechaInicioReal')
+    fecha_fin_plan = parse_fechas(base, 'FechaFin')
+    fecha_fin_real = parse_fechas(base, 'FechaFinReal')
+    
+    metrics['RetrasoInicioDias'] = retraso_dias(fecha_inicio_real, fecha_inicio)
+    metrics['RetrasoFinalDias'] = retraso_dias(fecha_fin_real, fecha_fin_plan)
+    claves_tiempo = DateKeyMapper(ensure_df(df_dict.get('dim_tiempo', pd.DataFrame())))
+    metrics['ID_FechaInicio'] = claves_tiempo.map(fecha_inicio, sin_fecha=0)
+    metrics['ID_FechaFin'] = claves_tiempo.map(fecha_fin_real.fillna(fecha_fin_plan), sin_fecha=0)
+    
+    # === PRESUPUESTO (primer contrato del proyecto) ===
+    metrics['Presupuesto'] = 0.0
+    primer_contrato = pd.DataFrame()
+    if not contratos.empty:
+        primer_contrato = contratos.drop_duplicates(subset=['ID_Proyecto'], keep='first').set_index('ID_Proyecto')
+        presupuesto = primer_contrato['ValorTotalContrato'].map(lambda v: float(v or 0))
+        metrics['Presupuesto'] = presupuesto.reindex(ids, fill_value=0.0).astype(float)
+    
+    # === COSTE REAL: GASTOS + CAPEX/OPEX ===
+    costo_gastos = pd.Series(0.0, index=ids)
+    metrics['ID_Gasto'] = 0
+    metrics['ProporcionCAPEX_OPEX'] = 0.0
+    if not gastos.empty:
+        suma_gastos = gastos.groupby('ID_Proyecto')['Monto'].sum()
+        con_gastos = ids.isin(suma_gastos.index)
+        costo_gastos = suma_gastos.reindex(ids, fill_value=0).astype(float)
+        
+        # ID_Gasto: combinación (TipoGasto, Categoria) de dim_gastos con mayor monto en el proyecto
+        monto_por_clave = gastos.assign(ID_Finanza=claves_gasto(gastos, dim_gastos), Monto=gastos['Monto'].astype(float)) \
+            .groupby(['ID_Proyecto', 'ID_Finanza'])['Monto'].sum().reset_index()
+        principal = monto_por_clave.sort_values(['ID_Proyecto', 'Monto', 'ID_Finanza'], ascending=[True, False, True]) \
+            .drop_duplicates('ID_Proyecto').set_index('ID_Proyecto')['ID_Finanza']
+        metrics.loc[con_gastos, 'ID_Gasto'] = principal.reindex(ids[con_gastos]).to_numpy()
+        
+        categoria = gastos['Categoria'].str.upper()
+        capex = gastos[categoria == 'CAPEX'].groupby('ID_Proyecto')['Monto'].sum().reindex(ids, fill_value=0)
+        opex = gastos[categoria == 'OPEX'].groupby('ID_Proyecto')['Monto'].sum().reindex(ids, fill_value=0)
+        con_opex = (opex > 0).astype(bool)
+        metrics.loc[con_opex, 'ProporcionCAPEX_OPEX'] = (capex[con_opex] / opex[con_opex]).astype(float)
+    
+    # === COSTE REAL: SUELDOS (HorasReales * CostoPorHora) ===
+    costo_sueldos = pd.Series(0.0, index=ids)
+    if not asignaciones.empty:
+        costo_sueldo = pd.to_numeric(asignaciones['HorasReales'], errors='coerce') * pd.to_numeric(asignaciones['CostoPorHora'], errors='coerce')
+        costo_sueldos = costo_sueldo.groupby(asignaciones['ID_Proyecto']).sum().reindex(ids, fill_value=0.0).astype(float)
+    
+    metrics['CosteReal'] = costo_gastos + costo_sueldos
+    metrics['DesviacionPresupuestal'] = metrics['Presupuesto'] - metrics['CosteReal']
+    
+    # === PENALIZACIONES (por el primer contrato del proyecto) ===
+    metrics['PenalizacionesMonto'] = 0.0
+    if not penalizaciones.empty and not contratos.empty:
+        suma_penalizaciones = penalizaciones.groupby('ID_Contrato')['Monto'].sum()
+        contrato_por_proyecto = primer_contrato['ID_Contrato'].reindex(ids)
+        con_contrato = contrato_por_proyecto.notna()
+        montos = contrato_por_proyecto[con_contrato].map(suma_penalizaciones).fillna(0).astype(float)
+        metrics.loc[con_contrato, 'PenalizacionesMonto'] = montos
+    
+    # Relación hito -> proyecto (pares únicos para respetar la semántica de isin)
+    pares_hito = hitos[['ID_Hito', 'ID_Proyecto']].drop_duplicates() if not hitos.empty else pd.DataFrame()
+    
+    # === TASA DE ERRORES (errores / tareas del proyecto) ===
+    metrics['TasaDeErroresEncontrados'] = 0.0
+    if not errores.empty and not tareas.empty and not hitos.empty:
+        tareas_proyecto = tareas[['ID_Tarea', 'ID_Hito']].merge(pares_hito, on='ID_Hito')
+        total_tareas = tareas_proyecto.groupby('ID_Proyecto').size()
+        pares_tarea = tareas_proyecto[['ID_Tarea', 'ID_Proyecto']].drop_duplicates()
+        total_errores = errores[['ID_Tarea']].merge(pares_tarea, on='ID_Tarea').groupby('ID_Proyecto').size()
+        tasa = total_errores.reindex(total_tareas.index, fill_value=0) / total_tareas
+        metrics['TasaDeErroresEncontrados'] = tasa.reindex(ids, fill_value=0.0).astype(float)
+    
+    # === TASA DE ÉXITO EN PRUEBAS ===
+    metrics['TasaDeExitoEnPruebas'] = 0.0
+    if not pruebas.empty and not hitos.empty:
+        pruebas_proyecto = pruebas[['ID_Hito', 'Exitosa']].merge(pares_hito, on='ID_Hito').groupby('ID_Proyecto')['Exitosa']
+        tasa = pruebas_proyecto.sum() / pruebas_proyecto.size()
+        metrics['TasaDeExitoEnPruebas'] = tasa.reindex(ids, fill_value=0.0).astype(float)
+    
+    # === PRODUCTIVIDAD (HorasReales totales / cantidad hitos) ===
+    metrics['ProductividadPromedio'] = 0.0
+    if not asignaciones.empty and not hitos.empty:
+        horas = asignaciones.groupby('ID_Proyecto')['HorasReales'].sum()
+        total_hitos = hitos.groupby('ID_Proyecto').size()
+        comunes = horas.index.intersection(total_hitos.index)
+        productividad = horas[comunes] / total_hitos[comunes]
+        metrics['ProductividadPromedio'] = productividad.reindex(ids, fill_value=0.0).astype(float)
+    
+    # === PORCENTAJE TAREAS RETRASADAS (desde dim_tareas) ===
+    metrics['PorcentajeTareasRetrasadas'] = 0.0
+    if not dim_tareas.empty and not hitos.empty:
+        tareas_proyecto = dim_tareas[['ID_Hito', 'SeRetraso']].merge(pares_hito, on='ID_Hito')
+        retrasadas = (tareas_proyecto['SeRetraso'] == 1).groupby(tareas_proyecto['ID_Proyecto'])
+        porcentaje = (retrasadas.sum() / retrasadas.size()) * 100
+        metrics['PorcentajeTareasRetrasadas'] = porcentaje.reindex(ids, fill_value=0.0).astype(float)
+    
+    # === PORCENTAJE HITOS RETRASADOS ===
+    metrics['PorcentajeHitosRetrasados'] = 0.0
+    if not hitos.empty:
+        retraso = (parse_fechas(hitos, 'FechaFinReal') - parse_fechas(hitos, 'FechaFinPlanificada')).dt.days
+        retrasados = (retraso > 0).groupby(hitos['ID_Proyecto'])
+        porcentaje = (retrasados.sum() / retrasados.size()) * 100
+        metrics['PorcentajeHitosRetrasados'] = porcentaje.reindex(ids, fill_value=0.0).astype(float)
+    
+    metrics = metrics.rename_axis('ID_Proyecto').reset_index()
+    # Un hecho por proyecto: la clave natural es estable entre ejecuciones (mode='merge')
+    metrics['ID_Hecho'] = metrics['ID_Proyecto']
+    return metrics[COLUMNAS_HECHOS]
+
 def transform(df_dict: Dict[str, pd.DataFrame]) -> pd.DataFrame:
     # Usar dim_proyectos para garantizar integridad referencial
     dim_proyectos = ensure_df(df_dict.get('dim_proyectos', pd.DataFrame()))
@@ -280,49 +387,51 @@ def transform(df_dict: Dict[str, pd.DataFrame]) -> pd.DataFrame:
     
     if dim_proyectos.empty:
         logger.warning('hechos_proyectos: No hay datos de dim_proyectos')
-        return pd.DataFrame(columns=[
-            'ID_Hecho', 'ID_Proyecto', 'ID_Gasto', 'ID_FechaInicio', 'ID_FechaFin',
-            'RetrasoInicioDias', 'RetrasoFinDias', 'Presupuesto', 'CosteReal', 
-            'DesviacionPresupuestal', 'PenalizacionesMonto', 'ProporcionCAPEX_OPEX', 
-            'TasaDeErroresEncontrados', 'TasaDeExitoEnPruebas', 'ProductividadPromedio', 
-            'PorcentajeTareasRetrasadas', 'PorcentajeHitosRetrasados'
-        ])
+        return pd.DataFrame(columns=COLUMNAS_HECHOS)
+    
+    logger.info(f'hechos_proyectos: Procesando {len(dim_proyectos)} proyectos válidos de dim_proyectos')
+    
+    result = calculate_all_metrics(df_dict)
+    
+    if result.empty:
+        logger.warning('hechos_proyectos: No se pudieron calcular métricas para ningún proyecto')
+        return pd.DataFrame(columns=COLUMNAS_HECHOS)
+    
+    log_transform_info('hechos_proyectos', len(proyectos), len(result))
+    return result
+
+def transform_por_proyecto(df_dict: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Implementación original proyecto por proyecto (O(proyectos x filas)).
+    Se conserva como referencia para validar y medir la versión vectorizada.
+    """
+    # Usar dim_proyectos para garantizar integridad referencial
+    dim_proyectos = ensure_df(df_dict.get('dim_proyectos', pd.DataFrame()))
+    proyectos = ensure_df(df_dict.get('proyectos', pd.DataFrame()))  # Para datos adicionales
+    
+    if dim_proyectos.empty:
+        logger.warning('hechos_proyectos: No hay datos de dim_proyectos')
+        return pd.DataFrame(columns=COLUMNAS_HECHOS)
     
     # Calcular métricas SOLO para proyectos válidos de dim_proyectos
     hechos_data = []
-    hecho_id = 1
     
     logger.info(f'hechos_proyectos: Procesando {len(dim_proyectos)} proyectos válidos de dim_proyectos')
     
     for proyecto_id in dim_proyectos['ID_Proyecto'].unique():
         metrics = calculate_project_metrics(proyecto_id, df_dict)
         if metrics:  # Solo agregar si se calcularon las métricas
-            metrics['ID_Hecho'] = hecho_id
+            metrics['ID_Hecho'] = proyecto_id
             hechos_data.append(metrics)
-            hecho_id += 1
     
     if not hechos_data:
         logger.warning('hechos_proyectos: No se pudieron calcular métricas para ningún proyecto')
-        return pd.DataFrame(columns=[
-            'ID_Hecho', 'ID_Proyecto', 'ID_Gasto', 'ID_FechaInicio', 'ID_FechaFin',
-            'RetrasoInicioDias', 'RetrasoFinalDias', 'Presupuesto', 'CosteReal',
-            'DesviacionPresupuestal', 'PenalizacionesMonto', 'ProporcionCAPEX_OPEX', 
-            'TasaDeErroresEncontrados', 'TasaDeExitoEnPruebas', 'ProductividadPromedio', 
-            'PorcentajeTareasRetrasadas', 'PorcentajeHitosRetrasados'
-        ])
+        return pd.DataFrame(columns=COLUMNAS_HECHOS)
     
     result = pd.DataFrame(hechos_data)
     
     # Reordenar columnas según schema DW exacto
-    columnas_ordenadas = [
-        'ID_Hecho', 'ID_Proyecto', 'ID_Gasto', 'ID_FechaInicio', 'ID_FechaFin',
-        'RetrasoInicioDias', 'RetrasoFinalDias', 'Presupuesto', 'CosteReal',
-        'DesviacionPresupuestal', 'PenalizacionesMonto', 'ProporcionCAPEX_OPEX', 
-        'TasaDeErroresEncontrados', 'TasaDeExitoEnPruebas', 'ProductividadPromedio', 
-        'PorcentajeTareasRetrasadas', 'PorcentajeHitosRetrasados'
-    ]
-    
-    result = result[columnas_ordenadas]
+    result = result[COLUMNAS_HECHOS]
     
     log_transform_info('hechos_proyectos', len(proyectos), len(result))
     return result
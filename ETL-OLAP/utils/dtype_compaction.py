@@ -0,0 +1,141 @@
+"""
+Compactación de tipos de los datos crudos
+Se aplica justo después de cada consulta de extracción: cadenas de baja cardinalidad
+a category, fechas (datetime.date de mysql-connector) a datetime64 y enteros/flotantes
+al tipo más chico que conserva los valores. Las columnas DECIMAL (montos) se dejan como
+decimal.Decimal para conservar la aritmética exacta, salvo las de FLOAT_SAFE_DECIMAL_COLUMNS.
+"""
+
+import logging
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+logger = logging.getLogger(__name__)
+
+# Una columna de texto pasa a category si tiene a lo sumo esta proporción de valores distintos
+CATEGORY_MAX_RATIO = 0.5
+
+# Columnas por fila que se reemplazan por metadatos de la ejecución
+METADATA_COLUMNS = ['fecha_extraccion']
+
+# Columnas DECIMAL que pueden pasar a float sin afectar cálculos exactos (no son montos)
+FLOAT_SAFE_DECIMAL_COLUMNS = {'HorasPlanificadas', 'HorasReales'}
+
+# Las claves (ID_*) no bajan de int32: se suman, desplazan y cruzan con claves int64
+KEY_MIN_DTYPE = np.int32
+
+def memory_bytes(df: pd.DataFrame) -> int:
+    """Memoria real del DataFrame (incluye el contenido de las cadenas)"""
+    return int(df.memory_usage(deep=True).sum())
+
+def _compact_integer(serie: pd.Series) -> pd.Series:
+    compactada = pd.to_numeric(serie, downcast='integer')
+    if str(serie.name).startswith('ID_') and compactada.dtype.itemsize < np.dtype(KEY_MIN_DTYPE).itemsize:
+        compactada = compactada.astype(KEY_MIN_DTYPE)
+    return compactada
+
+def _compact_float(serie: pd.Series) -> pd.Series:
+    """float32 solo si todos los valores sobreviven la ida y vuelta (montos con centavos no)"""
+    reducida = serie.astype(np.float32)
+    if (reducida.astype(np.float64).eq(serie) | serie.isna()).all():
+        return reducida
+    return serie
+
+def _compact_object(serie: pd.Series) -> pd.Series:
+    tipo = pd.api.types.infer_dtype(serie, skipna=True)
+
+    if tipo == 'string':
+        distintos = serie.nunique(dropna=True)
+        if distintos <= max(1, len(serie) * CATEGORY_MAX_RATIO):
+            return serie.astype('category')
+        return serie
+
+    if tipo in ('date', 'datetime', 'datetime64'):
+        try:
+            return pd.to_datetime(serie)
+        except (ValueError, OverflowError, pd.errors.OutOfBoundsDatetime):
+            return serie  # Fechas fuera del rango de datetime64: se dejan como objetos
+
+    if tipo == 'decimal' and serie.name in FLOAT_SAFE_DECIMAL_COLUMNS:
+        return _compact_float(serie.astype(np.float64))
+
+    return serie
+
+def compact_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """DataFrame equivalente con tipos compactos y sin columnas de metadatos por fila"""
+    columnas = {}
+    for col in df.columns:
+        if col in METADATA_COLUMNS:
+            continue
+        serie = df[col]
+        kind = serie.dtype.kind
+        if kind in 'iu':
+            columnas[col] = _compact_integer(serie)
+        elif kind == 'f':
+            columnas[col] = _compact_float(serie)
+        elif kind == 'O':
+            columnas[col] = _compact_object(serie)
+        else:
+            columnas[col] = serie
+    return pd.DataFrame(columnas, index=df.index)
+
+def compact_chunks(chunks: Iterable[pd.DataFrame], table_name: str) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """
+    Compactar bloque a bloque (p. ej. pandas.read_sql con chunksize) y unir los bloques:
+    solo un bloque a la vez existe con cadenas y fechas como objetos Python.
+
+    Returns:
+        (DataFrame compactado, {'before': bytes sin compactar, 'after': bytes compactados})
+    """
+    antes = 0
+    bloques = []
+    for chunk in chunks:
+        antes += memory_bytes(chunk)
+        bloques.append(compact_dtypes(chunk))
+    
+    if not bloques:
+        df = pd.DataFrame()
+    elif len(bloques) == 1:
+        df = bloques[0]
+    else:
+        columnas = {}
+        for col in bloques[0].columns:
+            partes = [bloque[col] for bloque in bloques]
+            if all(isinstance(parte.dtype, pd.CategoricalDtype) for parte in partes):
+                # Cada bloque tiene sus propias categorías: unirlas sin pasar por objetos
+                columnas[col] = pd.Series(union_categoricals(partes, sort_categories=True), name=col)
+            else:
+                columnas[col] = pd.concat(partes, ignore_index=True)
+        del bloques
+        df = pd.DataFrame(columnas)
+        
+        # Columnas que quedaron como objeto al mezclar tipos entre bloques (p. ej. un bloque sin fechas)
+        mezcladas = [col for col in df.columns if df[col].dtype == object]
+        if mezcladas:
+            df[mezcladas] = compact_dtypes(df[mezcladas])
+    
+    despues = memory_bytes(df)
+    if antes:
+        logger.debug(f"{table_name}: {antes / 2**20:.2f} MB -> {despues / 2**20:.2f} MB "
+                     f"({antes / max(despues, 1):.1f}x)")
+    return df, {'before': antes, 'after': despues}
+
+def compact_table(df: pd.DataFrame, table_name: str) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """Compactar una tabla completa y medir la memoria antes y después"""
+    return compact_chunks([df], table_name)
+
+def log_memory_report(memory_stats: Dict[str, Dict[str, int]]):
+    """Reporte de memoria por tabla antes y después de la compactación"""
+    if not memory_stats:
+        return
+    logger.info("Memoria de datos crudos (antes -> después de compactar tipos):")
+    for table_name, stats in memory_stats.items():
+        antes, despues = stats['before'], stats['after']
+        logger.info(f"  - {table_name}: {antes / 2**20:.2f} MB -> {despues / 2**20:.2f} MB "
+                    f"({antes / max(despues, 1):.1f}x)")
+    antes = sum(stats['before'] for stats in memory_stats.values())
+    despues = sum(stats['after'] for stats in memory_stats.values())
+    logger.info(f"  Total: {antes / 2**20:.2f} MB -> {despues / 2**20:.2f} MB ({antes / max(despues, 1):.1f}x)")
@@ -6,7 +6,11 @@ Maneja las fechas de última extracción para evitar duplicados
 import json
 import os
 from datetime import datetime
-from typing import Optional
+from typing import Dict, Iterable, Optional, Set
+
+# Versión de las marcas de agua: las de versiones anteriores avanzaban sin cargar el DW
+# y no sirven para un delta (se ignoran y la siguiente extracción es completa)
+WATERMARKS_VERSION = 2
 
 class IncrementalControl:
     """Clase para manejar control incremental"""
@@ -63,6 +67,85 @@ class IncrementalControl:
         with open(self.control_file, 'w') as f:
             json.dump(data, f, indent=2)
     
+    def get_watermarks(self) -> Dict[str, int]:
+        """Obtener la marca de agua (máxima PK cargada al DW) de cada tabla"""
+        try:
+            with open(self.control_file, 'r') as f:
+                data = json.load(f)
+            if data.get("watermarks_version") != WATERMARKS_VERSION:
+                return {}
+            return {tabla: int(valor) for tabla, valor in data.get("watermarks", {}).items()}
+        except Exception:
+            return {}
+    
+    def get_closed_projects(self) -> Set[int]:
+        """Obtener los proyectos que ya estaban Cerrado/Cancelado en la última extracción"""
+        try:
+            with open(self.control_file, 'r') as f:
+                return set(json.load(f).get("closed_projects", []))
+        except Exception:
+            return set()
+    
+    def update_watermarks(self, watermarks: Dict[str, int], closed_projects: Iterable[int]):
+        """Guardar marcas de agua por tabla y el conjunto de proyectos cerrados"""
+        try:
+            with open(self.control_file, 'r') as f:
+                data = json.load(f)
+        except Exception:
+            data = {"extractions_history": []}
+        
+        actuales = data.get("watermarks", {})
+        actuales.update({tabla: int(valor) for tabla, valor in watermarks.items()})
+        data["watermarks"] = actuales
+        data["closed_projects"] = sorted(int(p) for p in closed_projects)
+        data["watermarks_version"] = WATERMARKS_VERSION
+        
+        with open(self.control_file, 'w') as f:
+            json.dump(data, f, indent=2)
+    
+    def stage_watermarks(self, watermarks: Dict[str, int], closed_projects: Iterable[int],
+                         extraction_date: str):
+        """Dejar pendientes las marcas de una extracción hasta que se cargue al DW"""
+        try:
+            with open(self.control_file, 'r') as f:
+                data = json.load(f)
+        except Exception:
+            data = {"extractions_history": []}
+        
+        data["pending"] = {
+            "watermarks": {tabla: int(valor) for tabla, valor in watermarks.items()},
+            "closed_projects": sorted(int(p) for p in closed_projects),
+            "extraction_date": extraction_date,
+        }
+        with open(self.control_file, 'w') as f:
+            json.dump(data, f, indent=2)
+    
+    def discard_pending(self):
+        """Descartar las marcas pendientes de una extracción que no llegó al DW"""
+        try:
+            with open(self.control_file, 'r') as f:
+                data = json.load(f)
+        except Exception:
+            return
+        if data.pop("pending", None) is not None:
+            with open(self.control_file, 'w') as f:
+                json.dump(data, f, indent=2)
+    
+    def commit_watermarks(self) -> bool:
+        """Confirmar las marcas pendientes (la extracción ya está en el DW)"""
+        try:
+            with open(self.control_file, 'r') as f:
+                pendiente = json.load(f).get("pending")
+        except Exception:
+            pendiente = None
+        if not pendiente:
+            return False
+        
+        self.update_watermarks(pendiente["watermarks"], pendiente["closed_projects"])
+        self.update_last_extraction_date(pendiente["extraction_date"])
+        self.discard_pending()
+        return True
+    
     def get_incremental_filter(self, date_column: str = "fecha_modificacion") -> str:
         """Generar filtro SQL para carga incremental"""
         last_date = self.get_last_extraction_date()
@@ -71,4 +154,11 @@ class IncrementalControl:
     def reset_control(self):
         """Resetear control (para carga completa)"""
         self.update_last_extraction_date("1900-01-01 00:00:00")
+        with open(self.control_file, 'r') as f:
+            data = json.load(f)
+        data.pop("watermarks", None)
+        data.pop("closed_projects", None)
+        data.pop("pending", None)
+        with open(self.control_file, 'w') as f:
+            json.dump(data, f, indent=2)
         print("🔄 Control incremental reseteado - próxima extracción será completa")
\ No newline at end of file
@@ -0,0 +1,228 @@
+"""
+Instrumentación de ejecuciones del ETL
+Cada consulta de extracción, nodo de transformación y tabla cargada se mide con stage()
+(tiempo, CPU, filas/s y RSS del proceso) y la ejecución se guarda como un reporte JSON en
+logs/run_reports/. Con profile=True cada etapa deja además un volcado de cProfile.
+"""
+
+import cProfile
+import json
+import logging
+import os
+import platform
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+REPORTS_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs", "run_reports")
+REPORT_FORMAT = "%Y%m%d_%H%M%S"
+
+# Una etapa se marca como regresión si tarda esta proporción más que en el reporte anterior
+# y la diferencia supera REGRESSION_MIN_SECONDS
+REGRESSION_RATIO = 1.2
+REGRESSION_MIN_SECONDS = 0.5
+
+# Reporte de la ejecución en curso (None: stage() solo mide, no registra)
+_activo: Optional['RunReport'] = None
+
+def _rss_bytes() -> Optional[int]:
+    """RSS actual del proceso (Linux); None si no está disponible"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def _rss_pico_bytes() -> Optional[int]:
+    try:
+        import resource
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return pico if platform.system() == 'Darwin' else pico * 1024
+    except (ImportError, OSError):
+        return None
+
+def _git_commit() -> Optional[str]:
+    try:
+        salida = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                timeout=5, cwd=os.path.dirname(REPORTS_DIRECTORY))
+        return salida.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+class RunReport:
+    """Reporte estructurado de una ejecución del ETL"""
+
+    def __init__(self, mode: str, profile: bool = False, directory: str = REPORTS_DIRECTORY):
+        self.mode = mode
+        self.profile = profile
+        self.directory = directory
+        self.started = datetime.now()
+        self.run_id = self.started.strftime(REPORT_FORMAT)
+        self.stages: List[dict] = []
+        self.extra: Dict[str, object] = {}
+        self.status = 'running'
+        self._inicio = time.perf_counter()
+        self._cpu_inicio = time.process_time()
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> 'RunReport':
+        global _activo
+        self._anterior, _activo = _activo, self
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        global _activo
+        _activo = self._anterior
+        self.status = 'failed' if exc_type else 'ok'
+        if exc_type:
+            self.extra['error'] = str(exc)
+        try:
+            self.save()
+        except OSError as e:
+            logger.warning(f"Reporte de ejecución no guardado: {str(e)}")
+        return False
+
+    @property
+    def profile_directory(self) -> str:
+        return os.path.join(self.directory, f"{self.run_id}_profiles")
+
+    def add_stage(self, registro: dict):
+        with self._lock:
+            self.stages.append(registro)
+
+    def to_dict(self) -> dict:
+        return {
+            'run_id': self.run_id,
+            'mode': self.mode,
+            'status': self.status,
+            'started': self.started.strftime("%Y-%m-%d %H:%M:%S"),
+            'seconds': time.perf_counter() - self._inicio,
+            'cpu_seconds': time.process_time() - self._cpu_inicio,
+            'peak_rss_bytes': _rss_pico_bytes(),
+            'environment': {
+                'git_commit': _git_commit(),
+                'python': platform.python_version(),
+                'pandas': pd.__version__,
+                'host': platform.node(),
+            },
+            'stages': sorted(self.stages, key=lambda registro: registro['started']),
+            'extra': self.extra,
+        }
+
+    def save(self) -> str:
+        """Guardar el reporte como JSON y mostrar las etapas más lentas y las regresiones"""
+        os.makedirs(self.directory, exist_ok=True)
+        anterior = latest_report(self.directory)
+        reporte = self.to_dict()
+        ruta = os.path.join(self.directory, f"{self.run_id}.json")
+        with open(ruta, 'w') as f:
+            json.dump(reporte, f, indent=2, default=str)
+
+        logger.info(f"Reporte de ejecución guardado en {ruta} ({reporte['seconds']:.2f}s, "
+                    f"RSS pico {(reporte['peak_rss_bytes'] or 0) / 2**20:,.1f} MB)")
+        for registro in sorted(reporte['stages'], key=lambda r: -r['seconds'])[:5]:
+            logger.info(f"  {registro['phase']}/{registro['name']}: {registro['seconds']:.3f}s")
+        if anterior:
+            for regresion in compare_reports(anterior, reporte):
+                logger.warning(f"  Regresión {regresion['stage']}: {regresion['before']:.3f}s -> "
+                               f"{regresion['after']:.3f}s (reporte {anterior['run_id']})")
+        return ruta
+
+def active_report() -> Optional[RunReport]:
+    return _activo
+
+@contextmanager
+def stage(phase: str, name: str, aggregate: bool = False, **extra):
+    """
+    Medir una etapa: tiempo de pared, CPU, RSS antes/después y filas/s.
+    El bloque puede completar el registro que recibe (p. ej. registro['rows'] = len(df)).
+
+    Args:
+        phase: 'extract', 'transform', 'load' o 'phase' para las fases completas
+        name: Tabla o nodo
+        aggregate: Etapa que contiene otras (CPU del proceso y sin cProfile)
+    """
+    reporte = _activo
+    registro = {'phase': phase, 'name': name, 'started': time.time(), 'rows': None, **extra}
+    if reporte is None:
+        yield registro
+        return
+
+    perfil = cProfile.Profile() if reporte.profile and not aggregate else None
+    reloj_cpu = time.process_time if aggregate else time.thread_time
+    rss_antes = _rss_bytes()
+    cpu_inicio = reloj_cpu()
+    inicio = time.perf_counter()
+    if perfil:
+        try:
+            perfil.enable()
+        except ValueError:
+            perfil = None  # Otro perfilador activo (etapas en paralelo con Python >= 3.12)
+    try:
+        yield registro
+        registro.setdefault('status', 'ok')
+    except BaseException:
+        registro['status'] = 'failed'
+        raise
+    finally:
+        if perfil:
+            perfil.disable()
+        registro['seconds'] = time.perf_counter() - inicio
+        registro['cpu_seconds'] = reloj_cpu() - cpu_inicio
+        rss_despues = _rss_bytes()
+        registro['rss_bytes'] = rss_despues
+        registro['rss_delta_bytes'] = rss_despues - rss_antes if rss_antes and rss_despues else None
+        if registro['rows'] is not None and registro['seconds'] > 0:
+            registro['rows_per_sec'] = registro['rows'] / registro['seconds']
+        if perfil:
+            os.makedirs(reporte.profile_directory, exist_ok=True)
+            ruta = os.path.join(reporte.profile_directory, f"{phase}.{name}.prof")
+            perfil.dump_stats(ruta)
+            registro['profile'] = ruta
+        reporte.add_stage(registro)
+
+def record_stage(phase: str, name: str, seconds: float, rows: Optional[int] = None, **extra):
+    """Registrar una etapa medida por fuera de stage() (p. ej. un generador por bloques)"""
+    reporte = _activo
+    if reporte is None:
+        return
+    registro = {'phase': phase, 'name': name, 'started': time.time() - seconds, 'rows': rows,
+                'seconds': seconds, 'status': 'ok', **extra}
+    if rows is not None and seconds > 0:
+        registro['rows_per_sec'] = rows / seconds
+    reporte.add_stage(registro)
+
+def latest_report(directory: str = REPORTS_DIRECTORY) -> Optional[dict]:
+    """Reporte más reciente guardado (None si no hay)"""
+    if not os.path.isdir(directory):
+        return None
+    reportes = sorted(nombre for nombre in os.listdir(directory) if nombre.endswith('.json'))
+    if not reportes:
+        return None
+    with open(os.path.join(directory, reportes[-1]), 'r') as f:
+        return json.load(f)
+
+def compare_reports(anterior: dict, actual: dict) -> List[dict]:
+    """Etapas que tardaron notablemente más que en el reporte anterior, de mayor a menor diferencia"""
+    def tiempos(reporte):
+        por_etapa = {}
+        for registro in reporte.get('stages', []):
+            clave = f"{registro['phase']}/{registro['name']}"
+            por_etapa[clave] = por_etapa.get(clave, 0.0) + registro['seconds']
+        return por_etapa
+
+    antes, despues = tiempos(anterior), tiempos(actual)
+    regresiones = [
+        {'stage': clave, 'before': antes[clave], 'after': segundos}
+        for clave, segundos in despues.items()
+        if clave in antes and segundos > antes[clave] * REGRESSION_RATIO
+        and segundos - antes[clave] > REGRESSION_MIN_SECONDS
+    ]
+    return sorted(regresiones, key=lambda r: r['before'] - r['after'])
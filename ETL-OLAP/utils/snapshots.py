@@ -0,0 +1,103 @@
+"""
+Snapshots columnares de los datos crudos extraídos
+Cada extracción se guarda como un Parquet comprimido por tabla en snapshots/<timestamp>/,
+para repetir transformaciones o cargas sin volver a consultar el SGP.
+"""
+
+import json
+import os
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = "%Y%m%d_%H%M%S"
+MANIFEST_FILE = "manifest.json"
+
+class SnapshotStore:
+    """Clase para guardar y leer snapshots de extracción"""
+
+    def __init__(self, directory: str = "snapshots", compression: str = "zstd"):
+        self.directory = directory
+        self.compression = compression
+
+    def list_snapshots(self) -> List[str]:
+        """Snapshots completos disponibles, del más antiguo al más reciente"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            nombre for nombre in os.listdir(self.directory)
+            if os.path.exists(os.path.join(self.directory, nombre, MANIFEST_FILE))
+        )
+
+    def latest(self) -> Optional[str]:
+        snapshots = self.list_snapshots()
+        return snapshots[-1] if snapshots else None
+
+    def save(self, raw_data: Dict[str, pd.DataFrame], extraction_timestamp: datetime,
+             incremental: bool = False) -> Optional[str]:
+        """
+        Guardar todas las tablas crudas. El manifiesto se escribe al final,
+        así un snapshot a medias nunca aparece en list_snapshots().
+
+        Returns:
+            Clave del snapshot (timestamp de extracción) o None si no se pudo guardar
+        """
+        key = extraction_timestamp.strftime(SNAPSHOT_FORMAT)
+        ruta = os.path.join(self.directory, key)
+        os.makedirs(ruta, exist_ok=True)
+
+        tablas = {}
+        try:
+            for table_name, df in raw_data.items():
+                archivo = f"{table_name}.parquet"
+                df.to_parquet(os.path.join(ruta, archivo), compression=self.compression, index=False)
+                tablas[table_name] = {'file': archivo, 'rows': len(df), 'columns': list(df.columns)}
+        except ImportError as e:
+            logger.warning(f"Snapshot no guardado: Parquet requiere pyarrow ({str(e)})")
+            return None
+        except Exception as e:
+            logger.warning(f"Snapshot no guardado: error escribiendo {table_name}: {str(e)}")
+            return None
+
+        manifest = {
+            'extraction_timestamp': extraction_timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+            'incremental': incremental,
+            'compression': self.compression,
+            'tables': tablas,
+        }
+        with open(os.path.join(ruta, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        tamano = sum(os.path.getsize(os.path.join(ruta, t['file'])) for t in tablas.values())
+        logger.info(f"Snapshot {key} guardado: {len(tablas)} tablas, {tamano / 2**20:.2f} MB en {ruta}")
+        return key
+
+    def load(self, key: Optional[str] = None) -> Tuple[Dict[str, pd.DataFrame], dict]:
+        """
+        Leer un snapshot (por defecto el más reciente)
+
+        Returns:
+            (diccionario de DataFrames como el de extract_all, manifiesto)
+        """
+        key = key or self.latest()
+        if key is None:
+            raise FileNotFoundError(f"No hay snapshots en {self.directory}")
+
+        ruta = os.path.join(self.directory, key)
+        with open(os.path.join(ruta, MANIFEST_FILE), 'r') as f:
+            manifest = json.load(f)
+
+        raw_data = {}
+        for table_name, info in manifest['tables'].items():
+            df = pd.read_parquet(os.path.join(ruta, info['file']))
+            if df.empty and info['columns'] and df.columns.empty:
+                df = pd.DataFrame(columns=info['columns'])
+            raw_data[table_name] = df
+
+        logger.info(f"Snapshot {key} leído ({manifest['extraction_timestamp']}, "
+                    f"{'incremental' if manifest.get('incremental') else 'completo'})")
+        return raw_data, manifest
@@ -0,0 +1,195 @@
+"""
+Caché de resultados de transformaciones direccionada por contenido
+La clave de cada nodo es un hash de sus entradas declaradas en get_dependencies()
+(huella de las tablas crudas o clave del nodo que las produjo) y del código fuente
+del módulo, así un nodo solo se recalcula si cambian sus datos o su implementación.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from types import ModuleType
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Límites de la caché: las entradas sin usar por más de CACHE_MAX_AGE_DAYS se eliminan y,
+# si el total supera CACHE_MAX_BYTES, se eliminan las menos usadas recientemente
+CACHE_MAX_AGE_DAYS = 7
+CACHE_MAX_BYTES = 2 * 2**30
+
+# Paquetes propios cuyo código forma parte de la versión de un nodo
+PAQUETES_FUENTE = ('transform', 'utils')
+
+def fingerprint_df(df: pd.DataFrame) -> Optional[str]:
+    """
+    Huella del contenido de una tabla: columnas, tipos y hash fila a fila (en orden).
+    None si alguna columna no se puede hashear (la transformación no se cachea).
+    """
+    h = hashlib.sha256()
+    h.update(json.dumps([[str(col), str(dtype)] for col, dtype in df.dtypes.items()]).encode())
+    h.update(str(len(df)).encode())
+    try:
+        filas = pd.util.hash_pandas_object(df, index=False).to_numpy(dtype=np.uint64)
+    except TypeError:
+        return None
+    h.update(filas.tobytes())
+    return h.hexdigest()
+
+def _modulos_fuente(modulo: ModuleType) -> List[ModuleType]:
+    """
+    El módulo y los módulos propios de los que depende, directa o indirectamente (p. ej.
+    transform.date_keys a través de transform.common)
+    """
+    modulos = {modulo.__name__: modulo}
+    pendientes = [modulo]
+    while pendientes:
+        for valor in vars(pendientes.pop()).values():
+            nombre = valor.__name__ if isinstance(valor, ModuleType) else getattr(valor, '__module__', None)
+            if (isinstance(nombre, str) and nombre.split('.')[0] in PAQUETES_FUENTE
+                    and nombre in sys.modules and nombre not in modulos):
+                modulos[nombre] = sys.modules[nombre]
+                pendientes.append(sys.modules[nombre])
+    return [modulos[nombre] for nombre in sorted(modulos)]
+
+def source_version(modulo: ModuleType) -> str:
+    """Hash del código fuente del nodo (y de sus helpers) y de las versiones de pandas/numpy"""
+    h = hashlib.sha256(f"pandas={pd.__version__};numpy={np.__version__}".encode())
+    for dependencia in _modulos_fuente(modulo):
+        h.update(dependencia.__name__.encode())
+        archivo = getattr(dependencia, '__file__', None)
+        if archivo and os.path.exists(archivo):
+            with open(archivo, 'rb') as f:
+                h.update(f.read())
+    return h.hexdigest()
+
+class TransformCache:
+    """Clase para guardar y reutilizar las salidas de los nodos de transformación"""
+
+    def __init__(self, directory: str = "transform_cache", max_age_days: float = CACHE_MAX_AGE_DAYS,
+                 max_bytes: int = CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_age_days = max_age_days
+        self.max_bytes = max_bytes
+        self.stats = {'hits': 0, 'misses': 0, 'saved_seconds': 0.0, 'nodes': {}}
+        self._versiones: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _ruta(self, key: str, extension: str) -> str:
+        return os.path.join(self.directory, f"{key}.{extension}")
+
+    def key(self, nombre: str, modulo: ModuleType, huellas: Dict[str, Optional[str]]) -> Optional[str]:
+        """
+        Clave del nodo a partir de la versión de su código y la huella de cada entrada.
+        None si alguna entrada no tiene huella.
+        """
+        if any(huella is None for huella in huellas.values()):
+            return None
+        with self._lock:
+            if nombre not in self._versiones:
+                self._versiones[nombre] = source_version(modulo)
+            version = self._versiones[nombre]
+        contenido = json.dumps({'nodo': nombre, 'version': version, 'entradas': huellas}, sort_keys=True)
+        return hashlib.sha256(contenido.encode()).hexdigest()
+
+    def get(self, nombre: str, key: Optional[str]) -> Optional[pd.DataFrame]:
+        """Resultado guardado para la clave (None si no existe o no se puede leer)"""
+        if key is None or not os.path.exists(self._ruta(key, 'json')):
+            self._registrar(nombre, 'miss')
+            return None
+
+        inicio = time.perf_counter()
+        try:
+            with open(self._ruta(key, 'json'), 'r') as f:
+                meta = json.load(f)
+            df = pd.read_pickle(self._ruta(key, 'pkl'))
+        except Exception as e:
+            logger.warning(f"Caché de {nombre} ilegible, se recalcula: {str(e)}")
+            self._registrar(nombre, 'miss')
+            return None
+
+        # Marcar como usada recientemente (la expiración y la eviction usan mtime)
+        ahora = time.time()
+        for extension in ('pkl', 'json'):
+            os.utime(self._ruta(key, extension), (ahora, ahora))
+        self._registrar(nombre, 'hit', max(0.0, meta['seconds'] - (time.perf_counter() - inicio)))
+        return df
+
+    def put(self, nombre: str, key: Optional[str], df: pd.DataFrame, seconds: float):
+        """Guardar el resultado de un nodo. Se escribe en un temporal y se renombra (atómico)."""
+        if key is None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        try:
+            temporal = self._ruta(key, f'pkl.{threading.get_ident()}.tmp')
+            df.to_pickle(temporal)
+            os.replace(temporal, self._ruta(key, 'pkl'))
+
+            meta = {'node': nombre, 'seconds': seconds, 'rows': len(df),
+                    'created': time.strftime("%Y-%m-%d %H:%M:%S")}
+            temporal = self._ruta(key, f'json.{threading.get_ident()}.tmp')
+            with open(temporal, 'w') as f:
+                json.dump(meta, f)
+            os.replace(temporal, self._ruta(key, 'json'))
+        except Exception as e:
+            logger.warning(f"No se pudo guardar {nombre} en la caché: {str(e)}")
+
+    def _registrar(self, nombre: str, resultado: str, ahorrado: float = 0.0):
+        with self._lock:
+            self.stats['hits' if resultado == 'hit' else 'misses'] += 1
+            self.stats['saved_seconds'] += ahorrado
+            self.stats['nodes'][nombre] = resultado
+
+    def evict(self) -> int:
+        """
+        Eliminar entradas sin usar hace más de max_age_days y luego las menos usadas
+        recientemente hasta quedar por debajo de max_bytes.
+
+        Returns:
+            Cantidad de entradas eliminadas
+        """
+        if not os.path.isdir(self.directory):
+            return 0
+
+        entradas = []
+        for archivo in os.listdir(self.directory):
+            if not archivo.endswith('.json'):
+                continue
+            key = archivo[:-len('.json')]
+            rutas = [self._ruta(key, 'json'), self._ruta(key, 'pkl')]
+            existentes = [ruta for ruta in rutas if os.path.exists(ruta)]
+            entradas.append((max(os.path.getmtime(ruta) for ruta in existentes),
+                             sum(os.path.getsize(ruta) for ruta in existentes), existentes))
+        entradas.sort()
+
+        limite = time.time() - self.max_age_days * 86400
+        total = sum(tamano for _, tamano, _ in entradas)
+        eliminadas = 0
+        for usada, tamano, rutas in entradas:
+            if usada >= limite and total <= self.max_bytes:
+                break
+            for ruta in rutas:
+                os.remove(ruta)
+            total -= tamano
+            eliminadas += 1
+
+        if eliminadas:
+            logger.info(f"Caché de transformaciones: {eliminadas} entradas eliminadas "
+                        f"({total / 2**20:.2f} MB en uso)")
+        return eliminadas
+
+    def log_summary(self):
+        """Resumen de la ejecución: aciertos, fallos y tiempo ahorrado"""
+        stats = self.stats
+        logger.info(f"Caché de transformaciones: {stats['hits']} aciertos, {stats['misses']} fallos, "
+                    f"{stats['saved_seconds']:.3f}s ahorrados")
+        recalculados = sorted(nombre for nombre, resultado in stats['nodes'].items() if resultado == 'miss')
+        if recalculados and stats['hits']:
+            logger.info(f"  Recalculados: {', '.join(recalculados)}")